@@ -0,0 +1,222 @@
+import asyncio
+import time
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Any, Callable, List, Optional
+from config import (
+    ADMISSION_RATE_PER_MINUTE,
+    ADMISSION_BURST,
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_DEFAULT_DURATION
+)
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+# Queue key for work not tied to a browser session (suggestion warming, scripts)
+BACKGROUND_SESSION = "background"
+
+
+class _Waiter:
+    """One question waiting for admission"""
+    def __init__(self, session_id: str, future: asyncio.Future,
+                 on_queue: Optional[Callable[[int, float], None]]):
+        self.session_id = session_id
+        self.future = future
+        self.on_queue = on_queue
+        self.enqueued_at = time.monotonic()
+        self.position: Optional[int] = None
+
+
+class AdmissionController:
+    """
+    Local gate in front of new Genie questions, so bursts are smoothed out here
+    instead of being answered with 429s.
+
+    A question is admitted when both a rate token (rate_per_minute, refilled
+    continuously, at most burst saved up) and one of max_concurrent slots are
+    free; the slot is held until Genie has answered. Questions that cannot be
+    admitted wait in one FIFO queue per session, served round-robin, so a user
+    sending many questions cannot hold everyone else up. Waiters are told their
+    position and estimated wait whenever either changes.
+
+    Runs on the shared event loop; it is not thread-safe.
+    """
+
+    def __init__(self, rate_per_minute: float = ADMISSION_RATE_PER_MINUTE, burst: float = ADMISSION_BURST,
+                 max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+                 default_duration: float = ADMISSION_DEFAULT_DURATION):
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(burst, 1)
+        self.max_concurrent = max_concurrent
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._active = 0
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Moving average of how long an admitted question holds its slot
+        self._avg_duration = default_duration
+        self._stats = {"admitted": 0, "queued": 0, "cancelled": 0, "max_queue": 0, "total_wait": 0.0}
+
+    @property
+    def _refill_rate(self) -> float:
+        """Rate tokens gained per second"""
+        return self.rate_per_minute / 60
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate_per_minute > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self._refill_rate)
+        self._refilled = now
+
+    def _has_slot(self) -> bool:
+        return self.max_concurrent <= 0 or self._active < self.max_concurrent
+
+    def _has_token(self) -> bool:
+        return self.rate_per_minute <= 0 or self._tokens >= 1
+
+    def _take(self) -> None:
+        self._active += 1
+        if self.rate_per_minute > 0:
+            self._tokens -= 1
+        self._stats["admitted"] += 1
+
+    def _order(self) -> List[_Waiter]:
+        """Waiters in the order they will be admitted: round-robin across sessions"""
+        queues = [list(queue) for queue in self._queues.values()]
+        order = []
+        for depth in range(max((len(queue) for queue in queues), default=0)):
+            order.extend(queue[depth] for queue in queues if depth < len(queue))
+        return order
+
+    def _eta(self, position: int) -> float:
+        """Estimated seconds until the waiter at position (1-based) is admitted"""
+        rate_wait = 0.0
+        if self.rate_per_minute > 0:
+            rate_wait = max(position - self._tokens, 0) / self._refill_rate
+        slot_wait = 0.0
+        if self.max_concurrent > 0:
+            free = self.max_concurrent - self._active
+            if position > free:
+                # Each round of max_concurrent questions takes about one average answer time
+                rounds = -(-(position - free) // self.max_concurrent)
+                slot_wait = rounds * self._avg_duration
+        return max(rate_wait, slot_wait)
+
+    def _dispatch(self) -> None:
+        """Admit as many queued waiters as the rate and concurrency limits allow, then update the rest"""
+        self._refill()
+        while self._queues and self._has_slot() and self._has_token():
+            session_id, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            # The session goes to the back of the line for its next question
+            del self._queues[session_id]
+            if queue:
+                self._queues[session_id] = queue
+            if waiter.future.done():
+                continue
+            self._take()
+            self._stats["total_wait"] += time.monotonic() - waiter.enqueued_at
+            waiter.future.set_result(None)
+
+        if self._queues and self._has_slot() and not self._has_token() and self._timer is None:
+            # Only the rate is holding the queue up: come back when the next token is due
+            delay = (1 - self._tokens) / self._refill_rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+        self._notify()
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _notify(self) -> None:
+        for position, waiter in enumerate(self._order(), start=1):
+            if waiter.position == position or waiter.on_queue is None:
+                continue
+            waiter.position = position
+            try:
+                waiter.on_queue(position, self._eta(position))
+            except Exception as e:
+                logger.error(f"Queue listener failed: {str(e)}")
+
+    async def acquire(self, session_id: Optional[str] = None,
+                      on_queue: Optional[Callable[[int, float], None]] = None) -> None:
+        """
+        Wait until a new question may be sent to Genie; pair with release().
+
+        Args:
+            session_id: Browser session asking; queues are fair across sessions
+            on_queue: Called with (position, estimated seconds) while waiting
+        """
+        self._refill()
+        if not self._queues and self._has_slot() and self._has_token():
+            self._take()
+            return
+
+        session_id = session_id or BACKGROUND_SESSION
+        waiter = _Waiter(session_id, asyncio.get_running_loop().create_future(), on_queue)
+        self._queues.setdefault(session_id, deque()).append(waiter)
+        self._stats["queued"] += 1
+        self._stats["max_queue"] = max(self._stats["max_queue"], self.queue_length)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the caller gave up: hand the slot back
+                self.release(0)
+            else:
+                self._stats["cancelled"] += 1
+                queue = self._queues.get(session_id)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[session_id]
+                self._notify()
+            raise
+
+    def release(self, held_for: Optional[float] = None) -> None:
+        """Give back a slot taken by acquire(), held_for seconds after it was granted"""
+        self._active -= 1
+        if held_for:
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * held_for
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, session_id: Optional[str] = None,
+                   on_queue: Optional[Callable[[int, float], None]] = None):
+        """Hold an admission slot for the duration of the block"""
+        await self.acquire(session_id, on_queue)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    @property
+    def queue_length(self) -> int:
+        # Snapshot first: /metrics reads this from a request thread
+        return sum(len(queue) for queue in list(self._queues.values()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        admitted_after_wait = self._stats["queued"] - self._stats["cancelled"] - self.queue_length
+        return {
+            "admitted": self._stats["admitted"],
+            "queued": self._stats["queued"],
+            "cancelled": self._stats["cancelled"],
+            "max_queue": self._stats["max_queue"],
+            "avg_wait": round(self._stats["total_wait"] / admitted_after_wait, 2) if admitted_after_wait > 0 else 0.0,
+            "waiting": self.queue_length,
+            "waiting_sessions": len(self._queues),
+            "active": self._active,
+            "avg_duration": round(self._avg_duration, 1),
+            "rate_per_minute": self.rate_per_minute,
+            "max_concurrent": self.max_concurrent
+        }
+
+
+genie_admission = AdmissionController()
+
+register_stats("admission", genie_admission.get_stats)
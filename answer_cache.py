@@ -0,0 +1,165 @@
+import re
+import sys
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
+import pandas as pd
+from config import ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_MB
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different spellings share a cache entry"""
+    normalized = re.sub(r"\s+", " ", question.strip().lower())
+    return normalized.rstrip("?.! ")
+
+
+def estimate_size(result: Union[str, pd.DataFrame], query_text: Optional[str]) -> int:
+    """Approximate memory held by a cached answer, in bytes"""
+    if isinstance(result, list):
+        # Multi-attachment answer: (result, query_text) parts
+        return sum(estimate_size(part, part_query) for part, part_query in result)
+    if isinstance(result, pd.DataFrame):
+        size = int(result.memory_usage(index=True, deep=True).sum())
+    else:
+        size = sys.getsizeof(result)
+    if query_text:
+        size += sys.getsizeof(query_text)
+    return size
+
+
+class AnswerCache:
+    """
+    Thread-safe TTL + LRU cache of Genie answers.
+
+    Entries are keyed on the normalized question text and the Genie space, and
+    hold the answer (DataFrame or text) with its SQL. Entries expire after ttl
+    seconds, and the least recently used ones are evicted once the estimated
+    memory of all entries exceeds max_bytes. Cached DataFrames are shared with
+    callers and must not be modified in place.
+    """
+
+    def __init__(self, ttl: float = ANSWER_CACHE_TTL, max_bytes: int = int(ANSWER_CACHE_MAX_MB * 1024 * 1024)):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, question: str, space_id: str) -> Optional[Tuple[Union[str, pd.DataFrame], Optional[str]]]:
+        """
+        Look up a fresh answer.
+
+        Returns:
+            (result, query_text) on a hit, otherwise None
+        """
+        if not self.enabled:
+            return None
+
+        key = (space_id, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created_at"] > self.ttl:
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry["result"], entry["query_text"]
+
+    def put(self, question: str, space_id: str, result: Union[str, pd.DataFrame], query_text: Optional[str]) -> None:
+        """Store an answer, evicting least recently used entries if over the memory budget"""
+        if not self.enabled:
+            return
+
+        key = (space_id, normalize_question(question))
+        size = estimate_size(result, query_text)
+        if size > self.max_bytes:
+            logger.info(f"Answer of {size} bytes exceeds the cache budget; not caching")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "result": result,
+                "query_text": query_text,
+                "size": size,
+                "created_at": time.time()
+            }
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def age(self, question: str, space_id: str) -> Optional[float]:
+        """Seconds since a cached answer was stored, or None if it is not cached"""
+        key = (space_id, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            return time.time() - entry["created_at"] if entry is not None else None
+
+    def stale_questions(self, space_id: str, older_than: float) -> List[str]:
+        """Normalized questions of a space whose cached answers are older than older_than seconds, oldest first"""
+        now = time.time()
+        with self._lock:
+            entries = [
+                (entry["created_at"], key[1]) for key, entry in self._entries.items()
+                if key[0] == space_id and now - entry["created_at"] > older_than
+            ]
+        return [question for _, question in sorted(entries)]
+
+    def invalidate(self, question: Optional[str] = None, space_id: Optional[str] = None) -> int:
+        """
+        Drop cached answers.
+
+        Args:
+            question: Only drop this question, otherwise every question
+            space_id: Only drop entries of this space, otherwise every space
+
+        Returns:
+            Number of entries removed
+        """
+        normalized = normalize_question(question) if question is not None else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (space_id is None or key[0] == space_id) and (normalized is None or key[1] == normalized)
+            ]
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters plus current size"""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl
+            }
+
+
+answer_cache = AnswerCache()
+
+register_stats("answer_cache", answer_cache.get_stats)
@@ -1,12 +1,21 @@
+import threading
 import dash
+import flask
 import dash_bootstrap_components as dbc
 from layout import create_layout
 from callbacks import register_callbacks
+from metrics import get_stats
+from job_manager import create_job_manager
+from result_export import register_export_routes
+from suggestion_warmer import suggestion_warmer
+from genie_room import warm_up_in_background
+from config import DEFAULT_SUGGESTIONS
 
 # Create Dash app
 app = dash.Dash(
     __name__,
-    external_stylesheets=[dbc.themes.BOOTSTRAP]
+    external_stylesheets=[dbc.themes.BOOTSTRAP],
+    background_callback_manager=create_job_manager()
 )
 
 # Set the layout
@@ -15,5 +24,32 @@ app.layout = create_layout()
 # Register all callbacks
 register_callbacks(app)
 
+# Stream stored results as CSV/Parquet downloads
+register_export_routes(app)
+
+# Background work starts with the first request, so only processes that serve
+# traffic run it (not the debug reloader's watcher process or a preloading master)
+_background_started = False
+_background_lock = threading.Lock()
+
+@app.server.before_request
+def start_background_work():
+    global _background_started
+    if _background_started:
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    # Mint the first token and open the Genie client without holding up the request
+    warm_up_in_background()
+    # Pre-compute answers to the welcome-screen suggestions in the background
+    suggestion_warmer.start(DEFAULT_SUGGESTIONS)
+
+# Expose runtime stats (connection reuse, caches, queues) for monitoring
+@app.server.route("/metrics")
+def metrics():
+    return flask.jsonify(get_stats())
+
 if __name__ == "__main__":
     app.run_server(debug=True) 
\ No newline at end of file
@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import queue
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+from config import ASYNC_IO_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the shared background event loop, starting it on first use.
+
+    A single loop runs in a daemon thread and drives every in-flight Genie
+    request, so waiting on Genie does not hold one thread per question.
+
+    Returns:
+        asyncio.AbstractEventLoop: The running background loop
+    """
+    global _loop, _executor
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                executor = ThreadPoolExecutor(max_workers=ASYNC_IO_WORKERS, thread_name_prefix="genie-io")
+                loop.set_default_executor(executor)
+                thread = threading.Thread(target=loop.run_forever, name="genie-event-loop", daemon=True)
+                thread.start()
+                _executor = executor
+                _loop = loop
+                logger.info(f"Started background event loop with {ASYNC_IO_WORKERS} I/O workers")
+    return _loop
+
+
+def submit(coro: Awaitable) -> Future:
+    """Schedule a coroutine on the background loop and return a concurrent Future for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the background loop and block until it finishes.
+
+    Args:
+        coro: The coroutine to run
+        timeout: Maximum time to wait in seconds, or None to wait indefinitely
+
+    Returns:
+        The coroutine's result
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync() cannot be called from the background event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def run_sync_with_updates(coro_fn: Callable[[Callable], Awaitable], on_update: Callable) -> Any:
+    """
+    Run a coroutine on the background loop, relaying its progress updates to the calling thread.
+
+    Args:
+        coro_fn: Called with an emit function and returns the coroutine to run;
+            the coroutine may call emit(*args) any number of times
+        on_update: Called on the calling thread with the args of each emit, in order
+
+    Returns:
+        The coroutine's result
+    """
+    updates = queue.Queue()
+    future = submit(coro_fn(lambda *args: updates.put(args)))
+
+    while not future.done() or not updates.empty():
+        try:
+            update = updates.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        on_update(*update)
+    return future.result()
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function in the shared I/O thread pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the retry deadline) over to the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, partial(context.run, func, *args, **kwargs))
@@ -0,0 +1,141 @@
+"""
+Measure cold-start cost of the app.
+
+Each run uses a fresh Python process, so nothing is shared between runs:
+
+- import time of genie_room and of the whole app (python -c "import app")
+- time from launching the server until it answers GET / and /_dash-layout
+- optionally, with --question, time from a cold import until Genie's first answer
+
+Usage:
+    python benchmark_startup.py [--runs 3] [--port 8055] [--question "..."] [--json]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+SERVER_SNIPPET = """
+from app import app
+app.run(host="127.0.0.1", port={port}, debug=False)
+"""
+
+FIRST_ANSWER_SNIPPET = """
+import sys, time
+started = time.perf_counter()
+from genie_room import genie_query_detailed
+imported = time.perf_counter()
+result, query_text, details = genie_query_detailed(sys.argv[1])
+print(imported - started, time.perf_counter() - started, details.get("source"))
+"""
+
+
+def _python(snippet, *args, timeout=300):
+    """Run a snippet in a fresh interpreter from the app directory and return its last output line"""
+    completed = subprocess.run(
+        [sys.executable, "-c", snippet, *args], cwd=HERE, capture_output=True, text=True, timeout=timeout
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def measure_import(module):
+    """Seconds to import module in a fresh process"""
+    return float(_python(IMPORT_SNIPPET.format(module=module)))
+
+
+def _wait_for(url, started, deadline):
+    """Poll url until it answers 200, returning seconds since started"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not answer in time")
+
+
+def measure_first_response(port, timeout=120):
+    """Seconds from launching the server to its first page and first layout responses"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SNIPPET.format(port=port)],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + timeout
+        first_page = _wait_for(f"http://127.0.0.1:{port}/", started, deadline)
+        first_layout = _wait_for(f"http://127.0.0.1:{port}/_dash-layout", started, deadline)
+        return first_page, first_layout
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def measure_first_answer(question):
+    """Seconds to import genie_room and to get the first answer, plus where it came from"""
+    imported, answered, source = _python(FIRST_ANSWER_SNIPPET, question).split()
+    return float(imported), float(answered), source
+
+
+def _summary(values):
+    return {
+        "min": round(min(values), 3),
+        "median": round(statistics.median(values), 3),
+        "max": round(max(values), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first response")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per measurement")
+    parser.add_argument("--port", type=int, default=8055, help="Port for the benchmark server")
+    parser.add_argument("--question", help="Also time a cold start up to Genie's first answer to this question")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    samples = {"import_genie_room": [], "import_app": [], "first_page": [], "first_layout": []}
+    for _ in range(args.runs):
+        samples["import_genie_room"].append(measure_import("genie_room"))
+        samples["import_app"].append(measure_import("app"))
+        first_page, first_layout = measure_first_response(args.port)
+        samples["first_page"].append(first_page)
+        samples["first_layout"].append(first_layout)
+
+    results = {name: _summary(values) for name, values in samples.items()}
+    if args.question:
+        imported, answered, source = measure_first_answer(args.question)
+        results["first_answer"] = {"import": round(imported, 3), "total": round(answered, 3), "source": source}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'measurement':<20}{'min':>10}{'median':>10}{'max':>10}   (seconds, {args.runs} runs)")
+    for name, summary in results.items():
+        if name == "first_answer":
+            print(f"{name:<20}{summary['total']:>10.3f}   (import {summary['import']:.3f}, source {summary['source']})")
+        else:
+            print(f"{name:<20}{summary['min']:>10.3f}{summary['median']:>10.3f}{summary['max']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,119 @@
-from dash import Input, Output, State, callback, ALL, MATCH, callback_context, no_update, clientside_callback, html, dcc
+from dash import Input, Output, State, callback, ALL, MATCH, callback_context, no_update, clientside_callback, html, dcc, set_props, Patch
 import dash
-import json
-import pandas as pd
-from genie_room import genie_query
+import logging
+import time
+import uuid
+from genie_room import genie_query_detailed, refresh_query_result
+from result_store import result_store
+from result_pages import get_page
+from chat_history import chat_history
+from suggestion_warmer import suggestion_warmer
+from utils import format_sql_query
 from components import (
     create_user_message, 
     create_thinking_indicator, 
+    create_thinking_content, 
     create_data_table, 
     create_query_section, 
     create_bot_response, 
-    create_error_response
+    create_error_response,
+    create_similar_question_note,
+    create_truncation_note,
+    create_export_links,
+    create_refresh_control,
+    create_prepared_note,
+    create_suggestion_status,
+    create_sql_code
 )
-from config import DEFAULT_WELCOME_TITLE, DEFAULT_WELCOME_DESCRIPTION, DEFAULT_SUGGESTIONS
+from config import DEFAULT_WELCOME_TITLE, DEFAULT_WELCOME_DESCRIPTION, DEFAULT_SUGGESTIONS, RESULT_TABLE_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+def table_record(df):
+    """Chat history fields for a result table kept server-side"""
+    # Keep the result server-side; the browser only gets the first page
+    record = {
+        "result_id": result_store.save_table(df),
+        "columns": list(df.columns)
+    }
+    # Tables that know their Genie attachment can re-run their SQL
+    if "genie_attachment" in df.attrs:
+        record["refreshable"] = True
+    # Very large results are cut off at RESULT_MAX_ROWS / RESULT_MAX_MB
+    if df.attrs.get("truncated"):
+        record["rows_shown"] = len(df)
+        record["total_rows"] = df.attrs.get("total_row_count")
+    return record
+
+def answer_record(result, query_text):
+    """Chat history fields for one answer part: text, or a server-side result table"""
+    if isinstance(result, str):
+        return {"text": result}
+    return {**table_record(result), "query_text": query_text}
+
+def bot_record(response, query_text):
+    """Chat history record of an answer, with one part per attachment for multi-attachment answers"""
+    if isinstance(response, list):
+        return {"role": "bot", "parts": [answer_record(part, part_query) for part, part_query in response]}
+    return {"role": "bot", **answer_record(response, query_text)}
+
+def render_table(record):
+    """Render the table block of an answer: truncation note, first page and download links"""
+    # Only the first page is sent; later pages come from update_result_table
+    data, page_count = get_page(record["result_id"], 0, RESULT_TABLE_PAGE_SIZE)
+    data_table = create_data_table(record["result_id"], record["columns"], data, page_count)
+    return [
+        create_truncation_note(record["rows_shown"], record["total_rows"]) if record.get("total_rows") else None,
+        html.Div([data_table], style={
+            'marginBottom': '20px',
+            'paddingRight': '5px'
+        }),
+        create_export_links(record["result_id"]),
+    ]
+
+def render_answer(record, query_index):
+    """Render one answer part (text or result table)"""
+    if record.get("result_id") is None:
+        return dcc.Markdown(record["text"], className="message-text")
+
+    # Format SQL query if available
+    query_section = None
+    if record.get("query_text") is not None:
+        query_section = create_query_section(record["query_text"], query_index)
+
+    # Create content with table and optional SQL section; a refresh swaps the table block in place
+    slot = record["result_id"]
+    return html.Div([
+        html.Div(render_table(record), id={"type": "result-answer", "index": slot}),
+        create_refresh_control(slot, record["result_id"]) if record.get("refreshable") else None,
+        query_section if query_section else None,
+    ])
+
+def render_message(record, position):
+    """Render a chat history record as the component shown at its position in the chat"""
+    role = record["role"]
+    if role == "user":
+        return create_user_message(record["text"])
+    if role == "error":
+        return create_error_response(record["text"])
+    if role == "pending":
+        # Restored while the answer was still being prepared
+        return create_error_response("This answer was still being prepared. Reload the page to see it.")
+
+    if "parts" in record:
+        # Every attachment of a multi-attachment answer, in order
+        content = html.Div([render_answer(part, f"{position}-{i}") for i, part in enumerate(record["parts"])])
+    else:
+        content = render_answer(record, f"{position}-{position}")
+
+    # Flag answers reused from an earlier, similar question
+    if record.get("similar_question"):
+        content = html.Div([create_similar_question_note(record["similar_question"]), content])
+    # Suggestion answers served from the warmer say how old they are
+    if record.get("prepared_at"):
+        content = html.Div([create_prepared_note(time.time() - record["prepared_at"]), content])
+
+    return create_bot_response(content, position, record.get("feedback"))
 
 def register_callbacks(app):
     """Register all callbacks with the Dash app"""
@@ -34,16 +136,16 @@ def register_callbacks(app):
          State("suggestion-3-text", "children"),
          State("suggestion-4-text", "children"),
          State("chat-input-fixed", "value"),
-         State("chat-messages", "children"),
+         State("session-id", "data"),
          State("welcome-container", "className")],
         prevent_initial_call=True
     )
     def handle_all_inputs(s1_clicks, s2_clicks, s3_clicks, s4_clicks, send_clicks, submit_clicks,
-                         s1_text, s2_text, s3_text, s4_text, input_value, current_messages,
+                         s1_text, s2_text, s3_text, s4_text, input_value, session_id,
                          welcome_class):
         ctx = callback_context
-        if not ctx.triggered:
-            return [no_update] * 8
+        if not ctx.triggered or not session_id:
+            return [no_update] * 5
 
         trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
         
@@ -64,29 +166,44 @@ def register_callbacks(app):
         if not user_input:
             return [no_update] * 5
         
-        # Create user message
-        user_message = create_user_message(user_input)
+        # Record the user message; the chat itself lives on the server
+        position = chat_history.append(session_id, {"role": "user", "text": user_input})
+        
+        # Append the user message and thinking indicator without resending the chat
+        updated_messages = Patch()
+        updated_messages.append(render_message({"role": "user", "text": user_input}, position))
         
-        # Add the user message to the chat
-        updated_messages = current_messages + [user_message] if current_messages else [user_message]
+        # Pre-computed suggestion answers are shown right away, without a background job
+        warm = suggestion_warmer.answer(user_input) if trigger_id in suggestion_map else None
+        if warm is not None:
+            response, query_text, age = warm
+            record = {**bot_record(response, query_text), "prepared_at": time.time() - age}
+            position = chat_history.append(session_id, record)
+            updated_messages.append(render_message(record, position))
+            return updated_messages, "", "welcome-container hidden", no_update, False
         
-        # Add thinking indicator
-        thinking_indicator = create_thinking_indicator()
-        updated_messages.append(thinking_indicator)
+        updated_messages.append(create_thinking_indicator())
         
+        # The answer goes where the thinking indicator is, even if other answers
+        # (e.g. of a job left running before a reload) are recorded meanwhile.
+        # The request id also keeps identical questions from sharing a background job
+        request_id = uuid.uuid4().hex
+        answer_position = chat_history.reserve(session_id, request_id)
         return (updated_messages, "", "welcome-container hidden",
-                {"trigger": True, "message": user_input}, True)
+                {"trigger": True, "message": user_input, "request_id": request_id, "position": answer_position}, True)
 
-    # Second callback: Make API call and show response
+    # Second callback: Make API call and show response.
+    # Runs as a background job so the request thread returns immediately.
     @app.callback(
         [Output("chat-messages", "children", allow_duplicate=True),
          Output("chat-trigger", "data", allow_duplicate=True),
          Output("query-running-store", "data", allow_duplicate=True)],
         [Input("chat-trigger", "data")],
-        [State("chat-messages", "children")],
+        [State("session-id", "data")],
+        background=True,
         prevent_initial_call=True
     )
-    def get_model_response(trigger_data, current_messages):
+    def get_model_response(trigger_data, session_id):
         if not trigger_data or not trigger_data.get("trigger"):
             return dash.no_update, dash.no_update, dash.no_update
         
@@ -94,48 +211,32 @@ def register_callbacks(app):
         if not user_input:
             return dash.no_update, dash.no_update, dash.no_update
         
+        def show_status(status, partial_text):
+            # Stream Genie's progress into the thinking indicator
+            set_props("thinking-indicator", {"children": create_thinking_content(status, partial_text)})
+
         try:
-            response, query_text = genie_query(user_input)
-            
-            if isinstance(response, str):
-                content = dcc.Markdown(response, className="message-text")
-            else:
-                # Data table response
-                df = pd.DataFrame(response)
-                
-                # Create the table
-                table_id = f"table-{len(current_messages)}"
-                data_table = create_data_table(df, table_id)
-
-                # Format SQL query if available
-                query_section = None
-                if query_text is not None:
-                    query_index = f"{len(current_messages)}-{len(current_messages)}"
-                    query_section = create_query_section(query_text, query_index)
-
-                # Create content with table and optional SQL section
-                content = html.Div([
-                    html.Div([data_table], style={
-                        'marginBottom': '20px',
-                        'paddingRight': '5px'
-                    }),
-                    query_section if query_section else None,
-                ])
-            
-            # Create bot response
-            bot_response = create_bot_response(content, 0)
-            
-            return current_messages[:-1] + [bot_response], {"trigger": False, "message": ""}, False
+            response, query_text, details = genie_query_detailed(user_input, on_status=show_status, session_id=session_id)
+            record = bot_record(response, query_text)
+
+            if details.get("source") == "unavailable":
+                # Circuit breaker open: shown as an error, not as an answer
+                record = {"role": "error", "text": response}
+            elif details.get("source") == "similar":
+                record["similar_question"] = details["similar_question"]
             
         except Exception as e:
-            error_msg = f"Sorry, I encountered an error: {str(e)}. Please try again later."
-            error_response = create_error_response(error_msg)
-            
-            return current_messages[:-1] + [error_response], {"trigger": False, "message": ""}, False
-
-
-
-
+            record = {"role": "error", "text": f"Sorry, I encountered an error: {str(e)}. Please try again later."}
+        
+        # The thinking indicator sits at the reserved position; replace it in place
+        position = trigger_data["position"]
+        if not chat_history.fill(session_id, position, trigger_data["request_id"], record):
+            # The chat was cleared while the answer was being prepared
+            return dash.no_update, {"trigger": False, "message": ""}, False
+        updated_messages = Patch()
+        updated_messages[position] = render_message(record, position)
+        
+        return updated_messages, {"trigger": False, "message": ""}, False
 
     # Modify the new chat button callback to reset session
     @app.callback(
@@ -144,26 +245,34 @@ def register_callbacks(app):
          Output("chat-trigger", "data", allow_duplicate=True),
          Output("query-running-store", "data", allow_duplicate=True)],
         [Input("new-chat-button", "n_clicks")],
-        [State("chat-messages", "children"),
-         State("chat-trigger", "data"),
-         State("query-running-store", "data")],
+        [State("session-id", "data")],
         prevent_initial_call=True
     )
-    def reset_to_welcome(n_clicks, chat_messages, chat_trigger, query_running):
+    def reset_to_welcome(n_clicks, session_id):
         # Reset session when starting a new chat
+        if session_id:
+            chat_history.clear(session_id)
         return ("welcome-container visible", [], {"trigger": False, "message": ""}, False)
 
+    # Give each browser tab a session and restore its chat after a reload
     @app.callback(
-        [Output("welcome-container", "className", allow_duplicate=True)],
-        [Input("chat-messages", "children")],
-        prevent_initial_call=True
+        [Output("session-id", "data"),
+         Output("chat-messages", "children", allow_duplicate=True),
+         Output("welcome-container", "className", allow_duplicate=True)],
+        [Input("session-id", "modified_timestamp")],
+        [State("session-id", "data")],
+        prevent_initial_call="initial_duplicate"
     )
-    def reset_query_running(chat_messages):
-        # Return as a single-item list
-        if chat_messages:
-            return ["welcome-container hidden"]
-        else:
-            return ["welcome-container visible"]
+    def restore_chat(modified_timestamp, session_id):
+        if not session_id:
+            return uuid.uuid4().hex, no_update, no_update
+        
+        records = chat_history.get(session_id)
+        if not records:
+            return no_update, no_update, no_update
+        
+        return (no_update, [render_message(record, position) for position, record in enumerate(records)],
+                "welcome-container hidden")
 
     # Add callback to disable input while query is running
     @app.callback(
@@ -181,8 +290,27 @@ def register_callbacks(app):
         # Disable input and buttons when query is running
         return query_running, query_running, query_running, tooltip_class
 
-    # Fix the callback for thumbs up/down buttons
-    @app.callback(
+    # Thumbs up/down only flip classes in the browser; each click is queued for the next batch
+    app.clientside_callback(
+        """
+        function(upClicks, downClicks, upClass, downClass) {
+            var ctx = window.dash_clientside.callback_context;
+            if (!ctx.triggered.length) {
+                return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+            }
+            var trigger = JSON.parse(ctx.triggered[0].prop_id.split('.')[0]);
+            var rating;
+            if (trigger.type === 'thumbs-up-button') {
+                rating = (upClass || '').indexOf('active') === -1 ? 'up' : null;
+            } else {
+                rating = (downClass || '').indexOf('active') === -1 ? 'down' : null;
+            }
+            window.genieFeedbackQueue = window.genieFeedbackQueue || [];
+            window.genieFeedbackQueue.push({position: trigger.index, rating: rating});
+            return [rating === 'up' ? 'thumbs-up-button active' : 'thumbs-up-button',
+                    rating === 'down' ? 'thumbs-down-button active' : 'thumbs-down-button'];
+        }
+        """,
         [Output({"type": "thumbs-up-button", "index": MATCH}, "className"),
          Output({"type": "thumbs-down-button", "index": MATCH}, "className")],
         [Input({"type": "thumbs-up-button", "index": MATCH}, "n_clicks"),
@@ -191,34 +319,114 @@ def register_callbacks(app):
          State({"type": "thumbs-down-button", "index": MATCH}, "className")],
         prevent_initial_call=True
     )
-    def handle_feedback(up_clicks, down_clicks, up_class, down_class):
-        ctx = callback_context
-        if not ctx.triggered:
-            return dash.no_update, dash.no_update
+
+    # Send queued feedback every FEEDBACK_FLUSH_INTERVAL seconds; nothing is sent while the queue is empty
+    app.clientside_callback(
+        """
+        function(nIntervals) {
+            var queue = window.genieFeedbackQueue || [];
+            if (!queue.length) {
+                return window.dash_clientside.no_update;
+            }
+            window.genieFeedbackQueue = [];
+            return queue;
+        }
+        """,
+        Output("feedback-batch", "data"),
+        Input("feedback-flush-interval", "n_intervals"),
+        prevent_initial_call=True
+    )
+
+    @app.callback(
+        Input("feedback-batch", "data"),
+        State("session-id", "data"),
+        prevent_initial_call=True
+    )
+    def record_feedback(events, session_id):
+        if not events or not session_id:
+            return
+        updated = chat_history.record_feedback(session_id, events)
+        logger.info(f"Recorded {len(events)} feedback events on {updated} messages")
+
+    # Serve result table pages; paging, sorting and filtering run against the server-side copy
+    @app.callback(
+        [Output({"type": "result-table", "index": MATCH}, "data"),
+         Output({"type": "result-table", "index": MATCH}, "page_count")],
+        [Input({"type": "result-table", "index": MATCH}, "page_current"),
+         Input({"type": "result-table", "index": MATCH}, "page_size"),
+         Input({"type": "result-table", "index": MATCH}, "sort_by"),
+         Input({"type": "result-table", "index": MATCH}, "filter_query")],
+        prevent_initial_call=True
+    )
+    def update_result_table(page_current, page_size, sort_by, filter_query):
+        result_id = callback_context.outputs_list[0]["id"]["index"]
+        return get_page(result_id, page_current, page_size or RESULT_TABLE_PAGE_SIZE, sort_by, filter_query)
+
+    # Re-run a table's SQL through execute_query and swap in the fresh result
+    @app.callback(
+        [Output({"type": "result-answer", "index": MATCH}, "children"),
+         Output({"type": "refresh-table", "index": MATCH}, "value"),
+         Output({"type": "refresh-status", "index": MATCH}, "children")],
+        [Input({"type": "refresh-table", "index": MATCH}, "n_clicks")],
+        [State({"type": "refresh-table", "index": MATCH}, "value"),
+         State("session-id", "data")],
+        background=True,
+        running=[(Output({"type": "refresh-table", "index": MATCH}, "disabled"), True, False),
+                 (Output({"type": "refresh-table", "index": MATCH}, "children"), "Refreshing...", "Refresh data")],
+        prevent_initial_call=True
+    )
+    def refresh_result_table(n_clicks, result_id, session_id):
+        if not n_clicks:
+            return no_update, no_update, no_update
         
-        trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
-        button_type = json.loads(trigger_id)["type"]
+        # The stored table remembers which attachment produced it
+        df = result_store.load_table(result_id)
+        if df is None or "genie_attachment" not in df.attrs:
+            return no_update, no_update, "This result is no longer available to refresh."
         
-        if button_type == "thumbs-up-button":
-            new_up_class = "thumbs-up-button active" if "active" not in up_class else "thumbs-up-button"
-            new_down_class = "thumbs-down-button"
-        else:
-            new_up_class = "thumbs-up-button"
-            new_down_class = "thumbs-down-button active" if "active" not in down_class else "thumbs-down-button"
+        try:
+            fresh = refresh_query_result(**df.attrs["genie_attachment"])
+        except Exception as e:
+            return no_update, no_update, f"Refresh failed: {str(e)}"
+        if fresh is None:
+            return no_update, no_update, "The query returned no rows; showing the previous result."
         
-        return new_up_class, new_down_class
+        # Saved under a new id, so no worker can serve a stale copy; the chat history follows it
+        record = table_record(fresh)
+        if session_id:
+            chat_history.replace_result(session_id, result_id, record)
+        return render_table(record), record["result_id"], f"Refreshed at {time.strftime('%H:%M:%S')}"
 
     # Add callback for toggling SQL query visibility
-    @app.callback(
+    # Showing and hiding the SQL happens in the browser; the first open asks the server to format it
+    app.clientside_callback(
+        """
+        function(nClicks, requested) {
+            var open = nClicks % 2 === 1;
+            return [open ? 'query-code-container visible' : 'query-code-container hidden',
+                    open ? 'Hide code' : 'Show code',
+                    open && !requested ? true : window.dash_clientside.no_update];
+        }
+        """,
         [Output({"type": "query-code", "index": MATCH}, "className"),
-         Output({"type": "toggle-text", "index": MATCH}, "children")],
+         Output({"type": "toggle-text", "index": MATCH}, "children"),
+         Output({"type": "query-format-request", "index": MATCH}, "data")],
         [Input({"type": "toggle-query", "index": MATCH}, "n_clicks")],
+        [State({"type": "query-format-request", "index": MATCH}, "data")],
         prevent_initial_call=True
     )
-    def toggle_query_visibility(n_clicks):
-        if n_clicks % 2 == 1:
-            return "query-code-container visible", "Hide code"
-        return "query-code-container hidden", "Show code"
+
+    # Format the SQL once, on first open (memoized in utils.format_sql_query)
+    @app.callback(
+        Output({"type": "query-code", "index": MATCH}, "children"),
+        [Input({"type": "query-format-request", "index": MATCH}, "data")],
+        [State({"type": "query-sql", "index": MATCH}, "data")],
+        prevent_initial_call=True
+    )
+    def format_query_code(requested, query_text):
+        if not requested or query_text is None:
+            return no_update
+        return create_sql_code(format_sql_query(query_text))
 
     # Add callbacks for welcome text customization
     @app.callback(
@@ -290,10 +498,27 @@ def register_callbacks(app):
                 s3 if s3 else DEFAULT_SUGGESTIONS[2],
                 s4 if s4 else DEFAULT_SUGGESTIONS[3]
             ]
+            # Pre-compute answers for the new suggestions too; other sessions keep the defaults
+            suggestion_warmer.add_suggestions(suggestions)
             return [title, description, *suggestions, False]
 
         return [no_update] * 7
 
+    # Show how ready each suggestion's pre-computed answer is
+    @app.callback(
+        [Output("suggestion-1-status", "children"),
+         Output("suggestion-2-status", "children"),
+         Output("suggestion-3-status", "children"),
+         Output("suggestion-4-status", "children")],
+        [Input("suggestion-status-interval", "n_intervals"),
+         Input("suggestion-1-text", "children"),
+         Input("suggestion-2-text", "children"),
+         Input("suggestion-3-text", "children"),
+         Input("suggestion-4-text", "children")]
+    )
+    def update_suggestion_status(n_intervals, s1, s2, s3, s4):
+        return [create_suggestion_status(suggestion_warmer.status(text)) for text in (s1, s2, s3, s4)]
+
     # Modify the clientside callback to target the chat-container
     app.clientside_callback(
         """
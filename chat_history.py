@@ -0,0 +1,212 @@
+import os
+import json
+import threading
+import time
+import logging
+from typing import Dict, Any, List
+from config import RESULT_STORE_DIR, CHAT_HISTORY_TTL
+from metrics import register_stats
+from utils import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+CREATE INDEX IF NOT EXISTS messages_created_at ON messages (created_at);
+"""
+
+# Expired sessions are pruned after this many appends
+PRUNE_EVERY = 200
+
+
+def _pending_record(request_id: str) -> Dict[str, Any]:
+    """Placeholder record of an answer being prepared for the request"""
+    return {"role": "pending", "request_id": request_id}
+
+
+class ChatHistory:
+    """
+    Server-side chat history, one ordered list of message records per browser session.
+
+    Records are small JSON dicts (role, text, result id, SQL, ...) from which the
+    chat is rendered, so the browser never has to send the conversation back.
+    Kept in SQLite next to the result store so every worker sees the same
+    history and it survives restarts; sessions idle for longer than ttl seconds
+    are pruned.
+    """
+
+    def __init__(self, directory: str = RESULT_STORE_DIR, ttl: float = CHAT_HISTORY_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._connection = ThreadLocalSQLite(os.path.join(directory, "chat.db"))
+        self._appends = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def append(self, session_id: str, record: Dict[str, Any]) -> int:
+        """
+        Append a message record to a session.
+
+        Returns:
+            Position of the message in the session's chat
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            position = connection.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            connection.execute(
+                "INSERT INTO messages VALUES (?, ?, ?, ?)",
+                (session_id, position, json.dumps(record), time.time())
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._appends += 1
+            prune = self._appends % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return position
+
+    def reserve(self, session_id: str, request_id: str) -> int:
+        """
+        Hold the next position for an answer that is still being prepared.
+
+        Returns:
+            Position to pass to fill() once the answer is ready
+        """
+        return self.append(session_id, _pending_record(request_id))
+
+    def fill(self, session_id: str, position: int, request_id: str, record: Dict[str, Any]) -> bool:
+        """
+        Write an answer at the position reserved for it by reserve().
+
+        Returns:
+            False if the reservation is gone, e.g. because the chat was cleared meanwhile
+        """
+        cursor = self._connection().execute(
+            "UPDATE messages SET record = ? WHERE session_id = ? AND position = ? AND record = ?",
+            (json.dumps(record), session_id, position, json.dumps(_pending_record(request_id)))
+        )
+        return cursor.rowcount > 0
+
+    def get(self, session_id: str) -> List[Dict[str, Any]]:
+        """All message records of a session, oldest first"""
+        rows = self._connection().execute(
+            "SELECT record FROM messages WHERE session_id = ? ORDER BY position", (session_id,)
+        ).fetchall()
+        return [json.loads(record) for (record,) in rows]
+
+    def replace_result(self, session_id: str, result_id: str, fields: Dict[str, Any]) -> int:
+        """
+        Point the answer parts showing result_id at a refreshed table.
+
+        Args:
+            session_id: The session
+            result_id: The table being replaced
+            fields: Table fields of the refreshed answer part (result_id, columns, ...)
+
+        Returns:
+            Number of messages updated
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT position, record FROM messages WHERE session_id = ? AND record LIKE ?",
+                (session_id, f"%{result_id}%")
+            ).fetchall()
+            for position, record in rows:
+                record = json.loads(record)
+                for part in record.get("parts", [record]):
+                    if part.get("result_id") == result_id:
+                        part.pop("rows_shown", None)
+                        part.pop("total_rows", None)
+                        part.update(fields)
+                connection.execute(
+                    "UPDATE messages SET record = ? WHERE session_id = ? AND position = ?",
+                    (json.dumps(record), session_id, position)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def record_feedback(self, session_id: str, events: List[Dict[str, Any]]) -> int:
+        """
+        Store a batch of thumbs up/down events on the rated bot messages.
+
+        Args:
+            session_id: The session
+            events: Dicts with the message "position" and its "rating" ("up",
+                "down" or None when cleared), oldest first
+
+        Returns:
+            Number of messages updated
+        """
+        # Only the last rating of each message in the batch counts
+        ratings = {event["position"]: event.get("rating") for event in events if isinstance(event.get("position"), int)}
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            updated = 0
+            for position, rating in ratings.items():
+                row = connection.execute(
+                    "SELECT record FROM messages WHERE session_id = ? AND position = ?", (session_id, position)
+                ).fetchone()
+                if row is None:
+                    continue
+                record = json.loads(row[0])
+                if rating in ("up", "down"):
+                    record["feedback"] = rating
+                else:
+                    record.pop("feedback", None)
+                connection.execute(
+                    "UPDATE messages SET record = ? WHERE session_id = ? AND position = ?",
+                    (json.dumps(record), session_id, position)
+                )
+                updated += 1
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return updated
+
+    def clear(self, session_id: str) -> None:
+        """Forget a session's chat"""
+        self._connection().execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def prune(self) -> int:
+        """Delete sessions without a new message for ttl seconds, returning the number of messages removed"""
+        cutoff = time.time() - self.ttl
+        cursor = self._connection().execute(
+            "DELETE FROM messages WHERE session_id IN "
+            "(SELECT session_id FROM messages GROUP BY session_id HAVING MAX(created_at) < ?)",
+            (cutoff,)
+        )
+        if cursor.rowcount:
+            logger.info(f"Pruned {cursor.rowcount} expired chat messages")
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        sessions, messages = self._connection().execute(
+            "SELECT COUNT(DISTINCT session_id), COUNT(*) FROM messages"
+        ).fetchone()
+        return {"sessions": sessions, "messages": messages, "ttl": self.ttl}
+
+
+chat_history = ChatHistory()
+
+register_stats("chat_history", chat_history.get_stats)
@@ -0,0 +1,169 @@
+import functools
+import threading
+import time
+import logging
+from typing import Dict, Any, Callable
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, CIRCUIT_HALF_OPEN_PROBES
+from metrics import register_stats
+from retry_policy import is_retryable
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit is open; calls are suspended for another {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service after a run of failures, then probes it before resuming.
+
+    Closed: calls go through; failure_threshold consecutive failures open the circuit.
+    Open: calls raise CircuitOpenError straight away for reset_timeout seconds.
+    Half-open: up to half_open_probes calls are let through as probes; once that
+    many succeed the circuit closes, and any failure opens it again.
+
+    Only signs of an unhealthy service count as failures: throttling, timeouts,
+    5xx responses and dropped connections (see retry_policy.is_retryable). Any
+    other outcome, including a 404, shows the service is answering.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT, half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(half_open_probes, 1)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0, "failures": 0, "probes": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        """State, moving from open to half-open once the reset timeout has passed; call with the lock held"""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"{self.name} circuit half-open; probing")
+        return self._state
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+        logger.warning(f"{self.name} circuit opened; failing fast for {self.reset_timeout:g}s")
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit lets a probe through (0 unless it is open)"""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or raise CircuitOpenError.
+
+        Returns:
+            True if the call is a half-open probe
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and self._probes_in_flight + self._probe_successes < self.half_open_probes:
+                self._probes_in_flight += 1
+                self._stats["probes"] += 1
+                return True
+            self._stats["rejected"] += 1
+            retry_in = max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0) if state == OPEN else 0.0
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self, probe: bool = False) -> None:
+        with self._lock:
+            if probe:
+                self._probes_in_flight -= 1
+                if self._state != HALF_OPEN:
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._state = CLOSED
+                    self._failures = 0
+                    logger.info(f"{self.name} circuit closed")
+            elif self._state == CLOSED:
+                self._failures = 0
+
+    def record_failure(self, probe: bool = False) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stats["failures"] += 1
+            if probe:
+                self._probes_in_flight -= 1
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._open()
+            elif state == CLOSED:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._open()
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Call func(*args, **kwargs) through the breaker"""
+        probe = self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_retryable(e):
+                self.record_failure(probe)
+            else:
+                self.record_success(probe)
+            raise
+        self.record_success(probe)
+        return result
+
+    def guard(self, func: Callable) -> Callable:
+        """Decorator running every call of func through the breaker"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return wrapper
+
+    def get_stats(self) -> Dict[str, Any]:
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                **self._stats,
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "retry_in": round(retry_in, 1)
+            }
+
+
+genie_circuit = CircuitBreaker("Genie")
+
+register_stats("circuit", genie_circuit.get_stats)
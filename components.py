@@ -1,7 +1,7 @@
-from dash import html, dcc, dash_table
+from dash import html, dcc, dash_table, get_relative_path
 import pandas as pd
-from config import DEFAULT_WELCOME_TITLE, DEFAULT_WELCOME_DESCRIPTION, DEFAULT_SUGGESTIONS
-from utils import format_sql_query
+from config import DEFAULT_WELCOME_TITLE, DEFAULT_WELCOME_DESCRIPTION, DEFAULT_SUGGESTIONS, RESULT_TABLE_PAGE_SIZE
+from utils import format_age
 
 def create_user_message(user_input):
     """Create a user message component"""
@@ -13,24 +13,43 @@ def create_user_message(user_input):
         html.Div(user_input, className="message-text")
     ], className="user-message message")
 
+# Friendly labels for the intermediate statuses Genie reports while answering
+GENIE_STATUS_LABELS = {
+    "QUEUED": "Waiting for a free slot...",
+    "SUBMITTED": "Sending your question...",
+    "FETCHING_METADATA": "Fetching metadata...",
+    "FILTERING_CONTEXT": "Finding relevant tables...",
+    "ASKING_AI": "Generating an answer...",
+    "PENDING_WAREHOUSE": "Waiting for the SQL warehouse...",
+    "EXECUTING_QUERY": "Executing query...",
+    "COMPLETED": "Fetching results..."
+}
+
+def create_thinking_content(status=None, partial_text=None):
+    """Create the children of the thinking indicator for a Genie status and any text received so far"""
+    content = [
+        html.Span(className="spinner"),
+        html.Span(GENIE_STATUS_LABELS.get(status, "Thinking..."))
+    ]
+    if partial_text:
+        content.append(dcc.Markdown(partial_text, className="message-text thinking-partial"))
+    return content
+
 def create_thinking_indicator():
     """Create a thinking indicator component"""
     return html.Div([
-        html.Div([
-            html.Span(className="spinner"),
-            html.Span("Thinking...")
-        ], className="thinking-indicator")
+        html.Div(create_thinking_content(), id="thinking-indicator", className="thinking-indicator")
     ], className="bot-message message")
 
-def create_data_table(df, table_id):
-    """Create a data table component"""
+def create_data_table(result_id, columns, data, page_count, page_size=RESULT_TABLE_PAGE_SIZE):
+    """Create a data table component showing one page of a server-side result"""
     return dash_table.DataTable(
-        id=table_id,
-        data=df.to_dict('records'),
-        columns=[{"name": i, "id": i} for i in df.columns],
+        id={"type": "result-table", "index": result_id},
+        data=data,
+        columns=[{"name": i, "id": i} for i in columns],
         
         # Other table properties
-        page_size=10,
+        page_size=page_size,
         style_table={
             'display': 'inline-block',
             'overflowX': 'auto',
@@ -57,16 +76,42 @@ def create_data_table(df, table_id):
         },
         fill_width=False,
         page_current=0,
-        page_action='native'
+        page_count=page_count,
+        # Paging, sorting and filtering run server-side against the stored result
+        page_action='custom',
+        sort_action='custom',
+        sort_mode='multi',
+        filter_action='custom'
     )
 
+def create_export_links(result_id):
+    """Create the download links for a server-side result"""
+    return html.Div([
+        html.A("Download CSV", href=get_relative_path(f"/export/{result_id}.csv"), className="export-link"),
+        html.A("Download Parquet", href=get_relative_path(f"/export/{result_id}.parquet"), className="export-link")
+    ], className="export-links")
+
+def create_refresh_control(slot, result_id):
+    """Create the button that re-runs a result's SQL, with a line for its outcome"""
+    return html.Div([
+        html.Button("Refresh data", id={"type": "refresh-table", "index": slot}, value=result_id,
+                    className="refresh-data-button"),
+        html.Span(id={"type": "refresh-status", "index": slot}, className="refresh-status")
+    ], className="refresh-control")
+
+def create_sql_code(formatted_sql):
+    """Create the code block showing a formatted SQL query"""
+    return html.Pre([
+        html.Code(formatted_sql, className="sql-code")
+    ], className="sql-pre")
+
 def create_query_section(query_text, query_index):
     """Create a query section component"""
     if query_text is None:
         return None
     
-    formatted_sql = format_sql_query(query_text)
-    
+    # The code block stays empty until "Show code" is first clicked: the clientside toggle
+    # callback in callbacks.py sets query-format-request, and format_query_code fills it in
     return html.Div([
         html.Div([
             html.Button([
@@ -76,17 +121,46 @@ def create_query_section(query_text, query_index):
             className="toggle-query-button",
             n_clicks=0)
         ], className="toggle-query-container"),
-        html.Div([
-            html.Pre([
-                html.Code(formatted_sql, className="sql-code")
-            ], className="sql-pre")
-        ], 
+        dcc.Store(id={"type": "query-sql", "index": query_index}, data=query_text),
+        dcc.Store(id={"type": "query-format-request", "index": query_index}),
+        html.Div([], 
         id={"type": "query-code", "index": query_index}, 
         className="query-code-container hidden")
     ], id={"type": "query-section", "index": query_index}, className="query-section")
 
-def create_bot_response(content, chat_history_index):
-    """Create a bot response component"""
+def create_similar_question_note(similar_question):
+    """Create the note shown above an answer reused from a similar earlier question"""
+    return html.Div(
+        f'Similar question: answer reused from "{similar_question}"',
+        className="similar-question-note"
+    )
+
+def create_prepared_note(age):
+    """Create the note shown above a suggestion answer served from the pre-computed cache"""
+    return html.Div(f"Pre-computed answer, updated {format_age(age)}", className="prepared-answer-note")
+
+def create_suggestion_status(status):
+    """Create the readiness label of a suggestion button"""
+    state = status.get("state")
+    if state in ("ready", "stale"):
+        text = f"Ready · {format_age(status['age'])}"
+        if status.get("warming"):
+            text += " · updating"
+    elif state == "warming":
+        text = "Preparing answer..."
+    else:
+        return None
+    return html.Span(text, className=f"suggestion-status {state}")
+
+def create_truncation_note(rows_shown, total_rows):
+    """Create the note shown above a result that was cut off because it is too large"""
+    return html.Div(
+        f"Showing the first {rows_shown:,} of {total_rows:,} rows.",
+        className="truncation-note"
+    )
+
+def create_bot_response(content, chat_history_index, feedback=None):
+    """Create a bot response component, with the thumbs button of an earlier rating active"""
     return html.Div([
         html.Div([
             html.Div(className="model-avatar"),
@@ -100,13 +174,13 @@ def create_bot_response(content, chat_history_index):
                         html.Img(src="/assets/thumbs_up_icon.svg", alt="Thumbs up")
                     ],
                         id={"type": "thumbs-up-button", "index": chat_history_index},
-                        className="thumbs-up-button"
+                        className="thumbs-up-button active" if feedback == "up" else "thumbs-up-button"
                     ),
                     html.Button([
                         html.Img(src="/assets/thumbs_down_icon.svg", alt="Thumbs down")
                     ],
                         id={"type": "thumbs-down-button", "index": chat_history_index},
-                        className="thumbs-down-button"
+                        className="thumbs-down-button active" if feedback == "down" else "thumbs-down-button"
                     )
                 ], className="message-actions")
             ], className="message-footer")
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 # Default welcome text that can be customized
 DEFAULT_WELCOME_TITLE = "Power BI Dashboard Assistant"
@@ -16,4 +17,100 @@ DEFAULT_SUGGESTIONS = [
 DATABRICKS_HOST = os.getenv('DATABRICKS_HOST')
 
 # Power BI configuration
-POWERBI_EMBED_URL = os.getenv('POWERBI_EMBED_URL', 'https://app.powerbi.com/reportEmbed?reportId=25baf2c4-2cc6-434d-94c1-157650590c23&autoAuth=true&ctid=9f37a392-f0ae-4280-9796-f1864a10effc') 
\ No newline at end of file
+POWERBI_EMBED_URL = os.getenv('POWERBI_EMBED_URL', 'https://app.powerbi.com/reportEmbed?reportId=25baf2c4-2cc6-434d-94c1-157650590c23&autoAuth=true&ctid=9f37a392-f0ae-4280-9796-f1864a10effc')
+
+# HTTP connection pool configuration (shared by GenieClient and TokenMinter)
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))    # Number of per-host pools to keep
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '32'))           # Max open connections per host
+HTTP_POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', 'false').lower() == 'true'  # Wait for a free connection instead of opening extras
+HTTP_KEEPALIVE_IDLE = int(os.getenv('HTTP_KEEPALIVE_IDLE', '60'))       # Seconds before TCP keep-alive probes start (0 disables)
+HTTP_KEEPALIVE_INTERVAL = int(os.getenv('HTTP_KEEPALIVE_INTERVAL', '15'))  # Seconds between keep-alive probes
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))    # Seconds to establish a connection
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '60'))         # Seconds to wait for response bytes
+
+# OAuth token configuration
+TOKEN_REFRESH_MARGIN = float(os.getenv('TOKEN_REFRESH_MARGIN', '300'))          # Seconds before expiry that the background refresher renews the token
+TOKEN_RETRY_INTERVAL = float(os.getenv('TOKEN_RETRY_INTERVAL', '5'))            # Seconds before retrying a failed renewal (doubles each time)
+TOKEN_MAX_RETRY_INTERVAL = float(os.getenv('TOKEN_MAX_RETRY_INTERVAL', '60'))   # Cap on the retry interval
+TOKEN_DEFAULT_LIFETIME = float(os.getenv('TOKEN_DEFAULT_LIFETIME', '3600'))     # Assumed lifetime when the token response has no expires_in
+
+# Retry configuration (GenieClient API calls)
+RETRY_MAX_TRIES = int(os.getenv('RETRY_MAX_TRIES', '5'))                        # Attempts per call, including the first
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '2'))                    # Backoff ceiling for the first retry in seconds (doubles each time, fully jittered)
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '30'))                     # Cap on a single backoff
+RETRY_MAX_ELAPSED = float(os.getenv('RETRY_MAX_ELAPSED', '60'))                 # Seconds after which a call stops retrying (a longer Retry-After also ends it)
+RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.2'))              # Retries earned per call, process-wide
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv('RETRY_BUDGET_MIN_PER_SECOND', '0.5'))  # Retries earned per second regardless of traffic
+RETRY_BUDGET_CAPACITY = float(os.getenv('RETRY_BUDGET_CAPACITY', '10'))         # Most retries that can be saved up for a burst
+
+# Circuit breaker configuration (GenieClient API calls)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))    # Consecutive failed attempts that open the circuit (0 disables it)
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))         # Seconds the circuit stays open before probing Genie again
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', '2'))      # Successful probes needed to close it again
+
+# Admission control configuration (new Genie questions, per worker)
+ADMISSION_RATE_PER_MINUTE = float(os.getenv('ADMISSION_RATE_PER_MINUTE', '20'))  # Questions sent to Genie per minute (0 disables the rate limit)
+ADMISSION_BURST = float(os.getenv('ADMISSION_BURST', '3'))                        # Questions that may be sent back to back after a quiet spell
+ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '8'))        # Questions Genie may be answering at once (0 disables the limit)
+ADMISSION_DEFAULT_DURATION = float(os.getenv('ADMISSION_DEFAULT_DURATION', '20'))  # Initial guess of seconds per answer, for wait estimates
+
+# Async runtime configuration
+ASYNC_IO_WORKERS = int(os.getenv('ASYNC_IO_WORKERS', str(HTTP_POOL_MAXSIZE)))  # Threads available for blocking HTTP calls from the event loop
+
+# Shared message poller configuration
+POLLER_POLL_INTERVAL = float(os.getenv('POLLER_POLL_INTERVAL', '2'))                  # Seconds between status checks of one message
+POLLER_MAX_CONCURRENT_POLLS = int(os.getenv('POLLER_MAX_CONCURRENT_POLLS', '16'))     # get_message calls allowed in flight at once
+POLLER_MAX_POLLS_PER_SECOND = float(os.getenv('POLLER_MAX_POLLS_PER_SECOND', '20'))   # Polls are spaced out to stay under this rate
+
+# Polling schedule configuration
+POLL_STRATEGY = os.getenv('POLL_STRATEGY', 'adaptive')                           # 'adaptive' or 'fixed' (uses POLLER_POLL_INTERVAL)
+POLL_INITIAL_INTERVAL = float(os.getenv('POLL_INITIAL_INTERVAL', '0.5'))         # Seconds before the first status checks
+POLL_BACKOFF_FACTOR = float(os.getenv('POLL_BACKOFF_FACTOR', '1.5'))             # Growth of the interval after each poll
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', '4'))                   # Cap on the interval
+POLL_QUERY_BACKOFF_FACTOR = float(os.getenv('POLL_QUERY_BACKOFF_FACTOR', '2'))   # Extra multiplier while the warehouse runs the SQL
+
+# Background callback job configuration
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', '8'))                           # Background callbacks allowed to run at once
+JOB_CACHE_DIR = os.getenv('JOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'genie-jobs'))  # Where job results and progress are kept
+
+# Answer cache configuration
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '3600'))        # Seconds an answer stays fresh (0 disables the cache)
+ANSWER_CACHE_MAX_MB = float(os.getenv('ANSWER_CACHE_MAX_MB', '256'))   # Memory budget before least recently used answers are evicted
+ANSWER_REFRESH_AFTER = float(os.getenv('ANSWER_REFRESH_AFTER', '900'))  # Seconds before a cached table answer is re-run in the background (0 disables)
+
+# Feedback configuration
+FEEDBACK_FLUSH_INTERVAL = int(os.getenv('FEEDBACK_FLUSH_INTERVAL', '5'))   # Seconds between sends of queued thumbs up/down clicks
+
+# SQL formatting configuration
+SQL_FORMAT_CACHE_SIZE = int(os.getenv('SQL_FORMAT_CACHE_SIZE', '256'))   # Formatted queries memoized by raw SQL text
+
+# Suggestion warming configuration
+SUGGESTION_WARM_INTERVAL = float(os.getenv('SUGGESTION_WARM_INTERVAL', '1800'))   # Seconds between re-computing suggestion answers (0 disables); keep below ANSWER_CACHE_TTL
+SUGGESTION_RETRY_DELAY = float(os.getenv('SUGGESTION_RETRY_DELAY', '60'))   # First wait before re-trying suggestions that failed to warm, doubling up to the warm interval
+SUGGESTION_MAX_EDITED = int(os.getenv('SUGGESTION_MAX_EDITED', '20'))   # Edited suggestions kept warm on top of the defaults, most recent first
+SUGGESTION_STATUS_INTERVAL = int(os.getenv('SUGGESTION_STATUS_INTERVAL', '30'))   # Seconds between updates of the suggestion readiness labels
+
+# Similar question matching configuration
+SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', '0.88'))     # Cosine similarity needed to reuse an answer (above 1 disables)
+SIMILARITY_DIM = int(os.getenv('SIMILARITY_DIM', '256'))                     # Hashed feature dimensions per question; lookups scale with it (about 1.8 ms at 30k questions for 256, 0.7 ms for 64)
+SIMILARITY_MAX_ENTRIES = int(os.getenv('SIMILARITY_MAX_ENTRIES', '50000'))   # Questions kept in the index before the oldest are dropped
+
+# Persistent result store configuration (shared by all workers on the host)
+RESULT_STORE_DIR = os.getenv('RESULT_STORE_DIR', os.path.join(tempfile.gettempdir(), 'genie-results'))  # SQLite index plus Parquet files
+RESULT_STORE_MAX_MB = float(os.getenv('RESULT_STORE_MAX_MB', '1024'))   # Disk budget before least recently used results are evicted (0 disables)
+RESULT_TABLE_CACHE_MB = float(os.getenv('RESULT_TABLE_CACHE_MB', '256'))  # Memory for result tables currently being paged through
+RESULT_TABLE_PAGE_SIZE = int(os.getenv('RESULT_TABLE_PAGE_SIZE', '10'))  # Rows sent to the browser per table page
+
+# Chat history configuration
+CHAT_HISTORY_TTL = int(os.getenv('CHAT_HISTORY_TTL', '604800'))   # Seconds an idle session's chat is kept on the server
+
+# Result decoding configuration
+RESULT_ARROW_DTYPES = os.getenv('RESULT_ARROW_DTYPES', 'false').lower() == 'true'   # Back typed result columns with Arrow arrays
+RESULT_DECIMAL_OBJECTS = os.getenv('RESULT_DECIMAL_OBJECTS', 'false').lower() == 'true'   # Keep DECIMAL columns as Python Decimal objects instead of compact Arrow decimal128
+RESULT_CATEGORY_RATIO = float(os.getenv('RESULT_CATEGORY_RATIO', '0.5'))   # Text columns with at most this share of distinct values become categorical
+RESULT_FETCH_CONCURRENCY = int(os.getenv('RESULT_FETCH_CONCURRENCY', '4'))   # Result chunks downloaded in parallel per answer
+RESULT_MAX_ROWS = int(os.getenv('RESULT_MAX_ROWS', '500000'))   # Rows kept per answer; larger results are truncated
+RESULT_MAX_MB = float(os.getenv('RESULT_MAX_MB', '256'))   # Raw result size fetched per answer before truncating
+
+# Export configuration
+EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', '50000'))   # Rows converted per CSV chunk when streaming an export
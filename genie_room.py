@@ -1,35 +1,150 @@
 import pandas as pd
-import time
-import requests
+import asyncio
+import functools
 import os
+import threading
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional, List, Union, Tuple
+from typing import Dict, Any, Optional, List, NamedTuple, Union, Tuple, Callable
 import logging
-import backoff
+import time
 import uuid
 from token_minter import TokenMinter
+from http_client import get_session, DEFAULT_TIMEOUT
+from async_runtime import run_sync, run_sync_with_updates, run_blocking
+from message_poller import get_message_poller
+from polling import PollingStrategy, FixedPollingStrategy, get_default_strategy
+from answer_cache import answer_cache, normalize_question
+from similarity_index import get_similarity_index
+from single_flight import genie_requests, answer_refreshes
+from result_store import result_store
+from result_fetcher import fetch_result_frame
+from retry_policy import retrying, retry_deadline, error_status
+from circuit_breaker import genie_circuit, CircuitOpenError
+from admission import genie_admission
+from config import ANSWER_REFRESH_AFTER
+from metrics import register_stats
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
 
-# Load environment variables
-SPACE_ID = os.environ.get("SPACE_ID")
-DATABRICKS_HOST = os.environ.get("DATABRICKS_HOST")
-CLIENT_ID = os.environ.get("DATABRICKS_CLIENT_ID")
-CLIENT_SECRET = os.environ.get("DATABRICKS_CLIENT_SECRET")
+class GenieSettings(NamedTuple):
+    """Genie space and service principal credentials, read from the environment (and .env)"""
+    space_id: Optional[str]
+    host: Optional[str]
+    client_id: Optional[str]
+    client_secret: Optional[str]
+
+
+@functools.lru_cache(maxsize=None)
+def get_settings() -> GenieSettings:
+    """Load .env and read the Genie settings on first use rather than at import"""
+    load_dotenv(override=True)
+    return GenieSettings(
+        space_id=os.environ.get("SPACE_ID"),
+        host=os.environ.get("DATABRICKS_HOST"),
+        client_id=os.environ.get("DATABRICKS_CLIENT_ID"),
+        client_secret=os.environ.get("DATABRICKS_CLIENT_SECRET")
+    )
+
+def get_space_id() -> Optional[str]:
+    """The configured Genie space"""
+    return get_settings().space_id
+
+
+_token_minter: Optional[TokenMinter] = None
+_token_minter_lock = threading.Lock()
 
-token_minter = TokenMinter(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET,
-    host=DATABRICKS_HOST
-)
+def get_token_minter() -> TokenMinter:
+    """
+    The process-wide TokenMinter, created (with its first OAuth call) on first use.
+    
+    Importing this module therefore never touches the network; see warm_up() to
+    pay for the first token before the first question instead.
+    """
+    global _token_minter
+    if _token_minter is None:
+        with _token_minter_lock:
+            if _token_minter is None:
+                settings = get_settings()
+                minter = TokenMinter(
+                    client_id=settings.client_id,
+                    client_secret=settings.client_secret,
+                    host=settings.host
+                )
+                register_stats("token", minter.get_stats)
+                _token_minter = minter
+    return _token_minter
+
+# Former module-level settings, still importable by name but resolved lazily
+_LAZY_ATTRIBUTES = {
+    "SPACE_ID": get_space_id,
+    "DATABRICKS_HOST": lambda: get_settings().host,
+    "CLIENT_ID": lambda: get_settings().client_id,
+    "CLIENT_SECRET": lambda: get_settings().client_secret,
+    "token_minter": get_token_minter,
+}
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up() -> None:
+    """Read the settings, mint the first token and open a client, so the first question does not pay for them"""
+    try:
+        GenieClient(host=get_settings().host, space_id=get_space_id())
+        logger.info("Genie client warmed up")
+    except Exception as e:
+        # Not fatal: the first request initializes lazily and reports the error to the user
+        logger.warning(f"Genie warm-up failed: {str(e)}")
+
+def warm_up_in_background() -> threading.Thread:
+    """Run warm_up() on a daemon thread, letting the server start listening meanwhile"""
+    thread = threading.Thread(target=warm_up, name="genie-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+NO_RESULTS_MESSAGE = "No results found for your query. Please try refining your search criteria or check if the data you're looking for exists in the database."
+
+def unavailable_message(error: CircuitOpenError) -> str:
+    """What the user is told while the circuit breaker keeps requests away from Genie"""
+    wait = f"in about {max(int(error.retry_in + 0.999), 1)} seconds" if error.retry_in else "in a few moments"
+    return ("Genie is not responding reliably right now, so new questions are paused to let it recover. "
+            f"Please try again {wait}.")
+
+class FailedPart(str):
+    """Text shown in place of an answer part that could not be fetched; answers containing one are never cached"""
+
+# Statement states while the warehouse is still running a query
+RUNNING_STATEMENT_STATES = ("PENDING", "RUNNING")
+
+
+def _statement_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a query-result or execute-query response into the payload result_fetcher.py consumes"""
+    # Extract data_array from the correct nested location
+    statement_response = result.get('statement_response', {})
+    first_chunk = statement_response.get('result', {})
+    manifest = statement_response.get('manifest', {})
+    status = statement_response.get('status', {})
+        
+    # The first chunk only; see result_fetcher.py for fetching the rest
+    return {
+                'data_array': first_chunk.get('data_array', []),
+                'schema': manifest.get('schema', {}),
+                'statement_id': statement_response.get('statement_id'),
+                'manifest': manifest,
+                'next_chunk_index': first_chunk.get('next_chunk_index'),
+                'external_links': first_chunk.get('external_links', []),
+                'state': status.get('state'),
+                'error': status.get('error', {}).get('message')
+            }
 
 
 class GenieClient:
     def __init__(self, host: str, space_id: str):
         self.host = host
         self.space_id = space_id
+        self.session = get_session()
         self.update_headers()
         
         self.base_url = f"https://{host}/api/2.0/genie/spaces/{space_id}"
@@ -37,155 +152,258 @@ class GenieClient:
     def update_headers(self) -> None:
         """Update headers with fresh token from token_minter"""
         self.headers = {
-            "Authorization": f"Bearer {token_minter.get_token()}",
+            "Authorization": f"Bearer {get_token_minter().get_token()}",
             "Content-Type": "application/json"
         }
     
-    @backoff.on_exception(
-        backoff.expo,
-        Exception,  
-        max_tries=5,
-        factor=2,
-        jitter=backoff.full_jitter,
-        on_backoff=lambda details: logger.warning(
-            f"API request failed. Retrying in {details['wait']:.2f} seconds (attempt {details['tries']})"
-        )
-    )
+    @retrying("start_conversation", idempotent=False)
+    @genie_circuit.guard
     def start_conversation(self, question: str) -> Dict[str, Any]:
         """Start a new conversation with the given question"""
         self.update_headers()  # Refresh token before API call
         url = f"{self.base_url}/start-conversation"
         payload = {"content": question}
         
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.session.post(url, headers=self.headers, json=payload, timeout=DEFAULT_TIMEOUT)
         response.raise_for_status()
         return response.json()
     
-    @backoff.on_exception(
-        backoff.expo,
-        Exception,  # Retry on any exception
-        max_tries=5,
-        factor=2,
-        jitter=backoff.full_jitter,
-        on_backoff=lambda details: logger.warning(
-            f"API request failed. Retrying in {details['wait']:.2f} seconds (attempt {details['tries']})"
-        )
-    )
+    @retrying("send_message", idempotent=False)
+    @genie_circuit.guard
     def send_message(self, conversation_id: str, message: str) -> Dict[str, Any]:
         """Send a follow-up message to an existing conversation"""
         self.update_headers()  # Refresh token before API call
         url = f"{self.base_url}/conversations/{conversation_id}/messages"
         payload = {"content": message}
         
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.session.post(url, headers=self.headers, json=payload, timeout=DEFAULT_TIMEOUT)
         response.raise_for_status()
         return response.json()
 
-    @backoff.on_exception(
-        backoff.expo,
-        Exception,  # Retry on any exception
-        max_tries=5,
-        factor=2,
-        jitter=backoff.full_jitter,
-        on_backoff=lambda details: logger.warning(
-            f"API request failed. Retrying in {details['wait']:.2f} seconds (attempt {details['tries']})"
-        )
-    )
+    @retrying("get_message")
+    @genie_circuit.guard
     def get_message(self, conversation_id: str, message_id: str) -> Dict[str, Any]:
         """Get the details of a specific message"""
         self.update_headers()  # Refresh token before API call
         url = f"{self.base_url}/conversations/{conversation_id}/messages/{message_id}"
         
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers, timeout=DEFAULT_TIMEOUT)
         response.raise_for_status()
         return response.json()
 
-    @backoff.on_exception(
-        backoff.expo,
-        Exception,  # Retry on any exception
-        max_tries=5,
-        factor=2,
-        jitter=backoff.full_jitter,
-        on_backoff=lambda details: logger.warning(
-            f"API request failed. Retrying in {details['wait']:.2f} seconds (attempt {details['tries']})"
-        )
-    )
+    @retrying("get_query_result")
+    @genie_circuit.guard
     def get_query_result(self, conversation_id: str, message_id: str, attachment_id: str) -> Dict[str, Any]:
         """Get the query result using the attachment_id endpoint"""
         self.update_headers()  # Refresh token before API call
         url = f"{self.base_url}/conversations/{conversation_id}/messages/{message_id}/attachments/{attachment_id}/query-result"
         
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers, timeout=DEFAULT_TIMEOUT)
         response.raise_for_status()
-        result = response.json()
+        return _statement_result(response.json())
+
+    @retrying("get_result_chunk")
+    @genie_circuit.guard
+    def get_result_chunk(self, statement_id: str, chunk_index: int) -> Dict[str, Any]:
+        """Get one chunk of a statement result (inline data_array or external_links)"""
+        self.update_headers()  # Refresh token before API call
+        url = f"https://{self.host}/api/2.0/sql/statements/{statement_id}/result/chunks/{chunk_index}"
         
-        # Extract data_array from the correct nested location
-        data_array = []
-        if 'statement_response' in result:
-            if 'result' in result['statement_response']:
-                data_array = result['statement_response']['result'].get('data_array', [])
-            
-        return {
-                    'data_array': data_array,
-                    'schema': result.get('statement_response', {}).get('manifest', {}).get('schema', {})
-                }
+        response = self.session.get(url, headers=self.headers, timeout=DEFAULT_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
 
-    @backoff.on_exception(
-        backoff.expo,
-        Exception,  # Retry on any exception
-        max_tries=5,
-        factor=2,
-        jitter=backoff.full_jitter,
-        on_backoff=lambda details: logger.warning(
-            f"API request failed. Retrying in {details['wait']:.2f} seconds (attempt {details['tries']})"
-        )
-    )
+    @retrying("fetch_external_link")
+    def fetch_external_link(self, url: str) -> List[List[Optional[str]]]:
+        """Download the rows behind a presigned external link (JSON_ARRAY format)"""
+        # Presigned URLs must not receive the workspace token
+        response = self.session.get(url, timeout=DEFAULT_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    @retrying("execute_query", idempotent=False)
+    @genie_circuit.guard
     def execute_query(self, conversation_id: str, message_id: str, attachment_id: str) -> Dict[str, Any]:
         """Execute a query using the attachment_id endpoint"""
         self.update_headers()  # Refresh token before API call
         url = f"{self.base_url}/conversations/{conversation_id}/messages/{message_id}/attachments/{attachment_id}/execute-query"
         
-        response = requests.post(url, headers=self.headers)
+        response = self.session.post(url, headers=self.headers, timeout=DEFAULT_TIMEOUT)
         response.raise_for_status()
         return response.json()
     
 
-    def wait_for_message_completion(self, conversation_id: str, message_id: str, timeout: int = 300, poll_interval: int = 2) -> Dict[str, Any]:
+    def wait_for_message_completion(self, conversation_id: str, message_id: str, timeout: int = 300,
+                                    poll_interval: Optional[float] = None,
+                                    strategy: Optional[PollingStrategy] = None) -> Dict[str, Any]:
         """
         Wait for a message to reach a terminal state (COMPLETED, ERROR, etc.).
         
+        The message is handed to the shared MessagePoller for this space, which
+        polls all in-flight messages on one schedule.
+        
         Args:
             conversation_id: The ID of the conversation
             message_id: The ID of the message
             timeout: Maximum time to wait in seconds
-            poll_interval: Time between status checks in seconds
+            poll_interval: Fixed time between status checks in seconds; overrides the adaptive schedule
+            strategy: Polling schedule to use, defaults to the poller's strategy
             
         Returns:
             The completed message
         """
+        poller = get_message_poller(AsyncGenieClient(self.host, self.space_id, client=self))
+        if poll_interval is not None:
+            strategy = FixedPollingStrategy(poll_interval)
+        return poller.register_threadsafe(conversation_id, message_id, timeout, strategy).result()
+
+class AsyncGenieClient:
+    """
+    Asyncio counterpart of GenieClient.
+
+    HTTP calls go through the wrapped GenieClient (same pooled session and retry
+    policy) on the shared I/O thread pool, while waiting between polls is done
+    with asyncio.sleep so no thread is held while Genie is working.
+    """
+    def __init__(self, host: str, space_id: str, client: Optional[GenieClient] = None):
+        self.host = host
+        self.space_id = space_id
+        self.client = client or GenieClient(host=host, space_id=space_id)
+
+    @classmethod
+    async def create(cls, host: str, space_id: str) -> "AsyncGenieClient":
+        """Build a client without blocking the event loop on the initial token fetch"""
+        client = await run_blocking(GenieClient, host, space_id)
+        return cls(host=host, space_id=space_id, client=client)
+
+    async def start_conversation(self, question: str) -> Dict[str, Any]:
+        """Start a new conversation with the given question"""
+        return await run_blocking(self.client.start_conversation, question)
+
+    async def send_message(self, conversation_id: str, message: str) -> Dict[str, Any]:
+        """Send a follow-up message to an existing conversation"""
+        return await run_blocking(self.client.send_message, conversation_id, message)
+
+    async def get_message(self, conversation_id: str, message_id: str) -> Dict[str, Any]:
+        """Get the details of a specific message"""
+        return await run_blocking(self.client.get_message, conversation_id, message_id)
+
+    async def get_query_result(self, conversation_id: str, message_id: str, attachment_id: str) -> Dict[str, Any]:
+        """Get the query result using the attachment_id endpoint"""
+        return await run_blocking(self.client.get_query_result, conversation_id, message_id, attachment_id)
+
+    async def get_result_chunk(self, statement_id: str, chunk_index: int) -> Dict[str, Any]:
+        """Get one chunk of a statement result"""
+        return await run_blocking(self.client.get_result_chunk, statement_id, chunk_index)
+
+    async def fetch_external_link(self, url: str) -> List[List[Optional[str]]]:
+        """Download the rows behind a presigned external link"""
+        return await run_blocking(self.client.fetch_external_link, url)
+
+    async def execute_query(self, conversation_id: str, message_id: str, attachment_id: str) -> Dict[str, Any]:
+        """Execute a query using the attachment_id endpoint"""
+        return await run_blocking(self.client.execute_query, conversation_id, message_id, attachment_id)
+
+    async def wait_for_message_completion(self, conversation_id: str, message_id: str, timeout: int = 300,
+                                          poll_interval: Optional[float] = None,
+                                          strategy: Optional[PollingStrategy] = None,
+                                          on_status: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Wait for a message to reach a terminal state (COMPLETED, ERROR, etc.).
         
-        start_time = time.time()
-        attempt = 1
+        The message is handed to the shared MessagePoller for this space, which
+        polls all in-flight messages on one schedule.
         
-        while time.time() - start_time < timeout:
-            
-            message = self.get_message(conversation_id, message_id)
-            status = message.get("status")
+        Args:
+            conversation_id: The ID of the conversation
+            message_id: The ID of the message
+            timeout: Maximum time to wait in seconds
+            poll_interval: Fixed time between status checks in seconds; overrides the adaptive schedule
+            strategy: Polling schedule to use, defaults to the poller's strategy
+            on_status: Called with (status, message) each time the reported status changes
             
-            if status in ["COMPLETED", "ERROR", "FAILED"]:
-                return message
-                
-            time.sleep(poll_interval)
-            attempt += 1
+        Returns:
+            The completed message
+        """
+        if poll_interval is not None:
+            strategy = FixedPollingStrategy(poll_interval)
+        return await get_message_poller(self).wait(conversation_id, message_id, timeout, strategy, on_status)
+
+def _attachment_text(message: Dict[str, Any]) -> Optional[str]:
+    """Return the content of the message's first text attachment, if it has one"""
+    for attachment in message.get("attachments") or []:
+        if "text" in attachment and "content" in attachment["text"]:
+            return attachment["text"]["content"]
+    return None
+
+def _status_listener(on_status: Optional[Callable[[str, Optional[str]], None]]):
+    """Adapt an on_status(status, text) callback to the poller's (status, message) listener"""
+    if on_status is None:
+        return None
+    
+    def listener(status: str, message: Dict[str, Any]) -> None:
+        on_status(status, _attachment_text(message))
+    return listener
+
+def _queue_listener(on_status: Optional[Callable[[str, Optional[str]], None]]):
+    """Adapt an on_status(status, text) callback to the admission controller's (position, eta) listener"""
+    if on_status is None:
+        return None
+    
+    def listener(position: int, eta: float) -> None:
+        wait = f"{max(int(eta + 0.999), 1)}s" if eta < 60 else f"{int(eta // 60 + 1)} min"
+        on_status("QUEUED", f"You are number {position} in line (estimated wait: about {wait}).")
+    return listener
+
+async def _start_conversation_async(question: str, on_status: Optional[Callable[[str, Optional[str]], None]] = None,
+                                   session_id: Optional[str] = None) -> Tuple[Optional[str], Optional[str], Union[str, pd.DataFrame], Optional[str]]:
+    """
+    start_new_conversation_async, also reporting the message's terminal status.
+    
+    Returns:
+        (conversation_id, status, response, query_text); status is the message's
+        final status ("COMPLETED", "FAILED", ...), or None if the request failed
+    """
+    try:
+        client = await AsyncGenieClient.create(
+            host=get_settings().host,
+            space_id=get_space_id()
+        )
+        
+        # Wait for admission, then hold the slot until Genie has answered
+        async with genie_admission.slot(session_id, _queue_listener(on_status)):
+            # Start a new conversation
+            response = await client.start_conversation(question)
+            conversation_id = response.get("conversation_id")
+            message_id = response.get("message_id")
             
-        raise TimeoutError(f"Message processing timed out after {timeout} seconds")
+            # Wait for the message to complete
+            complete_message = await client.wait_for_message_completion(
+                conversation_id, message_id, on_status=_status_listener(on_status)
+            )
+        
+        # Process the response
+        result, query_text = await process_genie_response_async(client, conversation_id, message_id, complete_message)
+        
+        return conversation_id, complete_message.get("status"), result, query_text
+        
+    except CircuitOpenError:
+        # Reported as "unavailable" by genie_query_detailed_async rather than as an error
+        raise
+    except Exception as e:
+        return None, None, f"Sorry, an error occurred: {str(e)}. Please try again.", None
 
-def start_new_conversation(question: str) -> Tuple[str, Union[str, pd.DataFrame], Optional[str]]:
+async def start_new_conversation_async(question: str, on_status: Optional[Callable[[str, Optional[str]], None]] = None,
+                                      session_id: Optional[str] = None) -> Tuple[str, Union[str, pd.DataFrame], Optional[str]]:
     """
     Start a new conversation with Genie.
     
     Args:
         question: The initial question
+        on_status: Optional callback receiving (status, text) whenever Genie reports a
+            new status; text is the answer's text attachment once one is available.
+            While the question waits for admission it gets ("QUEUED", position and wait)
+        session_id: Browser session asking, for fair queueing (see admission.py)
         
     Returns:
         Tuple containing:
@@ -193,36 +411,22 @@ def start_new_conversation(question: str) -> Tuple[str, Union[str, pd.DataFrame]
         - response: Either text or DataFrame response
         - query_text: SQL query text if applicable, otherwise None
     """
-    
-    client = GenieClient(
-        host=DATABRICKS_HOST,
-        space_id=SPACE_ID
-    )
-    
     try:
-        # Start a new conversation
-        response = client.start_conversation(question)
-        conversation_id = response.get("conversation_id")
-        message_id = response.get("message_id")
-        
-        # Wait for the message to complete
-        complete_message = client.wait_for_message_completion(conversation_id, message_id)
-        
-        # Process the response
-        result, query_text = process_genie_response(client, conversation_id, message_id, complete_message)
-        
-        return conversation_id, result, query_text
-        
-    except Exception as e:
-        return None, f"Sorry, an error occurred: {str(e)}. Please try again.", None
+        conversation_id, _, result, query_text = await _start_conversation_async(question, on_status, session_id)
+    except CircuitOpenError as e:
+        return None, unavailable_message(e), None
+    return conversation_id, result, query_text
 
-def continue_conversation(conversation_id: str, question: str) -> Tuple[Union[str, pd.DataFrame], Optional[str]]:
+async def continue_conversation_async(conversation_id: str, question: str, on_status: Optional[Callable[[str, Optional[str]], None]] = None,
+                                      session_id: Optional[str] = None) -> Tuple[Union[str, pd.DataFrame], Optional[str]]:
     """
     Send a follow-up message in an existing conversation.
     
     Args:
         conversation_id: The existing conversation ID
         question: The follow-up question
+        on_status: Optional callback receiving (status, text), see start_new_conversation_async
+        session_id: Browser session asking, for fair queueing
         
     Returns:
         Tuple containing:
@@ -231,27 +435,33 @@ def continue_conversation(conversation_id: str, question: str) -> Tuple[Union[st
     """
     logger.info(f"Continuing conversation {conversation_id} with question: {question[:30]}...")
     
-    client = GenieClient(
-        host=DATABRICKS_HOST,
-        space_id=SPACE_ID
-    )
-    
     try:
-        # Send follow-up message in existing conversation
-        response = client.send_message(conversation_id, question)
-        message_id = response.get("message_id")
+        client = await AsyncGenieClient.create(
+            host=get_settings().host,
+            space_id=get_space_id()
+        )
         
-        # Wait for the message to complete
-        complete_message = client.wait_for_message_completion(conversation_id, message_id)
+        # Wait for admission, then hold the slot until Genie has answered
+        async with genie_admission.slot(session_id, _queue_listener(on_status)):
+            # Send follow-up message in existing conversation
+            response = await client.send_message(conversation_id, question)
+            message_id = response.get("message_id")
+            
+            # Wait for the message to complete
+            complete_message = await client.wait_for_message_completion(
+                conversation_id, message_id, on_status=_status_listener(on_status)
+            )
         
         # Process the response
-        result, query_text = process_genie_response(client, conversation_id, message_id, complete_message)
+        result, query_text = await process_genie_response_async(client, conversation_id, message_id, complete_message)
         
         return result, query_text
         
     except Exception as e:
         # Handle specific errors
-        if "429" in str(e) or "Too Many Requests" in str(e):
+        if isinstance(e, CircuitOpenError):
+            return unavailable_message(e), None
+        elif error_status(e) == 429 or "Too Many Requests" in str(e):
             return "Sorry, the system is currently experiencing high demand. Please try again in a few moments.", None
         elif "Conversation not found" in str(e):
             return "Sorry, the previous conversation has expired. Please try your query again to start a new conversation.", None
@@ -259,7 +469,35 @@ def continue_conversation(conversation_id: str, question: str) -> Tuple[Union[st
             logger.error(f"Error continuing conversation: {str(e)}")
             return f"Sorry, an error occurred: {str(e)}", None
 
-def process_genie_response(client, conversation_id, message_id, complete_message) -> Tuple[Union[str, pd.DataFrame], Optional[str]]:
+def start_new_conversation(question: str, session_id: Optional[str] = None) -> Tuple[str, Union[str, pd.DataFrame], Optional[str]]:
+    """Synchronous wrapper around start_new_conversation_async"""
+    return run_sync(start_new_conversation_async(question, session_id=session_id))
+
+def continue_conversation(conversation_id: str, question: str, session_id: Optional[str] = None) -> Tuple[Union[str, pd.DataFrame], Optional[str]]:
+    """Synchronous wrapper around continue_conversation_async"""
+    return run_sync(continue_conversation_async(conversation_id, question, session_id=session_id))
+
+async def _query_response(client, query_result: Dict[str, Any], query_text: str) -> Tuple[Union[str, pd.DataFrame], Optional[str]]:
+    """Fetch and decode every chunk of a query result, or return a no-results message when it is empty"""
+    # All chunks are fetched with bounded parallelism and typed by the schema (see result_fetcher.py)
+    df = await fetch_result_frame(client, query_result)
+    if df is not None:
+        return df, query_text
+    else:
+        # No results found - return a meaningful message
+        return NO_RESULTS_MESSAGE, query_text
+
+def _message_content_response(complete_message: Dict[str, Any]) -> Tuple[str, None]:
+    """Fall back to the message's own content when it has no usable attachments"""
+    if 'content' in complete_message:
+        content = complete_message.get('content', '')
+        # Check if the content is just repeating the question (common when no results)
+        if content and len(content.strip()) > 0:
+            return content, None
+    
+    return "No response available", None
+
+def process_genie_response(client, conversation_id, message_id, complete_message) -> Tuple[Union[str, pd.DataFrame, List[Tuple[Union[str, pd.DataFrame], Optional[str]]]], Optional[str]]:
     """
     Process the response from Genie
     
@@ -271,66 +509,413 @@ def process_genie_response(client, conversation_id, message_id, complete_message
         
     Returns:
         Tuple containing:
-        - result: Either text or DataFrame response
+        - result: Either text or DataFrame response; for messages with several
+          attachments, a list of (result, query_text) parts in attachment order
         - query_text: SQL query text if applicable, otherwise None
     """
-    # Check attachments first
-    attachments = complete_message.get("attachments", [])
-    for attachment in attachments:
-        attachment_id = attachment.get("attachment_id")
-        
-        # If there's text content in the attachment, return it
+    async_client = AsyncGenieClient(client.host, client.space_id, client=client)
+    return run_sync(process_genie_response_async(async_client, conversation_id, message_id, complete_message))
+
+async def _attachment_response(client, conversation_id: str, message_id: str, attachment: Dict[str, Any]) -> Tuple[Union[str, pd.DataFrame], Optional[str]]:
+    """Fetch one query attachment's result, turning a failure into a FailedPart message for that part only"""
+    query_text = attachment.get("query", {}).get("query", "")
+    try:
+        query_result = await client.get_query_result(conversation_id, message_id, attachment.get("attachment_id"))
+        result, query_text = await _query_response(client, query_result, query_text)
+        if isinstance(result, pd.DataFrame):
+            # Remember where the table came from so its SQL can be re-run later
+            result.attrs["genie_attachment"] = {
+                "conversation_id": conversation_id,
+                "message_id": message_id,
+                "attachment_id": attachment.get("attachment_id")
+            }
+        return result, query_text
+    except Exception as e:
+        logger.error(f"Failed to fetch query attachment result: {str(e)}")
+        return FailedPart(f"Sorry, the results of this query could not be fetched: {str(e)}"), query_text
+
+async def process_genie_attachments_async(client, conversation_id, message_id, complete_message) -> List[Tuple[Union[str, pd.DataFrame], Optional[str]]]:
+    """
+    Turn every attachment of a completed message into a (result, query_text) part.
+    
+    Text attachments are used as-is (they already reached on_status listeners when
+    the message completed); all query results are fetched concurrently, so the
+    total wait is that of the slowest one.
+    """
+    parts: List[Any] = []
+    queries = []
+    for attachment in complete_message.get("attachments", []):
         if "text" in attachment and "content" in attachment["text"]:
-            return attachment["text"]["content"], None
-        
-        # If there's a query, get the result
+            parts.append((attachment["text"]["content"], None))
         elif "query" in attachment:
-            query_text = attachment.get("query", {}).get("query", "")
-            query_result = client.get_query_result(conversation_id, message_id, attachment_id)
-           
-            data_array = query_result.get('data_array', [])
-            schema = query_result.get('schema', {})
-            columns = [col.get('name') for col in schema.get('columns', [])]
-            
-            # If we have data, return as DataFrame
-            if data_array and len(data_array) > 0:
-                # If no columns from schema, create generic ones
-                if not columns and data_array and len(data_array) > 0:
-                    columns = [f"column_{i}" for i in range(len(data_array[0]))]
-                
-                df = pd.DataFrame(data_array, columns=columns)
-                return df, query_text
-            else:
-                # No results found - return a meaningful message
-                return "No results found for your query. Please try refining your search criteria or check if the data you're looking for exists in the database.", query_text
+            queries.append((len(parts), _attachment_response(client, conversation_id, message_id, attachment)))
+            parts.append(None)
+    
+    results = await asyncio.gather(*(query for _, query in queries))
+    for (index, _), result in zip(queries, results):
+        parts[index] = result
+    return parts
+
+async def process_genie_response_async(client, conversation_id, message_id, complete_message) -> Tuple[Union[str, pd.DataFrame, List[Tuple[Union[str, pd.DataFrame], Optional[str]]]], Optional[str]]:
+    """
+    Process the response from Genie using an AsyncGenieClient.
+    
+    Behaves exactly like process_genie_response.
+    """
+    parts = await process_genie_attachments_async(client, conversation_id, message_id, complete_message)
+    if len(parts) == 1:
+        return parts[0]
+    if parts:
+        return parts, None
     
     # If no attachments or no data in attachments, return text content
-    if 'content' in complete_message:
-        content = complete_message.get('content', '')
-        # Check if the content is just repeating the question (common when no results)
-        if content and len(content.strip()) > 0:
-            return content, None
+    return _message_content_response(complete_message)
+
+async def refresh_query_result_async(conversation_id: str, message_id: str, attachment_id: str,
+                                     client: Optional[AsyncGenieClient] = None, timeout: int = 300,
+                                     strategy: Optional[PollingStrategy] = None) -> Optional[pd.DataFrame]:
+    """
+    Re-run the SQL of a query attachment and fetch its fresh result, without asking Genie again.
     
-    return "No response available", None
+    The statement is polled on the same adaptive schedule as messages, stretched
+    as for a message waiting on the warehouse, until it leaves PENDING/RUNNING.
+    
+    Args:
+        conversation_id: The conversation ID
+        message_id: The message ID
+        attachment_id: The query attachment ID
+        client: AsyncGenieClient to use, otherwise one is created
+        timeout: Maximum time to wait for the query in seconds
+        strategy: Polling schedule to use, defaults to POLL_STRATEGY
+        
+    Returns:
+        The fresh DataFrame, or None if the query returned no rows
+    """
+    client = client or await AsyncGenieClient.create(get_settings().host, get_space_id())
+    strategy = strategy or get_default_strategy()
+    started = time.monotonic()
+    
+    # Retries of the calls below must not outlast the query's own timeout
+    with retry_deadline(started + timeout):
+        query_result = _statement_result(await client.execute_query(conversation_id, message_id, attachment_id))
+        attempt = 0
+        while query_result["state"] in RUNNING_STATEMENT_STATES:
+            elapsed = time.monotonic() - started
+            if elapsed > timeout:
+                raise TimeoutError(f"Query did not finish within {timeout} seconds")
+            attempt += 1
+            await asyncio.sleep(strategy.next_interval(attempt, "EXECUTING_QUERY", elapsed))
+            query_result = await client.get_query_result(conversation_id, message_id, attachment_id)
+    
+    if query_result["state"] not in (None, "SUCCEEDED"):
+        raise RuntimeError(f"Query {query_result['state'].lower()}: {query_result['error'] or 'no details'}")
+    
+    df = await fetch_result_frame(client, query_result)
+    if df is not None:
+        df.attrs["genie_attachment"] = {
+            "conversation_id": conversation_id,
+            "message_id": message_id,
+            "attachment_id": attachment_id
+        }
+    return df
+
+def refresh_query_result(conversation_id: str, message_id: str, attachment_id: str, timeout: int = 300) -> Optional[pd.DataFrame]:
+    """Synchronous wrapper around refresh_query_result_async"""
+    return run_sync(refresh_query_result_async(conversation_id, message_id, attachment_id, timeout=timeout))
 
-def genie_query(question: str) -> Union[Tuple[str, Optional[str]], Tuple[pd.DataFrame, str]]:
+def _is_refreshable(result: Union[str, pd.DataFrame, List[Tuple[Union[str, pd.DataFrame], Optional[str]]]]) -> bool:
+    """Whether an answer has at least one table whose SQL can be re-run"""
+    if isinstance(result, list):
+        return any(_is_refreshable(part) for part, _ in result)
+    return isinstance(result, pd.DataFrame) and "genie_attachment" in result.attrs
+
+async def _refresh_part(client: AsyncGenieClient, result: Union[str, pd.DataFrame], query_text: Optional[str]) -> Tuple[Union[str, pd.DataFrame], Optional[str]]:
+    """Re-run one answer part; text parts are kept as they are"""
+    if not _is_refreshable(result):
+        return result, query_text
+    df = await refresh_query_result_async(client=client, **result.attrs["genie_attachment"])
+    return (df if df is not None else NO_RESULTS_MESSAGE), query_text
+
+async def refresh_answer_async(question: str) -> bool:
     """
-    Main entry point for querying Genie.
+    Re-run the SQL behind a cached answer and replace it in the caches.
+    
+    Only the tables are refreshed, through execute_query; Genie is not asked
+    again, so the text and SQL of the answer stay the same. If any part fails
+    the cached answer is left as it is.
+    
+    Returns:
+        True if the answer was refreshed, False if it is not cached or has no tables
+    """
+    cached = answer_cache.get(question, get_space_id()) or await run_blocking(result_store.get, normalize_question(question), get_space_id())
+    if cached is None or not _is_refreshable(cached[0]):
+        return False
+    
+    result, query_text = cached
+    client = await AsyncGenieClient.create(get_settings().host, get_space_id())
+    if isinstance(result, list):
+        fresh = list(await asyncio.gather(*(_refresh_part(client, part, part_query) for part, part_query in result)))
+    else:
+        fresh, _ = await _refresh_part(client, result, query_text)
+    
+    answer_cache.put(question, get_space_id(), fresh, query_text)
+    await run_blocking(result_store.put, normalize_question(question), get_space_id(), question, fresh, query_text)
+    logger.info(f"Refreshed cached answer: {question[:30]}...")
+    return True
+
+def refresh_answer(question: str) -> bool:
+    """Synchronous wrapper around refresh_answer_async, for schedulers outside the event loop"""
+    return run_sync(refresh_answer_async(question))
+
+async def refresh_stale_answers_async(older_than: float = ANSWER_REFRESH_AFTER) -> int:
+    """
+    Refresh every cached answer of the space older than older_than seconds.
+    
+    Meant to be run periodically so popular answers are re-run before anyone
+    asks again. Answers are refreshed one at a time to keep the load on the
+    warehouse low.
+    
+    Returns:
+        Number of answers refreshed
+    """
+    refreshed = 0
+    for question in answer_cache.stale_questions(get_space_id(), older_than):
+        try:
+            refreshed += await _revalidate(question)
+        except Exception as e:
+            logger.error(f"Failed to refresh cached answer: {str(e)}")
+    return refreshed
+
+def refresh_stale_answers(older_than: float = ANSWER_REFRESH_AFTER) -> int:
+    """Synchronous wrapper around refresh_stale_answers_async"""
+    return run_sync(refresh_stale_answers_async(older_than))
+
+async def _revalidate(question: str) -> bool:
+    """Refresh an answer, sharing the work with any refresh of the same question already running"""
+    return await answer_refreshes.do(
+        (get_space_id(), normalize_question(question)),
+        lambda emit: refresh_answer_async(question)
+    )
+
+def _revalidate_in_background(question: str) -> None:
+    """Serve the stale answer now and refresh it for the next asker (stale-while-revalidate)"""
+    task = asyncio.ensure_future(_revalidate(question))
+    _background_refreshes.add(task)
+    
+    def done(task: asyncio.Task) -> None:
+        _background_refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background refresh of a cached answer failed: {str(task.exception())}")
+    task.add_done_callback(done)
+
+# Keeps background refresh tasks referenced until they finish
+_background_refreshes = set()
+
+async def warm_answer_async(question: str, max_age: float) -> Dict[str, Any]:
+    """
+    Make sure a fresh answer to question is cached before anyone asks it.
+    
+    A cached answer younger than max_age seconds is left alone; an older one has
+    its tables re-run (see refresh_answer_async), or is asked again if it has none.
+    Similar-question matches are not used, so the answer is cached under this
+    exact question.
+    
+    Returns:
+        Dict with "source": "cache", "refresh", "genie" or "error"
+    """
+    age = answer_cache.age(question, get_space_id())
+    if age is None and await _cached_answer(question) is not None:
+        return {"source": "cache"}
+    if age is not None and age <= max_age:
+        return {"source": "cache"}
+    if age is not None and await _revalidate(question):
+        return {"source": "refresh"}
+    
+    _, _, details = await genie_requests.do(
+        (get_space_id(), normalize_question(question)),
+        lambda emit: _ask_genie(question, emit)
+    )
+    return details
+
+async def _ask_genie(question: str, on_status: Optional[Callable[[str, Optional[str]], None]],
+                     session_id: Optional[str] = None) -> Tuple[Union[str, pd.DataFrame], Optional[str], Dict[str, Any]]:
+    """Start a conversation for the question and cache a successful answer"""
+    conversation_id, status, result, query_text = await _start_conversation_async(question, on_status, session_id)
+    
+    # Only completed answers are cached; a failed request or a FAILED/ERROR
+    # message would otherwise be served back as if it were an answer
+    if not _is_cacheable(status, result):
+        return result, query_text, {"source": "error"}
+    
+    answer_cache.put(question, get_space_id(), result, query_text)
+    _similarity_index().add(normalize_question(question), question)
+    # Persist for other workers and restarts without holding up the response
+    asyncio.get_running_loop().run_in_executor(
+        None, result_store.put, normalize_question(question), get_space_id(), question, result, query_text
+    )
+    return result, query_text, {"source": "genie"}
+
+def _is_cacheable(status: Optional[str], result: Union[str, pd.DataFrame, List[Tuple[Union[str, pd.DataFrame], Optional[str]]]]) -> bool:
+    """Whether an answer is a real one, fit to be cached and reused"""
+    if status != "COMPLETED":
+        return False
+    parts = [part for part, _ in result] if isinstance(result, list) else [result]
+    return not any(isinstance(part, FailedPart) for part in parts)
+
+def _similarity_index():
+    """Similar-question index of the space, seeded with the questions already in the result store"""
+    return get_similarity_index(get_space_id(), seed=lambda: result_store.questions(get_space_id()))
+
+def invalidate(question: Optional[str] = None) -> int:
+    """
+    Forget cached answers of the space, so the next ask goes to Genie.
+    
+    Answers are dropped from memory, from the persistent result store (which would
+    otherwise put them straight back into memory) and from the similar-question
+    index of this worker.
+    
+    Args:
+        question: Only forget this question, otherwise every question of the space
+        
+    Returns:
+        Number of entries removed from the memory cache and the result store
+    """
+    key = normalize_question(question) if question is not None else None
+    removed = answer_cache.invalidate(question, get_space_id())
+    removed += result_store.invalidate(key, get_space_id())
+    if key is not None:
+        _similarity_index().remove(key)
+    else:
+        _similarity_index().clear()
+    return removed
+
+async def _cached_answer(question: str) -> Optional[Tuple[Union[str, pd.DataFrame], Optional[str]]]:
+    """Look up an answer in memory, then in the persistent result store shared by all workers"""
+    cached = answer_cache.get(question, get_space_id())
+    if cached is None:
+        cached = await run_blocking(result_store.get, normalize_question(question), get_space_id())
+        if cached is not None:
+            answer_cache.put(question, get_space_id(), cached[0], cached[1])
+    return cached
+
+def _is_stale(question: str, result: Union[str, pd.DataFrame, List[Tuple[Union[str, pd.DataFrame], Optional[str]]]]) -> bool:
+    """Whether a cached answer with tables is old enough to be re-run in the background"""
+    if ANSWER_REFRESH_AFTER <= 0 or not _is_refreshable(result):
+        return False
+    age = answer_cache.age(question, get_space_id())
+    return age is not None and age > ANSWER_REFRESH_AFTER
+
+async def genie_query_detailed_async(question: str, on_status: Optional[Callable[[str, Optional[str]], None]] = None,
+                                     session_id: Optional[str] = None) -> Tuple[Union[str, pd.DataFrame], Optional[str], Dict[str, Any]]:
+    """
+    Main asyncio entry point for querying Genie, also reporting where the answer came from.
+    
+    Answers are cached per normalized question and space, in memory (see
+    answer_cache.py) and on disk across workers and restarts (see result_store.py),
+    so a repeated question is answered without contacting Genie. Failing an exact
+    match, a cached answer to a sufficiently similar question is reused
+    (see similarity_index.py). Concurrent identical questions are coalesced into a
+    single Genie request (see single_flight.py).
+    
+    Args:
+        question: The question to ask
+        on_status: Optional callback receiving (status, text) as Genie makes progress;
+            it is called on the event loop and must not block
+        session_id: Browser session asking, so questions queue fairly across sessions
+        
+    Returns:
+        Tuple containing:
+        - result: Either text or DataFrame response
+        - query_text: SQL query text if applicable, otherwise None
+        - details: Dict with "source" ("genie", "cache", "similar", "unavailable" or
+          "error") and, for similar matches, "similar_question" and "similarity";
+          "unavailable" means the circuit breaker is open and comes with "retry_in"
+    """
+    try:
+        # Repeated questions are served from the answer cache
+        cached = await _cached_answer(question)
+        if cached is not None:
+            if _is_stale(question, cached[0]):
+                _revalidate_in_background(question)
+            return cached[0], cached[1], {"source": "cache"}
+        
+        # Near-duplicates reuse the answer of the matching question
+        for matched_key, matched_question, score in _similarity_index().search(question):
+            cached = await _cached_answer(matched_key)
+            if cached is not None:
+                logger.info(f"Reusing answer of similar question ({score:.2f}): {matched_question[:30]}...")
+                return cached[0], cached[1], {
+                    "source": "similar",
+                    "similar_question": matched_question,
+                    "similarity": score
+                }
+        
+        # Identical questions already in flight share one Genie conversation
+        return await genie_requests.do(
+            (get_space_id(), normalize_question(question)),
+            lambda emit: _ask_genie(question, emit, session_id),
+            on_status
+        )
+    
+    except CircuitOpenError as e:
+        logger.warning(f"Not asking Genie: {str(e)}")
+        return unavailable_message(e), None, {"source": "unavailable", "retry_in": e.retry_in}
+    except Exception as e:
+        logger.error(f"Error in conversation: {str(e)}. Please try again.")
+        return f"Sorry, an error occurred: {str(e)}. Please try again.", None, {"source": "error"}
+
+async def genie_query_async(question: str, on_status: Optional[Callable[[str, Optional[str]], None]] = None) -> Union[Tuple[str, Optional[str]], Tuple[pd.DataFrame, str]]:
+    """
+    Main asyncio entry point for querying Genie.
     
     Args:
         question: The question to ask
+        on_status: Optional callback receiving (status, text) as Genie makes progress;
+            it is called on the event loop and must not block
         
     Returns:
         Tuple containing either:
         - (text_response, None) for text responses
         - (dataframe, sql_query) for data responses
     """
+    result, query_text, _ = await genie_query_detailed_async(question, on_status)
+    return result, query_text
+
+def genie_query_detailed(question: str, on_status: Optional[Callable[[str, Optional[str]], None]] = None,
+                         session_id: Optional[str] = None) -> Tuple[Union[str, pd.DataFrame], Optional[str], Dict[str, Any]]:
+    """
+    Synchronous wrapper around genie_query_detailed_async.
+    
+    Runs on the shared background event loop and blocks until the answer is ready.
+    on_status updates come from the status polls already being made and are
+    delivered on the calling thread.
+    """
     try:
-        # Start a new conversation for each query
-        conversation_id, result, query_text = start_new_conversation(question)
-        return result, query_text
+        if on_status is None:
+            return run_sync(genie_query_detailed_async(question, session_id=session_id))
+        return run_sync_with_updates(lambda emit: genie_query_detailed_async(question, emit, session_id), on_status)
             
     except Exception as e:
         logger.error(f"Error in conversation: {str(e)}. Please try again.")
-        return f"Sorry, an error occurred: {str(e)}. Please try again.", None
+        return f"Sorry, an error occurred: {str(e)}. Please try again.", None, {"source": "error"}
 
+def genie_query(question: str, on_status: Optional[Callable[[str, Optional[str]], None]] = None) -> Union[Tuple[str, Optional[str]], Tuple[pd.DataFrame, str]]:
+    """
+    Main entry point for querying Genie.
+    
+    Runs genie_query_async on the shared background event loop and blocks
+    until the answer is ready.
+    
+    Args:
+        question: The question to ask
+        on_status: Optional callback receiving (status, text) as Genie makes progress.
+            Updates come from the status polls already being made and are delivered
+            on the calling thread.
+        
+    Returns:
+        Tuple containing either:
+        - (text_response, None) for text responses
+        - (dataframe, sql_query) for data responses
+    """
+    result, query_text, _ = genie_query_detailed(question, on_status)
+    return result, query_text
@@ -0,0 +1,104 @@
+import socket
+import threading
+import logging
+from typing import Dict, Any, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_POOL_BLOCK,
+    HTTP_KEEPALIVE_IDLE,
+    HTTP_KEEPALIVE_INTERVAL,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT
+)
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout tuple passed to every request made through the shared session
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _keepalive_socket_options():
+    """Build socket options enabling TCP keep-alive where the platform supports it"""
+    options = list(HTTPConnection.default_socket_options)
+    if HTTP_KEEPALIVE_IDLE <= 0:
+        return options
+
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, HTTP_KEEPALIVE_IDLE))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, HTTP_KEEPALIVE_INTERVAL))
+    return options
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections use TCP keep-alive so idle sockets survive between polls"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = _keepalive_socket_options()
+        super().init_poolmanager(*args, **kwargs)
+
+
+def get_session() -> requests.Session:
+    """
+    Get the process-wide HTTP session, creating it on first use.
+
+    The session keeps one connection pool per host, so repeated calls to the
+    same workspace reuse open TLS connections instead of handshaking each time.
+
+    Returns:
+        requests.Session: The shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = KeepAliveAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=HTTP_POOL_BLOCK,
+                    max_retries=0  # Retries are handled by the callers
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+                logger.info(f"Created shared HTTP session (pool_maxsize={HTTP_POOL_MAXSIZE})")
+    return _session
+
+
+def get_connection_stats() -> Dict[str, Any]:
+    """
+    Report connection reuse for every host pool of the shared session.
+
+    Returns:
+        Dict mapping each host to its request count, number of connections
+        opened and the number of requests served on a reused connection
+    """
+    if _session is None:
+        return {}
+
+    stats = {}
+    adapters = {id(adapter): adapter for adapter in _session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(pool.host, {"requests": 0, "connections": 0, "reused": 0})
+            host_stats["requests"] += pool.num_requests
+            host_stats["connections"] += pool.num_connections
+            host_stats["reused"] += max(pool.num_requests - pool.num_connections, 0)
+    return stats
+
+
+register_stats("http", get_connection_stats)
@@ -0,0 +1,126 @@
+import os
+import threading
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional
+import diskcache
+from dash.long_callback.managers import BaseLongCallbackManager
+from dash.long_callback.managers.diskcache_manager import DiskcacheManager
+from config import JOB_MAX_WORKERS, JOB_CACHE_DIR
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+# Markers of jobs whose worker died without clearing them are dropped after this many seconds
+JOB_MARKER_TTL = 24 * 3600
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LocalJobManager(DiskcacheManager):
+    """
+    Background callback manager that needs no external broker.
+
+    Jobs run on a bounded in-process thread pool instead of one subprocess per
+    job, so they share the app's event loop, poller and caches. Results and
+    progress are kept in a local diskcache exactly like Dash's DiskcacheManager.
+
+    Job ids are random and each queued or running job has a marker in the same
+    diskcache holding the pid of the worker running it, so when several worker
+    processes share the cache, a poll reaching another worker still sees the job
+    as running (as long as its worker is alive) and can cancel it if still queued.
+    """
+
+    def __init__(self, cache: Optional[diskcache.Cache] = None, max_workers: int = JOB_MAX_WORKERS,
+                 cache_by=None, expire=None):
+        # DiskcacheManager.__init__ insists on psutil/multiprocess, which only its
+        # subprocess jobs need, so initialise the base manager directly
+        BaseLongCallbackManager.__init__(self, cache_by)
+        self.handle = cache if cache is not None else diskcache.Cache(JOB_CACHE_DIR)
+        self.expire = expire
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dash-job")
+        self._jobs: Dict[str, Future] = {}
+        self._running = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _marker_key(job) -> str:
+        return f"genie-job:{job}"
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job = uuid.uuid4().hex
+        marker = self._marker_key(job)
+        self.handle.set(marker, os.getpid(), expire=JOB_MARKER_TTL)
+
+        def run():
+            if self.handle.get(marker) is None:
+                # Terminated while queued, possibly from another worker
+                return
+            with self._lock:
+                self._running += 1
+            try:
+                job_fn(key, self._make_progress_key(key), args, context)
+            finally:
+                self.handle.delete(marker)
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        with self._lock:
+            # Forget finished jobs; their results stay in the cache until collected
+            for finished in [job_id for job_id, future in self._jobs.items() if future.done()]:
+                del self._jobs[finished]
+            self._jobs[job] = self._executor.submit(run)
+        return job
+
+    def job_running(self, job):
+        with self._lock:
+            future = self._jobs.get(str(job))
+        if future is not None:
+            return not future.done()
+        # Started by another worker sharing the cache
+        pid = self.handle.get(self._marker_key(job))
+        return pid is not None and _process_alive(pid)
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        self.handle.delete(self._marker_key(job))
+        with self._lock:
+            future = self._jobs.pop(str(job), None)
+        if future is not None and future.cancel():
+            logger.info(f"Cancelled queued background job {job}")
+
+    def terminate_unhealthy_job(self, job):
+        # Threads cannot die without the future finishing, so no job is ever unhealthy
+        return False
+
+    def get_backlog(self) -> Dict[str, Any]:
+        """Snapshot of queued, running and finished jobs"""
+        with self._lock:
+            pending = sum(1 for future in self._jobs.values() if not future.done())
+            return {
+                "queued": max(pending - self._running, 0),
+                "running": self._running,
+                "completed": self._completed,
+                "max_workers": self.max_workers
+            }
+
+
+def create_job_manager() -> LocalJobManager:
+    """Build the app's background callback manager and publish its backlog under 'jobs' in /metrics"""
+    manager = LocalJobManager()
+    register_stats("jobs", manager.get_backlog)
+    logger.info(f"Background jobs use {manager.max_workers} workers, results in {JOB_CACHE_DIR}")
+    return manager
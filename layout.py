@@ -1,7 +1,7 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 import os
-from config import DEFAULT_WELCOME_TITLE, DEFAULT_WELCOME_DESCRIPTION, DEFAULT_SUGGESTIONS, POWERBI_EMBED_URL
+from config import DEFAULT_WELCOME_TITLE, DEFAULT_WELCOME_DESCRIPTION, DEFAULT_SUGGESTIONS, POWERBI_EMBED_URL, SUGGESTION_STATUS_INTERVAL, FEEDBACK_FLUSH_INTERVAL
 from components import create_welcome_modal
 
 def create_layout():
@@ -73,24 +73,30 @@ def create_layout():
                                 html.Button([
                                     html.Div(className="suggestion-icon"),
                                     html.Div("What are the key insights from this dashboard?", 
-                                           className="suggestion-text", id="suggestion-1-text")
+                                           className="suggestion-text", id="suggestion-1-text"),
+                                    html.Div(id="suggestion-1-status")
                                 ], id="suggestion-1", className="suggestion-button"),
                                 html.Button([
                                     html.Div(className="suggestion-icon"),
                                     html.Div("Can you explain the trends shown in the charts?",
-                                           className="suggestion-text", id="suggestion-2-text")
+                                           className="suggestion-text", id="suggestion-2-text"),
+                                    html.Div(id="suggestion-2-status")
                                 ], id="suggestion-2", className="suggestion-button"),
                                 html.Button([
                                     html.Div(className="suggestion-icon"),
                                     html.Div("What are the main metrics being displayed?",
-                                           className="suggestion-text", id="suggestion-3-text")
+                                           className="suggestion-text", id="suggestion-3-text"),
+                                    html.Div(id="suggestion-3-status")
                                 ], id="suggestion-3", className="suggestion-button"),
                                 html.Button([
                                     html.Div(className="suggestion-icon"),
                                     html.Div("How can I interpret the data visualizations?",
-                                           className="suggestion-text", id="suggestion-4-text")
+                                           className="suggestion-text", id="suggestion-4-text"),
+                                    html.Div(id="suggestion-4-status")
                                 ], id="suggestion-4", className="suggestion-button")
-                            ], className="suggestion-buttons")
+                            ], className="suggestion-buttons"),
+                            # Refreshes how ready each suggestion's pre-computed answer is
+                            dcc.Interval(id="suggestion-status-interval", interval=SUGGESTION_STATUS_INTERVAL * 1000)
                         ], id="welcome-container", className="welcome-container visible"),
                         
                         # Chat messages
@@ -139,5 +145,10 @@ def create_layout():
         
         html.Div(id='dummy-output'),
         dcc.Store(id="chat-trigger", data={"trigger": False, "message": ""}),
-        dcc.Store(id="query-running-store", data=False)
+        dcc.Store(id="query-running-store", data=False),
+        # Identifies the browser tab's chat history on the server
+        dcc.Store(id="session-id", storage_type="session"),
+        # Thumbs up/down clicks are queued in the browser and sent in batches
+        dcc.Store(id="feedback-batch"),
+        dcc.Interval(id="feedback-flush-interval", interval=FEEDBACK_FLUSH_INTERVAL * 1000)
     ]) 
\ No newline at end of file
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from config import POLLER_MAX_CONCURRENT_POLLS, POLLER_MAX_POLLS_PER_SECOND
+from async_runtime import get_loop
+from metrics import register_stats
+from retry_policy import retry_deadline
+from polling import PollingStrategy, get_default_strategy, status_timings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ["COMPLETED", "ERROR", "FAILED"]
+
+
+class _PendingMessage:
+    """Book-keeping for one message the poller is waiting on"""
+    def __init__(self, future: asyncio.Future, strategy: PollingStrategy, timeout: float):
+        now = time.monotonic()
+        self.future = future
+        self.strategy = strategy
+        self.started = now
+        self.deadline = now + timeout
+        self.timeout = timeout
+        # Spread first polls so simultaneous registrations do not poll together
+        self.next_poll = now + strategy.first_interval() * random.uniform(0.5, 1.0)
+        self.in_flight = False
+        self.polls = 0
+        self.status = None
+        self.status_since = now
+        # Attachments as last reported, so new or growing ones are passed on without a status change
+        self.attachments: Optional[str] = None
+        self.listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+
+class MessagePoller:
+    """
+    Single background service that polls every in-flight Genie message.
+
+    Callers register a (conversation_id, message_id) pair and receive a future
+    that resolves with the message once it reaches a terminal status. One task on
+    the shared event loop schedules all polls, spacing them out so that at most
+    max_polls_per_second are issued and at most max_concurrent_polls are in flight.
+    Each message's PollingStrategy decides when it is due again.
+    """
+    # Longest the scheduling loop sleeps without re-checking deadlines
+    MAX_IDLE = 1.0
+
+    def __init__(self, client, strategy: Optional[PollingStrategy] = None,
+                 max_concurrent_polls: int = POLLER_MAX_CONCURRENT_POLLS,
+                 max_polls_per_second: float = POLLER_MAX_POLLS_PER_SECOND):
+        self.client = client
+        self.strategy = strategy or get_default_strategy()
+        self.max_concurrent_polls = max_concurrent_polls
+        self.min_poll_spacing = 1.0 / max_polls_per_second if max_polls_per_second > 0 else 0.0
+        self._pending: Dict[Tuple[str, str], _PendingMessage] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_slot = 0.0
+        self._in_flight = 0
+        self._stats = {"registered": 0, "polls": 0, "completed": 0, "timeouts": 0, "errors": 0}
+
+    def register(self, conversation_id: str, message_id: str, timeout: float = 300,
+                 strategy: Optional[PollingStrategy] = None,
+                 on_status: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> asyncio.Future:
+        """
+        Start tracking a message. Must be called on the poller's event loop.
+
+        Args:
+            conversation_id: The ID of the conversation
+            message_id: The ID of the message
+            timeout: Maximum time to wait in seconds
+            strategy: Polling schedule for this message, defaults to the poller's strategy
+            on_status: Called on the event loop with (status, message) whenever a poll
+                reports a new status (including the terminal one) or changed attachments
+
+        Returns:
+            asyncio.Future resolving to the message in its terminal state
+        """
+        key = (conversation_id, message_id)
+        pending = self._pending.get(key)
+        if pending is not None and not pending.future.done():
+            if on_status is not None:
+                pending.listeners.append(on_status)
+            return pending.future
+
+        future = asyncio.get_running_loop().create_future()
+        pending = _PendingMessage(future, strategy or self.strategy, timeout)
+        if on_status is not None:
+            pending.listeners.append(on_status)
+        self._pending[key] = pending
+        self._stats["registered"] += 1
+        self._ensure_running()
+        self._wakeup.set()
+        return future
+
+    def register_threadsafe(self, conversation_id: str, message_id: str, timeout: float = 300,
+                            strategy: Optional[PollingStrategy] = None,
+                            on_status: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Future:
+        """Register from any thread, returning a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(
+            self.wait(conversation_id, message_id, timeout, strategy, on_status), get_loop()
+        )
+
+    async def wait(self, conversation_id: str, message_id: str, timeout: float = 300,
+                   strategy: Optional[PollingStrategy] = None,
+                   on_status: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Register a message and wait for its terminal state"""
+        future = self.register(conversation_id, message_id, timeout, strategy, on_status)
+        # Shield so one cancelled waiter does not cancel the shared future
+        return await asyncio.shield(future)
+
+    def _ensure_running(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        """Scheduling loop: dispatch due polls, expire timed-out messages, sleep until the next one is due"""
+        while self._pending:
+            now = time.monotonic()
+            next_wake = now + self.MAX_IDLE
+
+            # Most overdue first, so deferred polls keep their place in line
+            for key, pending in sorted(self._pending.items(), key=lambda item: item[1].next_poll):
+                if pending.future.done():
+                    # Resolved by a poll that finished since the last pass
+                    del self._pending[key]
+                    continue
+                if now >= pending.deadline:
+                    self._stats["timeouts"] += 1
+                    pending.future.set_exception(
+                        TimeoutError(f"Message processing timed out after {pending.timeout:g} seconds")
+                    )
+                    del self._pending[key]
+                    continue
+                if pending.in_flight:
+                    continue
+                if pending.next_poll <= now:
+                    if self._in_flight >= self.max_concurrent_polls:
+                        # A finishing poll wakes the loop up again
+                        next_wake = min(next_wake, pending.deadline)
+                        continue
+                    if now < self._next_slot:
+                        # Rate limit reached; try again when the next slot opens
+                        next_wake = min(next_wake, self._next_slot, pending.deadline)
+                        continue
+                    self._next_slot = now + self.min_poll_spacing
+                    self._dispatch(key, pending)
+                    continue
+                next_wake = min(next_wake, pending.next_poll, pending.deadline)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(next_wake - time.monotonic(), 0.01))
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, key: Tuple[str, str], pending: _PendingMessage) -> None:
+        pending.in_flight = True
+        self._in_flight += 1
+        asyncio.get_running_loop().create_task(self._poll(key, pending))
+
+    async def _poll(self, key: Tuple[str, str], pending: _PendingMessage) -> None:
+        conversation_id, message_id = key
+        try:
+            # Retries of this poll must not outlast the message's own timeout
+            with retry_deadline(pending.deadline):
+                message = await self.client.get_message(conversation_id, message_id)
+            self._stats["polls"] += 1
+            pending.polls += 1
+            now = time.monotonic()
+            status = message.get("status")
+            attachments = json.dumps(message.get("attachments"), sort_keys=True, default=str)
+            changed = status != pending.status or attachments != pending.attachments
+            if status != pending.status:
+                if pending.status is not None:
+                    status_timings.observe_status(pending.status, now - pending.status_since)
+                pending.status = status
+                pending.status_since = now
+            pending.attachments = attachments
+            if changed:
+                self._notify(pending, status, message)
+
+            if status in TERMINAL_STATUSES:
+                self._stats["completed"] += 1
+                status_timings.observe_completion(status, now - pending.started, pending.polls)
+                if not pending.future.done():
+                    pending.future.set_result(message)
+            else:
+                interval = pending.strategy.next_interval(pending.polls, status, now - pending.started)
+                # Jitter keeps messages registered together from polling in lockstep
+                pending.next_poll = now + interval * random.uniform(0.9, 1.1)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error(f"Polling message {message_id} failed: {str(e)}")
+            if not pending.future.done():
+                pending.future.set_exception(e)
+        finally:
+            pending.in_flight = False
+            self._in_flight -= 1
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    @staticmethod
+    def _notify(pending: _PendingMessage, status: str, message: Dict[str, Any]) -> None:
+        for listener in pending.listeners:
+            try:
+                listener(status, message)
+            except Exception as e:
+                logger.error(f"Status listener failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of poller activity"""
+        return {
+            **self._stats,
+            "pending": len(self._pending),
+            "in_flight": self._in_flight
+        }
+
+
+_pollers: Dict[Tuple[str, str], MessagePoller] = {}
+_pollers_lock = threading.Lock()
+
+
+def get_message_poller(client) -> MessagePoller:
+    """
+    Get the shared poller for the client's Genie space, creating it on first use.
+
+    Args:
+        client: An AsyncGenieClient used to poll message status
+
+    Returns:
+        MessagePoller: The poller serving this space
+    """
+    key = (client.host, client.space_id)
+    with _pollers_lock:
+        poller = _pollers.get(key)
+        if poller is None:
+            poller = MessagePoller(client)
+            _pollers[key] = poller
+        return poller
+
+
+def get_poller_stats() -> Dict[str, Any]:
+    """Combined stats of every poller plus the process thread count"""
+    with _pollers_lock:
+        pollers = dict(_pollers)
+    return {
+        "spaces": {space_id: poller.get_stats() for (_, space_id), poller in pollers.items()},
+        "threads": threading.active_count()
+    }
+
+
+register_stats("poller", get_poller_stats)
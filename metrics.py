@@ -0,0 +1,35 @@
+import threading
+import logging
+from typing import Dict, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def register_stats(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Register a function that returns a stats snapshot under the given name.
+
+    Args:
+        name: Section name in the combined snapshot
+        provider: Zero-argument callable returning a JSON-serializable dict
+    """
+    with _lock:
+        _providers[name] = provider
+
+
+def get_stats() -> Dict[str, Any]:
+    """Collect a snapshot from every registered stats provider"""
+    with _lock:
+        providers = dict(_providers)
+
+    stats = {}
+    for name, provider in providers.items():
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            logger.error(f"Failed to collect stats for {name}: {str(e)}")
+            stats[name] = {"error": str(e)}
+    return stats
@@ -0,0 +1,127 @@
+import bisect
+import threading
+from typing import Dict, Any, Optional
+from config import (
+    POLL_STRATEGY,
+    POLL_INITIAL_INTERVAL,
+    POLL_BACKOFF_FACTOR,
+    POLL_MAX_INTERVAL,
+    POLL_QUERY_BACKOFF_FACTOR,
+    POLLER_POLL_INTERVAL
+)
+from metrics import register_stats
+
+# Intermediate statuses during which the warehouse, not Genie, is doing the work
+QUERY_STATUSES = ["PENDING_WAREHOUSE", "EXECUTING_QUERY"]
+
+
+class PollingStrategy:
+    """Decides how long to wait before the next status check of a message"""
+
+    def first_interval(self) -> float:
+        """Delay before the first poll of a newly registered message"""
+        return self.next_interval(0, None, 0.0)
+
+    def next_interval(self, attempt: int, status: Optional[str], elapsed: float) -> float:
+        """
+        Args:
+            attempt: Number of polls made so far
+            status: Status reported by the last poll, or None before the first one
+            elapsed: Seconds since the message was registered
+
+        Returns:
+            Seconds to wait before polling again
+        """
+        raise NotImplementedError
+
+
+class FixedPollingStrategy(PollingStrategy):
+    """Poll at a constant interval, matching the original behaviour"""
+
+    def __init__(self, interval: float = POLLER_POLL_INTERVAL):
+        self.interval = interval
+
+    def next_interval(self, attempt: int, status: Optional[str], elapsed: float) -> float:
+        return self.interval
+
+
+class AdaptivePollingStrategy(PollingStrategy):
+    """
+    Poll quickly at first, then back off exponentially up to a cap.
+
+    Statuses listed in status_factors stretch both the interval and the cap,
+    so a message waiting on a long SQL execution is checked less often.
+    """
+
+    def __init__(self, initial_interval: float = POLL_INITIAL_INTERVAL,
+                 backoff_factor: float = POLL_BACKOFF_FACTOR,
+                 max_interval: float = POLL_MAX_INTERVAL,
+                 status_factors: Optional[Dict[str, float]] = None):
+        self.initial_interval = initial_interval
+        self.backoff_factor = backoff_factor
+        self.max_interval = max_interval
+        if status_factors is None:
+            status_factors = {status: POLL_QUERY_BACKOFF_FACTOR for status in QUERY_STATUSES}
+        self.status_factors = status_factors
+
+    def next_interval(self, attempt: int, status: Optional[str], elapsed: float) -> float:
+        interval = min(self.initial_interval * self.backoff_factor ** max(attempt - 1, 0), self.max_interval)
+        return interval * self.status_factors.get(status, 1.0)
+
+
+def get_default_strategy() -> PollingStrategy:
+    """Build the strategy selected by POLL_STRATEGY"""
+    if POLL_STRATEGY == "fixed":
+        return FixedPollingStrategy()
+    return AdaptivePollingStrategy()
+
+
+class StatusTimingHistogram:
+    """
+    Thread-safe histograms of how long messages spend in each status.
+
+    Alongside one histogram per intermediate status, it keeps the total time to a
+    terminal status and the number of polls each message needed.
+    """
+    BUCKETS = [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 300]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, Any]] = {}
+
+    def _observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = {"counts": [0] * (len(self.BUCKETS) + 1), "count": 0, "sum": 0.0}
+                self._histograms[name] = histogram
+            histogram["counts"][bisect.bisect_left(self.BUCKETS, value)] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    def observe_status(self, status: str, seconds: float) -> None:
+        """Record the time a message spent in an intermediate status"""
+        self._observe(f"status:{status}", seconds)
+
+    def observe_completion(self, terminal_status: str, seconds: float, polls: int) -> None:
+        """Record the time to a terminal status and how many polls it took"""
+        self._observe(f"time_to_{terminal_status.lower()}", seconds)
+        self._observe("polls_per_message", polls)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Histograms keyed by name, each with bucket upper bounds, counts, total and mean"""
+        with self._lock:
+            return {
+                name: {
+                    "buckets": self.BUCKETS + ["+Inf"],
+                    "counts": list(histogram["counts"]),
+                    "count": histogram["count"],
+                    "mean": histogram["sum"] / histogram["count"] if histogram["count"] else 0.0
+                }
+                for name, histogram in self._histograms.items()
+            }
+
+
+status_timings = StatusTimingHistogram()
+
+register_stats("polling", status_timings.snapshot)
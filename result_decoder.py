@@ -0,0 +1,223 @@
+import sys
+import threading
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from config import RESULT_ARROW_DTYPES, RESULT_CATEGORY_RATIO, RESULT_DECIMAL_OBJECTS
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+# Statement API type_name -> pandas dtype (numpy-backed nullable types)
+NUMPY_DTYPES = {
+    "BYTE": "Int8",
+    "SHORT": "Int16",
+    "INT": "Int32",
+    "LONG": "Int64",
+    "FLOAT": "float32",
+    "DOUBLE": "float64",
+    "BOOLEAN": "boolean",
+}
+
+# The same types backed by Arrow arrays
+ARROW_DTYPES = {
+    "BYTE": "int8[pyarrow]",
+    "SHORT": "int16[pyarrow]",
+    "INT": "int32[pyarrow]",
+    "LONG": "int64[pyarrow]",
+    "FLOAT": "float[pyarrow]",
+    "DOUBLE": "double[pyarrow]",
+    "BOOLEAN": "bool[pyarrow]",
+}
+
+FLOAT_TYPES = ("FLOAT", "DOUBLE")
+DATE_TYPES = ("DATE", "TIMESTAMP", "TIMESTAMP_NTZ")
+STRING_TYPES = ("STRING", "CHAR", "VARCHAR")
+
+# Precision and scale of a DECIMAL column whose schema does not give them
+DEFAULT_DECIMAL_PRECISION = 38
+DEFAULT_DECIMAL_SCALE = 18
+
+# Text columns with at least this many rows are candidates for categorical dtype
+MIN_CATEGORY_ROWS = 100
+
+# Values sampled per column to estimate its size as strings
+SIZE_SAMPLE = 1000
+
+
+class _DecoderStats:
+    """Totals of rows decoded and memory saved, published under 'result_decoder' in /metrics"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"results": 0, "rows": 0, "bytes_as_strings": 0, "bytes_typed": 0}
+
+    def record(self, rows: int, before: int, after: int) -> None:
+        with self._lock:
+            self._stats["results"] += 1
+            self._stats["rows"] += rows
+            self._stats["bytes_as_strings"] += before
+            self._stats["bytes_typed"] += after
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+
+decoder_stats = _DecoderStats()
+
+register_stats("result_decoder", decoder_stats.snapshot)
+
+
+def _object_bytes(values: np.ndarray) -> int:
+    """
+    Estimate the memory of an all-strings object column (what memory_usage(deep=True)
+    would report) from a sample, since measuring every string costs more than decoding
+    """
+    if len(values) == 0:
+        return 0
+    step = max(1, len(values) // SIZE_SAMPLE)
+    sample = values[::step]
+    average = sum(sys.getsizeof(value) for value in sample) / len(sample)
+    return int(len(values) * (8 + average))
+
+
+def _decimal(value: Optional[str]) -> Optional[Decimal]:
+    """A DECIMAL value as text parsed exactly, None if missing or malformed"""
+    if value is None:
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+
+
+class ResultDecoder:
+    """
+    Build a typed DataFrame from statement result rows using the manifest schema.
+
+    The API returns every value as a string. Each column is converted in one
+    vectorized pass according to its type_name: integers to the smallest
+    fitting nullable integer, floats to floats, decimals to exact Arrow
+    decimal128 at the column's precision and scale, booleans to a boolean
+    dtype, dates and timestamps to datetime64. Low-cardinality text becomes
+    categorical. With arrow=True the numeric and boolean columns and the
+    remaining text are Arrow-backed instead. With decimal_objects=True (or
+    when values do not fit their declared scale) decimals are Python Decimal
+    objects, which take about seven times the memory.
+
+    Rows can be appended in several chunks; each chunk is converted right away
+    so its strings can be dropped before the next one arrives.
+    """
+
+    def __init__(self, schema: Dict[str, Any], arrow: bool = RESULT_ARROW_DTYPES,
+                 decimal_objects: bool = RESULT_DECIMAL_OBJECTS):
+        self.arrow = arrow
+        self.decimal_objects = decimal_objects
+        columns = schema.get("columns", [])
+        self.names: List[str] = [col.get("name") for col in columns]
+        self.types: List[str] = [(col.get("type_name") or "STRING").upper() for col in columns]
+        self.decimals: List[pa.DataType] = [
+            pa.decimal128(int(col.get("type_precision") or DEFAULT_DECIMAL_PRECISION),
+                          int(col.get("type_scale") or DEFAULT_DECIMAL_SCALE))
+            if type_name == "DECIMAL" else None
+            for col, type_name in zip(columns, self.types)
+        ]
+        self.rows = 0
+        self.bytes_as_strings = 0
+        self._chunks: List[pd.DataFrame] = []
+
+    def append(self, data_array: List[List[Optional[str]]]) -> None:
+        """Convert a chunk of rows and keep the typed result"""
+        if not data_array:
+            return
+        if not self.names:
+            # No schema: generic names and text columns
+            self.names = [f"column_{i}" for i in range(len(data_array[0]))]
+            self.types = ["STRING"] * len(self.names)
+            self.decimals = [None] * len(self.names)
+
+        values = pd.DataFrame(data_array, dtype=object)
+        decoded = {}
+        for i, type_name in enumerate(self.types):
+            column = values[i].to_numpy() if i in values.columns else np.full(len(values), None, dtype=object)
+            self.bytes_as_strings += _object_bytes(column)
+            decoded[i] = self._convert(column, type_name, self.decimals[i])
+        self.rows += len(values)
+        self._chunks.append(pd.DataFrame(decoded, copy=False))
+
+    def _convert(self, column: np.ndarray, type_name: str, decimal_type: Optional[pa.DataType] = None) -> pd.Series:
+        series = pd.Series(column, dtype=object, copy=False)
+        try:
+            if type_name == "DECIMAL":
+                # Kept exact: floats would round DECIMAL(38, x) amounts
+                if not self.decimal_objects:
+                    try:
+                        decimals = pa.array(column, type=pa.string()).cast(decimal_type)
+                        return pd.Series(pd.arrays.ArrowExtensionArray(decimals), copy=False)
+                    except (pa.ArrowInvalid, pa.ArrowTypeError):
+                        # Values that do not fit the declared precision/scale stay Decimal objects
+                        pass
+                return series.map(_decimal)
+            if type_name == "BOOLEAN":
+                booleans = series.str.lower().map({"true": True, "false": False})
+                return booleans.astype(ARROW_DTYPES[type_name] if self.arrow else NUMPY_DTYPES[type_name])
+            if type_name in NUMPY_DTYPES:
+                try:
+                    # Fast path: numpy parses the strings directly when all are well-formed numbers
+                    numbers = pd.Series(column.astype(np.float64 if type_name in FLOAT_TYPES else np.int64), copy=False)
+                except (ValueError, TypeError, OverflowError):
+                    numbers = pd.to_numeric(series, errors="coerce", dtype_backend="numpy_nullable")
+                return numbers.astype(ARROW_DTYPES[type_name] if self.arrow else NUMPY_DTYPES[type_name])
+            if type_name == "DATE":
+                return pd.to_datetime(series, format="%Y-%m-%d", errors="coerce")
+            if type_name in DATE_TYPES:
+                return pd.to_datetime(series, format="ISO8601", errors="coerce", utc=type_name == "TIMESTAMP")
+        except (ValueError, TypeError, OverflowError) as e:
+            logger.warning(f"Could not convert {type_name} column, keeping text: {str(e)}")
+        return series
+
+    def _compact_text(self, column: pd.Series, type_name: str) -> pd.Series:
+        """Categorical for repetitive text, otherwise Arrow strings when enabled"""
+        if column.dtype != object:
+            return column
+        if type_name in STRING_TYPES and len(column) >= MIN_CATEGORY_ROWS:
+            # Check a sample first so mostly-unique columns skip the full count
+            sample = column.iloc[::max(1, len(column) // SIZE_SAMPLE)]
+            if sample.nunique(dropna=True) <= RESULT_CATEGORY_RATIO * len(sample) \
+                    and column.nunique(dropna=True) <= RESULT_CATEGORY_RATIO * len(column):
+                return column.astype("category")
+        if self.arrow and type_name in STRING_TYPES:
+            return column.astype("string[pyarrow]")
+        return column
+
+    def to_frame(self) -> pd.DataFrame:
+        """Combine the decoded chunks into the final DataFrame and report memory saved"""
+        if not self._chunks:
+            return pd.DataFrame(columns=self.names)
+
+        df = self._chunks[0] if len(self._chunks) == 1 else pd.concat(self._chunks, ignore_index=True, copy=False)
+        self._chunks = []
+        for i, type_name in enumerate(self.types):
+            df[i] = self._compact_text(df[i], type_name)
+        df.columns = self.names
+
+        bytes_typed = sum(
+            _object_bytes(df[name].to_numpy()) if df[name].dtype == object else int(df[name].memory_usage(index=False, deep=True))
+            for name in df.columns
+        )
+        decoder_stats.record(self.rows, self.bytes_as_strings, bytes_typed)
+        logger.info(
+            f"Decoded {self.rows} rows x {len(self.names)} columns: "
+            f"{self.bytes_as_strings / 1e6:.2f} MB as strings -> {bytes_typed / 1e6:.2f} MB typed"
+        )
+        return df
+
+
+def decode_result(data_array: List[List[Optional[str]]], schema: Dict[str, Any], arrow: bool = RESULT_ARROW_DTYPES) -> pd.DataFrame:
+    """Decode one statement result into a typed DataFrame (see ResultDecoder)"""
+    decoder = ResultDecoder(schema, arrow)
+    decoder.append(data_array)
+    return decoder.to_frame()
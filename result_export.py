@@ -0,0 +1,101 @@
+import io
+import re
+import logging
+from typing import Iterator, Optional
+import flask
+import pyarrow.parquet as pq
+from config import EXPORT_BATCH_ROWS
+from result_store import result_store
+
+logger = logging.getLogger(__name__)
+
+# Bytes read per block when streaming a stored Parquet file as-is
+PARQUET_BLOCK_SIZE = 1024 * 1024
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def iter_csv(result_id: str, batch_rows: int = EXPORT_BATCH_ROWS) -> Optional[Iterator[str]]:
+    """
+    Stream a stored result as CSV, batch_rows rows at a time.
+
+    Reads record batches straight from the stored Parquet file, so the full
+    table is never materialized; falls back to slicing this worker's in-memory
+    copy when the store is disabled.
+
+    Returns:
+        An iterator of CSV text chunks, or None if the result is gone
+    """
+    path = result_store.table_file(result_id)
+    if path is not None:
+        # Opened now so a concurrent eviction cannot remove the file from under the stream
+        parquet_file = pq.ParquetFile(path)
+
+        def generate():
+            for i, batch in enumerate(parquet_file.iter_batches(batch_size=batch_rows)):
+                yield batch.to_pandas().to_csv(index=False, header=i == 0)
+        return generate()
+
+    df = result_store.cached_table(result_id)
+    if df is None:
+        return None
+
+    def generate_from_memory():
+        for start in range(0, max(len(df), 1), batch_rows):
+            yield df.iloc[start:start + batch_rows].to_csv(index=False, header=start == 0)
+    return generate_from_memory()
+
+
+def iter_parquet(result_id: str) -> Optional[Iterator[bytes]]:
+    """
+    Stream a stored result as Parquet.
+
+    The stored file already is Parquet, so it is sent block by block unchanged;
+    with the store disabled, this worker's in-memory copy is serialized instead.
+
+    Returns:
+        An iterator of byte blocks, or None if the result is gone
+    """
+    path = result_store.table_file(result_id)
+    if path is not None:
+        handle = open(path, "rb")
+    else:
+        df = result_store.cached_table(result_id)
+        if df is None:
+            return None
+        handle = io.BytesIO()
+        df.to_parquet(handle, index=False)
+        handle.seek(0)
+
+    def generate():
+        with handle:
+            while True:
+                block = handle.read(PARQUET_BLOCK_SIZE)
+                if not block:
+                    break
+                yield block
+    return generate()
+
+
+def register_export_routes(app) -> None:
+    """Serve /export/<result_id>.<csv|parquet> downloads from the Dash app's Flask server"""
+
+    @app.server.route("/export/<result_id>.<fmt>")
+    def export_result(result_id, fmt):
+        if fmt not in EXPORT_FORMATS or not re.fullmatch(r"[0-9a-f]{32}", result_id):
+            flask.abort(404)
+
+        chunks = iter_csv(result_id) if fmt == "csv" else iter_parquet(result_id)
+        if chunks is None:
+            logger.info(f"Export of unknown or evicted result {result_id}")
+            flask.abort(404)
+
+        # A plain streamed download: it runs on its own request thread, never in a callback
+        return flask.Response(
+            flask.stream_with_context(chunks),
+            mimetype=EXPORT_FORMATS[fmt],
+            headers={"Content-Disposition": f"attachment; filename=genie-result-{result_id[:8]}.{fmt}"}
+        )
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
+from config import RESULT_FETCH_CONCURRENCY, RESULT_MAX_ROWS, RESULT_MAX_MB
+from async_runtime import run_blocking
+from result_decoder import ResultDecoder
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+
+class _FetchStats:
+    """Chunk fetch totals, published under 'result_fetch' in /metrics"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"results": 0, "chunks": 0, "external_links": 0, "truncated": 0}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+
+fetch_stats = _FetchStats()
+
+register_stats("result_fetch", fetch_stats.snapshot)
+
+
+class _Budget:
+    """Row and byte caps for one result"""
+    def __init__(self, max_rows: int, max_bytes: int):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows = 0
+        self.bytes = 0
+        self.truncated = False
+
+    @property
+    def exhausted(self) -> bool:
+        return self.rows >= self.max_rows or self.bytes >= self.max_bytes
+
+    def take(self, rows: List[List[Optional[str]]], size: int) -> List[List[Optional[str]]]:
+        """Admit a chunk, trimming it to the row cap; nothing more is admitted once a cap is reached"""
+        if self.exhausted:
+            self.truncated = True
+            return []
+        if self.rows + len(rows) > self.max_rows:
+            rows = rows[:self.max_rows - self.rows]
+            self.truncated = True
+        self.rows += len(rows)
+        self.bytes += size
+        return rows
+
+
+async def _fetch_chunk(client, statement_id: str, chunk_index: int) -> Tuple[List[List[Optional[str]]], int]:
+    """Fetch one chunk's rows, following its external links if it has no inline data"""
+    chunk = await client.get_result_chunk(statement_id, chunk_index)
+    return await _chunk_rows(client, chunk)
+
+
+def _estimate_bytes(rows: List[List[Optional[str]]]) -> int:
+    """Approximate JSON size of rows from a sample, for chunks that do not report byte_count"""
+    if not rows:
+        return 0
+    sample = rows[:100]
+    return len(json.dumps(sample)) * len(rows) // len(sample)
+
+
+async def _chunk_rows(client, chunk: Dict[str, Any], byte_count: Optional[int] = None) -> Tuple[List[List[Optional[str]]], int]:
+    fetch_stats.count("chunks")
+    if chunk.get("data_array"):
+        rows = chunk["data_array"]
+        return rows, byte_count or chunk.get("byte_count") or _estimate_bytes(rows)
+
+    rows, size = [], 0
+    for link in chunk.get("external_links") or []:
+        fetch_stats.count("external_links")
+        link_rows = await client.fetch_external_link(link["external_link"])
+        rows.extend(link_rows)
+        size += link.get("byte_count") or _estimate_bytes(link_rows)
+    return rows, size
+
+
+def _planned_chunks(manifest: Dict[str, Any], first_next: Optional[int], budget: _Budget) -> Optional[List[int]]:
+    """
+    Chunk indexes to fetch after the first one, stopping where the manifest says a
+    cap would be crossed, or None when the chunk count is unknown
+    """
+    total = manifest.get("total_chunk_count")
+    if total is None:
+        return None
+    if first_next is None:
+        first_next = 1
+
+    sizes = {chunk.get("chunk_index"): chunk for chunk in manifest.get("chunks", [])}
+    rows, size = budget.rows, budget.bytes
+    planned = []
+    for index in range(first_next, total):
+        if rows >= budget.max_rows or size >= budget.max_bytes:
+            budget.truncated = True
+            break
+        planned.append(index)
+        rows += sizes.get(index, {}).get("row_count", 0)
+        size += sizes.get(index, {}).get("byte_count", 0)
+    return planned
+
+
+async def fetch_result_frame(client, query_result: Dict[str, Any],
+                             max_rows: int = RESULT_MAX_ROWS,
+                             max_bytes: int = int(RESULT_MAX_MB * 1024 * 1024),
+                             concurrency: int = RESULT_FETCH_CONCURRENCY) -> Optional[pd.DataFrame]:
+    """
+    Fetch every chunk of a query result and decode it into one typed DataFrame.
+
+    The first chunk comes with the query result; the rest are fetched through the
+    statement result API, at most `concurrency` at a time, and handed to the
+    decoder in order as they arrive, so only the chunks in that window are held
+    as raw rows. Fetching stops at max_rows or max_bytes; the frame is then
+    marked with attrs["truncated"] and attrs["total_row_count"].
+
+    Args:
+        client: AsyncGenieClient to fetch with
+        query_result: Payload returned by get_query_result
+
+    Returns:
+        The decoded DataFrame, or None if the result has no rows
+    """
+    manifest = query_result.get("manifest", {})
+    statement_id = query_result.get("statement_id")
+    decoder = ResultDecoder(query_result.get("schema", {}))
+    budget = _Budget(max_rows, max_bytes)
+    fetch_stats.count("results")
+
+    # First chunk: inline rows, or external links when the result is large
+    first_chunk = next((chunk for chunk in manifest.get("chunks", []) if chunk.get("chunk_index") == 0), {})
+    first_rows, first_size = await _chunk_rows(client, query_result, first_chunk.get("byte_count"))
+    await run_blocking(decoder.append, budget.take(first_rows, first_size))
+    del first_rows
+
+    next_index = query_result.get("next_chunk_index")
+    planned = _planned_chunks(manifest, next_index, budget)
+    if statement_id and planned:
+        # Known chunk count: fetch a sliding window of chunks concurrently, decode in order
+        tasks: Dict[int, asyncio.Task] = {}
+        try:
+            for position, index in enumerate(planned):
+                for ahead in planned[position:position + concurrency]:
+                    if ahead not in tasks:
+                        tasks[ahead] = asyncio.ensure_future(_fetch_chunk(client, statement_id, ahead))
+                rows, size = await tasks.pop(index)
+                await run_blocking(decoder.append, budget.take(rows, size))
+                del rows
+                if budget.exhausted and position + 1 < len(planned):
+                    budget.truncated = True
+                    break
+        finally:
+            for task in tasks.values():
+                task.cancel()
+    elif statement_id and planned is None:
+        # Unknown chunk count: follow next_chunk_index one chunk at a time
+        while next_index is not None and not budget.exhausted:
+            chunk = await client.get_result_chunk(statement_id, next_index)
+            rows, size = await _chunk_rows(client, chunk)
+            await run_blocking(decoder.append, budget.take(rows, size))
+            del rows
+            next_index = chunk.get("next_chunk_index")
+        if next_index is not None:
+            budget.truncated = True
+
+    if decoder.rows == 0:
+        return None
+
+    df = await run_blocking(decoder.to_frame)
+    total_rows = manifest.get("total_row_count", decoder.rows)
+    if budget.truncated or manifest.get("truncated") or total_rows > decoder.rows:
+        fetch_stats.count("truncated")
+        df.attrs["truncated"] = True
+        df.attrs["total_row_count"] = total_rows
+        logger.warning(f"Result truncated to {decoder.rows} of {total_rows} rows")
+    return df
@@ -0,0 +1,160 @@
+import re
+import json
+import threading
+import logging
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from result_store import result_store
+
+logger = logging.getLogger(__name__)
+
+# DataTable filter operators, in the order they must be tried (longest first)
+FILTER_OPERATORS = [
+    ("ge ", ">="), ("le ", "<="), ("lt ", "<"), ("gt ", ">"), ("ne ", "!="), ("eq ", "="),
+    ("contains ",), ("datestartswith ",)
+]
+
+# Row orders computed for a (result id, filter, sort), so paging a sorted view does not re-sort
+MAX_CACHED_VIEWS = 64
+_views: "OrderedDict[Tuple[str, str, str], np.ndarray]" = OrderedDict()
+_views_lock = threading.Lock()
+
+
+def split_filter_part(filter_part: str) -> Tuple[Optional[str], Optional[str], Any]:
+    """Split one DataTable filter expression like '{col} > 5' into (column, operator, value)"""
+    start, end = filter_part.find("{"), filter_part.find("}")
+    if start < 0 or end < start:
+        return None, None, None
+    name = filter_part[start + 1:end]
+    # Only the text after the column is searched, so operators inside a quoted value are not matched
+    rest = filter_part[end + 1:].lstrip()
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if rest.startswith(operator):
+                value_part = rest[len(operator):].strip()
+                quote = value_part[0] if value_part else ""
+                if quote and quote == value_part[-1] and quote in ("'", '"', "`"):
+                    value = re.sub(f"\\\\{quote}", quote, value_part[1:-1])
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+                # Word operators and their symbols are equivalent
+                return name, operator_type[0].strip(), value
+    return None, None, None
+
+
+def _numeric(column: pd.Series) -> Optional[pd.Series]:
+    """The column as numbers if every non-null value is numeric, otherwise None"""
+    if pd.api.types.is_numeric_dtype(column):
+        return column
+    converted = pd.to_numeric(column, errors="coerce")
+    return converted if converted.notna().sum() == column.notna().sum() else None
+
+
+def _text(value: Any) -> str:
+    """A filter value as text, whole numbers written without a decimal point"""
+    return str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+
+
+def _filter_mask(df: pd.DataFrame, filter_query: str) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    for part in filter_query.split(" && "):
+        name, operator, value = split_filter_part(part)
+        if name not in df.columns:
+            continue
+        column = df[name]
+        if operator == "contains":
+            mask &= column.astype(str).str.contains(_text(value), case=False, regex=False).to_numpy()
+        elif operator == "datestartswith":
+            mask &= column.astype(str).str.startswith(_text(value)).to_numpy()
+        else:
+            numbers = _numeric(column) if isinstance(value, float) else None
+            left, right = (numbers, value) if numbers is not None else (column.astype(str), _text(value))
+            compare = {"eq": left.eq, "ne": left.ne, "lt": left.lt, "le": left.le, "gt": left.gt, "ge": left.ge}[operator]
+            mask &= compare(right).fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+def _view(result_id: str, df: pd.DataFrame, sort_by: List[Dict[str, str]], filter_query: str) -> np.ndarray:
+    """Positions of the filtered rows in sort order"""
+    key = (result_id, filter_query, json.dumps(sort_by, sort_keys=True))
+    with _views_lock:
+        rows = _views.get(key)
+        if rows is not None:
+            _views.move_to_end(key)
+            return rows
+
+    rows = np.flatnonzero(_filter_mask(df, filter_query)) if filter_query else np.arange(len(df))
+    sort_by = [sort for sort in sort_by if sort.get("column_id") in df.columns]
+    if sort_by:
+        view = df.iloc[rows]
+        keys = pd.DataFrame(index=range(len(rows)))
+        for i, sort in enumerate(sort_by):
+            # Numbers stored as text still sort numerically
+            numbers = _numeric(view[sort["column_id"]])
+            keys[i] = (numbers if numbers is not None else view[sort["column_id"]]).reset_index(drop=True)
+        order = keys.sort_values(
+            by=list(keys.columns),
+            ascending=[sort.get("direction") != "desc" for sort in sort_by],
+            kind="stable",
+            na_position="last"
+        ).index.to_numpy()
+        rows = rows[order]
+
+    with _views_lock:
+        _views[key] = rows
+        while len(_views) > MAX_CACHED_VIEWS:
+            _views.popitem(last=False)
+    return rows
+
+
+def _display_column(page_column: pd.Series, column: pd.Series) -> pd.Series:
+    """
+    One column of a page as DataTable shows it: dates as YYYY-MM-DD, timestamps
+    as 'YYYY-MM-DD HH:MM:SS' without the UTC offset, and decimals as exact text
+    """
+    if pd.api.types.is_datetime64_any_dtype(column):
+        # DATE columns are timezone-naive with every value at midnight (checked on the whole column so all pages agree)
+        values = column.dropna()
+        is_date = column.dt.tz is None and bool((values == values.dt.normalize()).all())
+        text = page_column.dt.strftime("%Y-%m-%d" if is_date else "%Y-%m-%d %H:%M:%S")
+        return text.astype(object).where(page_column.notna(), None)
+    if column.dtype == object or isinstance(column.dtype, pd.ArrowDtype) and pa.types.is_decimal(column.dtype.pyarrow_dtype):
+        return page_column.astype(object).map(lambda value: str(value) if isinstance(value, Decimal) else value)
+    return page_column
+
+
+def get_page(result_id: str, page_current: int, page_size: int,
+             sort_by: Optional[List[Dict[str, str]]] = None,
+             filter_query: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Compute one page of a stored result table.
+
+    Args:
+        result_id: Id returned by result_store.save_table
+        page_current: Zero-based page number
+        page_size: Rows per page
+        sort_by: DataTable sort_by (list of column_id/direction)
+        filter_query: DataTable filter_query
+
+    Returns:
+        Tuple of (records of the page, page count); no records if the table is gone
+    """
+    df = result_store.load_table(result_id)
+    if df is None:
+        return [], 0
+
+    rows = _view(result_id, df, sort_by or [], (filter_query or "").strip())
+    page_count = max(1, -(-len(rows) // page_size))
+    page_current = min(max(page_current or 0, 0), page_count - 1)
+    page = df.iloc[rows[page_current * page_size:(page_current + 1) * page_size]]
+    page = page.copy()
+    for i in range(len(df.columns)):
+        page.isetitem(i, _display_column(page.iloc[:, i], df.iloc[:, i]))
+    return page.to_dict("records"), page_count
@@ -0,0 +1,378 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
+import pandas as pd
+from config import RESULT_STORE_DIR, RESULT_STORE_MAX_MB, RESULT_TABLE_CACHE_MB, ANSWER_CACHE_TTL
+from metrics import register_stats
+from utils import ThreadLocalSQLite
+from answer_cache import estimate_size
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    space_id TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    question TEXT NOT NULL,
+    text TEXT,
+    query_text TEXT,
+    file TEXT,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (space_id, question_key)
+);
+CREATE INDEX IF NOT EXISTS answers_accessed_at ON answers (accessed_at);
+CREATE TABLE IF NOT EXISTS tables (
+    result_id TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+"""
+
+
+class DiskResultStore:
+    """
+    Persistent answer and result-table store shared by every worker process on the host.
+
+    Answers are keyed by normalized question; result tables shown in the chat
+    are keyed by a result id so pages can be served without the browser holding
+    the table. Metadata lives in a SQLite database (WAL mode, so readers never block and
+    concurrent writers serialize on SQLite's lock); DataFrames are written as
+    Parquet files next to it, text answers inline. Files are written under a
+    temporary name and renamed into place, so readers never see partial files.
+    Answers expire after ttl seconds, and the least recently accessed answers
+    and tables are evicted once their total size exceeds max_bytes. Recently
+    used tables are also kept in memory, up to table_cache_bytes.
+    """
+
+    def __init__(self, directory: str = RESULT_STORE_DIR,
+                 max_bytes: int = int(RESULT_STORE_MAX_MB * 1024 * 1024),
+                 ttl: float = ANSWER_CACHE_TTL,
+                 table_cache_bytes: int = int(RESULT_TABLE_CACHE_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.table_cache_bytes = table_cache_bytes
+        self._connection = ThreadLocalSQLite(os.path.join(directory, "results.db"))
+        self._tables: "OrderedDict[str, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._table_bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0,
+                       "table_loads": 0, "table_misses": 0}
+        self._stats_lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._connection().executescript(SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _path(self, file: str) -> str:
+        return os.path.join(self.directory, file)
+
+    def get(self, question_key: str, space_id: str) -> Optional[Tuple[Union[str, pd.DataFrame], Optional[str]]]:
+        """
+        Look up a fresh answer by normalized question.
+
+        Returns:
+            (result, query_text) on a hit, otherwise None
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT text, query_text, file, created_at FROM answers WHERE space_id = ? AND question_key = ?",
+                (space_id, question_key)
+            ).fetchone()
+            if row is None or time.time() - row[3] > self.ttl:
+                self._count("misses")
+                return None
+
+            text, query_text, file, _ = row
+            result = pd.read_parquet(self._path(file)) if file else text
+            connection.execute(
+                "UPDATE answers SET accessed_at = ? WHERE space_id = ? AND question_key = ?",
+                (time.time(), space_id, question_key)
+            )
+            self._count("hits")
+            return result, query_text
+        except (OSError, sqlite3.Error) as e:
+            # A concurrent eviction may remove the file between the lookup and the read
+            logger.warning(f"Result store read failed: {str(e)}")
+            self._count("misses")
+            return None
+
+    def put(self, question_key: str, space_id: str, question: str,
+            result: Union[str, pd.DataFrame], query_text: Optional[str]) -> None:
+        """Store an answer, replacing any previous one for the question, then enforce the size budget"""
+        if not self.enabled or isinstance(result, list):
+            # Multi-attachment answers stay in the in-memory cache only
+            return
+
+        file = None
+        text = None
+        try:
+            if isinstance(result, pd.DataFrame):
+                file = f"{uuid.uuid4().hex}.parquet"
+                temp_path = self._path(file + ".tmp")
+                result.to_parquet(temp_path, index=False)
+                os.replace(temp_path, self._path(file))
+                size = os.path.getsize(self._path(file))
+            else:
+                text = result
+                size = len(result.encode("utf-8"))
+            size += len((query_text or "").encode("utf-8"))
+
+            now = time.time()
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                previous = connection.execute(
+                    "SELECT file FROM answers WHERE space_id = ? AND question_key = ?",
+                    (space_id, question_key)
+                ).fetchone()
+                connection.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (space_id, question_key, question, text, query_text, file, size, now, now)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            logger.error(f"Result store write failed: {str(e)}")
+            self._count("errors")
+            if file:
+                self._remove_file(file)
+            return
+
+        # The answer is committed: from here on its file must stay
+        self._count("writes")
+        if previous and previous[0]:
+            self._remove_file(previous[0])
+        self._enforce_budget()
+
+    def save_table(self, df: pd.DataFrame) -> str:
+        """
+        Keep a result table server-side.
+
+        The table is cached in memory and, when the store is enabled, written to
+        disk so any worker can serve it.
+
+        Returns:
+            The result id to load it by
+        """
+        result_id = uuid.uuid4().hex
+        self._remember_table(result_id, df)
+        if not self.enabled:
+            return result_id
+
+        file = f"{result_id}.parquet"
+        try:
+            temp_path = self._path(file + ".tmp")
+            df.to_parquet(temp_path, index=False)
+            os.replace(temp_path, self._path(file))
+            now = time.time()
+            self._connection().execute(
+                "INSERT INTO tables VALUES (?, ?, ?, ?, ?)",
+                (result_id, file, os.path.getsize(self._path(file)), now, now)
+            )
+        except Exception as e:
+            # The in-memory copy still serves this worker
+            logger.error(f"Failed to persist result table: {str(e)}")
+            self._count("errors")
+            self._remove_file(file)
+            return result_id
+
+        self._enforce_budget()
+        return result_id
+
+    def load_table(self, result_id: str) -> Optional[pd.DataFrame]:
+        """Load a result table saved by any worker, or None if it is gone"""
+        with self._stats_lock:
+            entry = self._tables.get(result_id)
+            if entry is not None:
+                self._tables.move_to_end(result_id)
+                return entry[0]
+        if not self.enabled:
+            self._count("table_misses")
+            return None
+
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT file FROM tables WHERE result_id = ?", (result_id,)).fetchone()
+            if row is None:
+                self._count("table_misses")
+                return None
+            df = pd.read_parquet(self._path(row[0]))
+            connection.execute("UPDATE tables SET accessed_at = ? WHERE result_id = ?", (time.time(), result_id))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Failed to load result table {result_id}: {str(e)}")
+            self._count("table_misses")
+            return None
+        self._count("table_loads")
+        self._remember_table(result_id, df)
+        return df
+
+    def table_file(self, result_id: str) -> Optional[str]:
+        """Path of a result table's Parquet file, for streaming it without loading it"""
+        if not self.enabled:
+            return None
+        row = self._connection().execute("SELECT file FROM tables WHERE result_id = ?", (result_id,)).fetchone()
+        if row is None or not os.path.exists(self._path(row[0])):
+            return None
+        return self._path(row[0])
+
+    def cached_table(self, result_id: str) -> Optional[pd.DataFrame]:
+        """A result table held in this worker's memory, without touching disk"""
+        with self._stats_lock:
+            entry = self._tables.get(result_id)
+            return entry[0] if entry is not None else None
+
+    def _remember_table(self, result_id: str, df: pd.DataFrame) -> None:
+        size = estimate_size(df, None)
+        if size > self.table_cache_bytes:
+            return
+        with self._stats_lock:
+            self._tables[result_id] = (df, size)
+            self._table_bytes += size
+            while self._table_bytes > self.table_cache_bytes:
+                _, (_, evicted_size) = self._tables.popitem(last=False)
+                self._table_bytes -= evicted_size
+
+    def _enforce_budget(self) -> None:
+        """Run _evict() after a committed write; a failure is logged and leaves the new entry alone"""
+        try:
+            self._evict()
+        except Exception as e:
+            logger.error(f"Result store eviction failed: {str(e)}")
+            self._count("errors")
+
+    def _evict(self) -> None:
+        """Delete expired entries, then least recently accessed ones until under max_bytes"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            removed = connection.execute(
+                "SELECT file FROM answers WHERE created_at < ?", (time.time() - self.ttl,)
+            ).fetchall()
+            connection.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl,))
+
+            total = connection.execute(
+                "SELECT (SELECT COALESCE(SUM(size_bytes), 0) FROM answers) + "
+                "(SELECT COALESCE(SUM(size_bytes), 0) FROM tables)"
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                rows = connection.execute(
+                    "SELECT space_id, question_key, file, size_bytes, accessed_at FROM answers "
+                    "UNION ALL SELECT NULL, result_id, file, size_bytes, accessed_at FROM tables "
+                    "ORDER BY accessed_at"
+                ).fetchall()
+                for space_id, key, file, size, _ in rows:
+                    if total <= self.max_bytes:
+                        break
+                    if space_id is None:
+                        connection.execute("DELETE FROM tables WHERE result_id = ?", (key,))
+                    else:
+                        connection.execute(
+                            "DELETE FROM answers WHERE space_id = ? AND question_key = ?", (space_id, key)
+                        )
+                    removed.append((file,))
+                    total -= size
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        for (file,) in removed:
+            if file:
+                self._remove_file(file)
+        if removed:
+            self._count("evictions", len(removed))
+
+    def invalidate(self, question_key: Optional[str] = None, space_id: Optional[str] = None) -> int:
+        """
+        Drop stored answers.
+
+        Args:
+            question_key: Only drop this normalized question, otherwise every question
+            space_id: Only drop entries of this space, otherwise every space
+
+        Returns:
+            Number of entries removed
+        """
+        if not self.enabled:
+            return 0
+
+        conditions, params = [], []
+        if space_id is not None:
+            conditions.append("space_id = ?")
+            params.append(space_id)
+        if question_key is not None:
+            conditions.append("question_key = ?")
+            params.append(question_key)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            files = connection.execute(f"SELECT file FROM answers{where}", params).fetchall()
+            connection.execute(f"DELETE FROM answers{where}", params)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        for (file,) in files:
+            if file:
+                self._remove_file(file)
+        return len(files)
+
+    def questions(self, space_id: str) -> List[Tuple[str, str]]:
+        """(question_key, question) of every fresh entry in a space"""
+        if not self.enabled:
+            return []
+        return self._connection().execute(
+            "SELECT question_key, question FROM answers WHERE space_id = ? AND created_at >= ?",
+            (space_id, time.time() - self.ttl)
+        ).fetchall()
+
+    def _remove_file(self, file: str) -> None:
+        try:
+            os.remove(self._path(file))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove result file {file}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters of this process plus the shared store's size"""
+        with self._stats_lock:
+            stats = dict(self._stats, tables_in_memory=len(self._tables), table_memory_bytes=self._table_bytes)
+        if self.enabled:
+            entries, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM answers"
+            ).fetchone()
+            tables, table_bytes = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM tables"
+            ).fetchone()
+            stats.update(entries=entries, tables=tables, bytes=total + table_bytes, max_bytes=self.max_bytes)
+        return stats
+
+
+result_store = DiskResultStore()
+
+register_stats("result_store", result_store.get_stats)
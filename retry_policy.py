@@ -0,0 +1,250 @@
+import functools
+import random
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Callable, Optional
+import requests
+from urllib3.exceptions import ConnectTimeoutError
+from config import (
+    RETRY_MAX_TRIES,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    RETRY_MAX_ELAPSED,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_MIN_PER_SECOND,
+    RETRY_BUDGET_CAPACITY
+)
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: timeouts, throttling and transient server errors
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Statuses that show a request was not acted on, so even a non-idempotent call may be repeated
+REJECTED_STATUSES = {429, 503}
+
+# Monotonic time after which calls in the current context stop retrying
+_deadline: ContextVar[Optional[float]] = ContextVar("retry_deadline", default=None)
+
+
+@contextmanager
+def retry_deadline(deadline: float):
+    """
+    Stop retrying calls made inside the block once time.monotonic() reaches deadline.
+
+    Lets a caller with its own timeout (e.g. the 300s message poll) keep retries
+    within it instead of stacking a full retry schedule on top.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status behind an exception, if it came from a response"""
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+
+def _not_sent(error: Exception) -> bool:
+    """Whether the request failed before reaching the server (connection refused, DNS, connect timeout)"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # requests wraps urllib3's MaxRetryError, whose reason says how the connection failed
+        return isinstance(getattr(error.args[0], "reason", None), ConnectTimeoutError)
+    return False
+
+
+def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+    """
+    Whether a failed call may succeed if repeated.
+
+    Throttling, timeouts, 5xx responses and dropped connections are; other
+    HTTP errors (400, 401, 403, 404, ...) and non-HTTP errors are not. A call
+    that is not idempotent (a POST creating something) is only repeated when
+    the server cannot have acted on it: the connection was never made, or the
+    response was 429/503 or carried a Retry-After header.
+    """
+    if isinstance(error, requests.HTTPError):
+        status = error_status(error)
+        if idempotent:
+            return status in RETRYABLE_STATUSES
+        return status in REJECTED_STATUSES or (status in RETRYABLE_STATUSES and retry_after(error) is not None)
+    if not idempotent:
+        return _not_sent(error)
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After, in seconds or as an HTTP date), if any"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """
+    Process-wide allowance of retries.
+
+    Every call deposits `ratio` of a retry and the balance also refills at
+    `min_per_second`, up to `capacity`; each retry withdraws one. During an outage
+    the balance drains and further failures are returned immediately, so retries
+    add at most about `ratio` extra load instead of multiplying it.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+                 capacity: float = RETRY_BUDGET_CAPACITY):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._balance = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._balance = min(self.capacity, self._balance + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        """Credit one call"""
+        with self._lock:
+            self._refill()
+            self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take one retry from the budget, returning False if none is left"""
+        with self._lock:
+            self._refill()
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+    @property
+    def balance(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._balance
+
+
+class RetryPolicy:
+    """
+    Retries retryable failures with capped, jittered exponential backoff.
+    Calls marked not idempotent are only retried when the request cannot have
+    been acted on (see is_retryable).
+
+    A server's Retry-After hint replaces the computed delay. A call gives up
+    after max_tries attempts, when the next wait would take it past max_elapsed
+    seconds or the caller's retry_deadline, or when the shared RetryBudget is
+    empty. Attempts, retries and outcomes are counted per endpoint.
+    """
+
+    def __init__(self, max_tries: int = RETRY_MAX_TRIES, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, max_elapsed: float = RETRY_MAX_ELAPSED,
+                 budget: Optional[RetryBudget] = None):
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_elapsed = max_elapsed
+        self.budget = budget or RetryBudget()
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def _count(self, endpoint: str, name: str, status: Optional[int] = None) -> None:
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                "calls": 0, "retries": 0, "not_retryable": 0,
+                "gave_up": 0, "budget_denied": 0, "statuses": {}
+            })
+            stats[name] += 1
+            if status is not None:
+                stats["statuses"][str(status)] = stats["statuses"].get(str(status), 0) + 1
+
+    def _delay(self, attempt: int, error: Exception) -> float:
+        hint = retry_after(error)
+        if hint is not None:
+            return hint
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, endpoint: str, func: Callable, *args, idempotent: bool = True, **kwargs) -> Any:
+        """
+        Call func(*args, **kwargs), retrying retryable failures.
+
+        Args:
+            endpoint: Name the attempts are counted under
+            idempotent: False for calls that must not run twice (e.g. a POST sending a question)
+
+        Returns:
+            What func returns; the last error is raised once retrying stops
+        """
+        give_up_at = time.monotonic() + self.max_elapsed
+        deadline = _deadline.get()
+        if deadline is not None:
+            give_up_at = min(give_up_at, deadline)
+        self.budget.deposit()
+        self._count(endpoint, "calls")
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = error_status(e)
+                if not is_retryable(e, idempotent):
+                    self._count(endpoint, "not_retryable", status)
+                    raise
+
+                delay = self._delay(attempt, e)
+                if attempt >= self.max_tries or time.monotonic() + delay > give_up_at:
+                    self._count(endpoint, "gave_up", status)
+                    raise
+                if not self.budget.withdraw():
+                    logger.warning(f"{endpoint} failed and the retry budget is exhausted; not retrying")
+                    self._count(endpoint, "budget_denied", status)
+                    raise
+
+                self._count(endpoint, "retries", status)
+                logger.warning(
+                    f"{endpoint} failed ({status or type(e).__name__}). "
+                    f"Retrying in {delay:.2f} seconds (attempt {attempt})"
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-endpoint counters plus the remaining retry budget"""
+        with self._lock:
+            endpoints = {name: {**stats, "statuses": dict(stats["statuses"])} for name, stats in self._endpoints.items()}
+        return {"budget": round(self.budget.balance, 2), "endpoints": endpoints}
+
+
+genie_retries = RetryPolicy()
+
+register_stats("retries", genie_retries.get_stats)
+
+
+def retrying(endpoint: str, policy: Optional[RetryPolicy] = None, idempotent: bool = True) -> Callable:
+    """Decorator running a function through a RetryPolicy (genie_retries by default)"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return (policy or genie_retries).call(endpoint, func, *args, idempotent=idempotent, **kwargs)
+        return wrapper
+    return decorator
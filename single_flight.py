@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, Hashable, List, Optional
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight call and everyone waiting on it"""
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 1
+        self.listeners: List[Callable] = []
+
+    def emit(self, *args) -> None:
+        for listener in list(self.listeners):
+            try:
+                listener(*args)
+            except Exception as e:
+                logger.error(f"Coalesced status listener failed: {str(e)}")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for the same result instead of starting their own. Progress
+    updates emitted by the running call are broadcast to every waiter. Must be
+    used from a single event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = {"calls": 0, "coalesced": 0, "max_waiters": 0}
+
+    async def do(self, key: Hashable, call_fn: Callable[[Callable], Awaitable],
+                 on_update: Optional[Callable] = None) -> Any:
+        """
+        Run call_fn(emit) once per key at a time.
+
+        Args:
+            key: Identifies identical calls
+            call_fn: Called with an emit function (broadcasting to every waiter's
+                on_update) and returns the awaitable to run
+            on_update: Optional listener for this caller
+
+        Returns:
+            The shared result of the call
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            call.waiters += 1
+            self._stats["coalesced"] += 1
+            self._stats["max_waiters"] = max(self._stats["max_waiters"], call.waiters)
+            if on_update is not None:
+                call.listeners.append(on_update)
+            # Shield so a waiter giving up does not cancel the call for everyone else
+            return await asyncio.shield(call.future)
+
+        call = _Call(asyncio.get_running_loop().create_future())
+        if on_update is not None:
+            call.listeners.append(on_update)
+        self._calls[key] = call
+        self._stats["calls"] += 1
+        try:
+            result = await call_fn(call.emit)
+            call.future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            call.future.cancel()
+            raise
+        except Exception as e:
+            call.future.set_exception(e)
+            raise
+        finally:
+            del self._calls[key]
+            # Nobody else awaited the future; mark any exception as retrieved
+            if call.waiters == 1 and call.future.done() and not call.future.cancelled():
+                call.future.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals plus the number of waiters on each call still in flight"""
+        return {
+            **self._stats,
+            "in_flight": len(self._calls),
+            "waiters": sum(call.waiters for call in self._calls.values())
+        }
+
+
+genie_requests = SingleFlight()
+
+register_stats("single_flight", genie_requests.get_stats)
+
+# Background refreshes of cached answers (see genie_room.refresh_answer_async)
+answer_refreshes = SingleFlight()
+
+register_stats("answer_refresh", answer_refreshes.get_stats)
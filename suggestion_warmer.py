@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
+import pandas as pd
+from config import SUGGESTION_WARM_INTERVAL, SUGGESTION_RETRY_DELAY, SUGGESTION_MAX_EDITED
+from async_runtime import run_sync
+from answer_cache import answer_cache, normalize_question
+from genie_room import warm_answer_async, get_space_id
+from metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestionWarmer:
+    """
+    Keeps answers to the welcome-screen suggestions cached ahead of the clicks.
+
+    A daemon thread warms every suggestion once started, again every interval
+    seconds, and right away when a browser saves new suggestions. The configured
+    defaults are always warmed; suggestions edited in a browser are warmed on top
+    of them (the max_edited most recent), since other sessions still show the
+    defaults. After a run with failures the next run comes after retry_delay
+    seconds, doubling on every further failed run up to interval. Answers land
+    in the regular answer cache and result store, so a click is served from
+    there; status() reports how old each answer is for the UI.
+    """
+
+    def __init__(self, interval: float = SUGGESTION_WARM_INTERVAL, retry_delay: float = SUGGESTION_RETRY_DELAY,
+                 max_edited: int = SUGGESTION_MAX_EDITED):
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.max_edited = max_edited
+        self._defaults: List[str] = []
+        self._edited: "OrderedDict[str, str]" = OrderedDict()
+        self._failed_runs = 0
+        self._warming: Dict[str, float] = {}
+        self._failed: Dict[str, str] = {}
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"runs": 0, "warmed": 0, "failures": 0, "served": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 and answer_cache.enabled
+
+    def start(self, suggestions: List[str]) -> None:
+        """Start warming the default suggestions in the background; does nothing if already started or disabled"""
+        with self._lock:
+            self._defaults = list(dict.fromkeys(suggestion for suggestion in suggestions if suggestion))
+            if not self.enabled or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="suggestion-warmer", daemon=True)
+            self._thread.start()
+
+    def add_suggestions(self, suggestions: List[str]) -> None:
+        """Also keep suggestions saved in one browser warm, warming any new ones straight away"""
+        added = False
+        with self._lock:
+            defaults = {normalize_question(suggestion) for suggestion in self._defaults}
+            for suggestion in suggestions:
+                key = normalize_question(suggestion or "")
+                if not key or key in defaults:
+                    continue
+                added = added or key not in self._edited
+                self._edited[key] = suggestion
+                self._edited.move_to_end(key, last=False)
+            while len(self._edited) > max(self.max_edited, 0):
+                self._edited.popitem()
+        if added:
+            self._wake.set()
+
+    def _suggestions(self) -> List[str]:
+        """Every suggestion being kept warm; call with the lock held"""
+        return self._defaults + list(self._edited.values())
+
+    def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                run_sync(self._warm_all())
+            except Exception as e:
+                logger.error(f"Suggestion warming failed: {str(e)}")
+                with self._lock:
+                    self._failed_runs += 1
+            self._wake.wait(self._next_delay())
+
+    def _next_delay(self) -> float:
+        """Seconds until the next run: the interval, or a backoff while suggestions keep failing"""
+        with self._lock:
+            failed_runs = self._failed_runs
+        if failed_runs == 0 or self.retry_delay <= 0:
+            return self.interval
+        return min(self.interval, self.retry_delay * 2 ** (failed_runs - 1))
+
+    async def _warm_all(self) -> None:
+        with self._lock:
+            suggestions = self._suggestions()
+            self._stats["runs"] += 1
+        await asyncio.gather(*(self._warm(suggestion) for suggestion in suggestions))
+        with self._lock:
+            failed = any(suggestion in self._failed for suggestion in suggestions)
+            self._failed_runs = self._failed_runs + 1 if failed else 0
+
+    async def _warm(self, question: str) -> None:
+        with self._lock:
+            self._warming[question] = time.time()
+        try:
+            details = await warm_answer_async(question, self.interval)
+            failed = details.get("source") == "error"
+        except Exception as e:
+            logger.error(f"Failed to warm suggestion: {str(e)}")
+            failed = True
+        with self._lock:
+            del self._warming[question]
+            if failed:
+                self._failed[question] = "error"
+                self._stats["failures"] += 1
+            else:
+                self._failed.pop(question, None)
+                self._stats["warmed"] += 1
+
+    def answer(self, question: str) -> Optional[Tuple[Union[str, pd.DataFrame], Optional[str], float]]:
+        """
+        The cached answer to a suggestion, if one is ready.
+
+        Returns:
+            (result, query_text, age in seconds), or None if it is not a current
+            suggestion or has no cached answer
+        """
+        with self._lock:
+            if normalize_question(question) not in {normalize_question(s) for s in self._suggestions()}:
+                return None
+        age = answer_cache.age(question, get_space_id())
+        cached = answer_cache.get(question, get_space_id()) if age is not None else None
+        if cached is None:
+            return None
+        with self._lock:
+            self._stats["served"] += 1
+        return cached[0], cached[1], age
+
+    def status(self, question: str) -> Dict[str, Any]:
+        """
+        How ready a suggestion's answer is.
+
+        Returns:
+            Dict with "state" ("ready", "stale", "warming", "failed" or None when
+            unknown) and, when an answer is cached, its "age" in seconds
+        """
+        age = answer_cache.age(question, get_space_id())
+        with self._lock:
+            warming = question in self._warming
+            failed = question in self._failed
+        if age is not None:
+            return {"state": "stale" if age > self.interval else "ready", "age": age, "warming": warming}
+        if warming:
+            return {"state": "warming"}
+        return {"state": "failed" if failed else None}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "suggestions": len(self._suggestions()),
+                "warming": len(self._warming),
+                "interval": self.interval
+            }
+
+
+suggestion_warmer = SuggestionWarmer()
+
+register_stats("suggestion_warmer", suggestion_warmer.get_stats)
@@ -0,0 +1,73 @@
+import asyncio
+from admission import AdmissionController
+
+
+def test_admits_within_limits():
+    async def main():
+        admission = AdmissionController(rate_per_minute=0, max_concurrent=2)
+        await admission.acquire("a")
+        await admission.acquire("a")
+        assert admission.get_stats()["active"] == 2
+        admission.release()
+        admission.release()
+        assert admission.get_stats()["queued"] == 0
+    asyncio.run(main())
+
+
+def test_waiters_are_served_round_robin_across_sessions():
+    async def main():
+        admission = AdmissionController(rate_per_minute=0, max_concurrent=1)
+        await admission.acquire("busy")
+        admitted = []
+
+        async def ask(session_id, name):
+            async with admission.slot(session_id):
+                admitted.append(name)
+
+        tasks = [asyncio.create_task(ask(session_id, name)) for session_id, name in [
+            ("busy", "busy-1"), ("busy", "busy-2"), ("busy", "busy-3"), ("other", "other-1")
+        ]]
+        await asyncio.sleep(0)
+        assert admission.queue_length == 4
+        admission.release()
+        await asyncio.gather(*tasks)
+        assert admitted == ["busy-1", "other-1", "busy-2", "busy-3"]
+    asyncio.run(main())
+
+
+def test_waiters_hear_their_position():
+    async def main():
+        admission = AdmissionController(rate_per_minute=0, max_concurrent=1)
+        await admission.acquire("a")
+        positions = []
+        waiting = asyncio.create_task(admission.acquire("b", lambda position, eta: positions.append(position)))
+        await asyncio.sleep(0)
+        admission.release()
+        await waiting
+        assert positions == [1]
+    asyncio.run(main())
+
+
+def test_rate_limit_delays_admission():
+    async def main():
+        admission = AdmissionController(rate_per_minute=600, burst=1, max_concurrent=0)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await admission.acquire("a")
+        await admission.acquire("a")
+        # The second token arrives 0.1s after the first was taken
+        assert loop.time() - started >= 0.05
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        admission = AdmissionController(rate_per_minute=0, max_concurrent=1)
+        await admission.acquire("a")
+        waiting = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert admission.queue_length == 0
+        assert admission.get_stats()["cancelled"] == 1
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+import time
+import pandas as pd
+from answer_cache import AnswerCache, normalize_question
+
+
+def test_normalize_question():
+    assert normalize_question("  What were   Sales? ") == "what were sales"
+
+
+def test_put_and_get_by_normalized_question():
+    cache = AnswerCache(ttl=60, max_bytes=1024 * 1024)
+    cache.put("Total sales?", "space", "42", "SELECT 42")
+    assert cache.get("total  sales", "space") == ("42", "SELECT 42")
+    assert cache.get("total sales", "other space") is None
+
+
+def test_entries_expire(monkeypatch):
+    cache = AnswerCache(ttl=10, max_bytes=1024 * 1024)
+    cache.put("q", "space", "answer", None)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("q", "space") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_least_recently_used_is_evicted():
+    df = pd.DataFrame({"value": range(100)})
+    cache = AnswerCache(ttl=60, max_bytes=0)
+    cache.max_bytes = int(df.memory_usage(index=True, deep=True).sum()) * 2 + 100
+    cache.put("a", "space", df, None)
+    cache.put("b", "space", df, None)
+    cache.get("a", "space")
+    cache.put("c", "space", df, None)
+    assert cache.get("b", "space") is None
+    assert cache.get("a", "space") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_oversized_answer_is_not_cached():
+    cache = AnswerCache(ttl=60, max_bytes=10)
+    cache.put("q", "space", "a long answer that does not fit", None)
+    assert cache.get("q", "space") is None
+
+
+def test_invalidate():
+    cache = AnswerCache(ttl=60, max_bytes=1024 * 1024)
+    cache.put("a", "space", "1", None)
+    cache.put("b", "space", "2", None)
+    cache.put("a", "other space", "3", None)
+    assert cache.invalidate("A?", "space") == 1
+    assert cache.get("a", "space") is None
+    assert cache.invalidate(space_id="space") == 1
+    assert cache.invalidate() == 1
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = AnswerCache(ttl=0)
+    cache.put("q", "space", "answer", None)
+    assert cache.get("q", "space") is None
@@ -0,0 +1,44 @@
+import pytest
+from chat_history import ChatHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ChatHistory(str(tmp_path), ttl=3600)
+
+
+def test_answers_fill_their_reserved_positions_in_any_order(history):
+    history.append("s", {"role": "user", "text": "first"})
+    first = history.reserve("s", "r1")
+    history.append("s", {"role": "user", "text": "second"})
+    second = history.reserve("s", "r2")
+    # The second answer is ready before the first
+    assert history.fill("s", second, "r2", {"role": "bot", "text": "answer 2"})
+    assert history.fill("s", first, "r1", {"role": "bot", "text": "answer 1"})
+    assert [record["text"] for record in history.get("s")] == ["first", "answer 1", "second", "answer 2"]
+
+
+def test_unfilled_reservation_restores_as_pending(history):
+    history.append("s", {"role": "user", "text": "question"})
+    history.reserve("s", "r1")
+    assert history.get("s")[1]["role"] == "pending"
+
+
+def test_fill_after_clear_is_rejected(history):
+    position = history.reserve("s", "r1")
+    history.clear("s")
+    history.append("s", {"role": "user", "text": "new chat"})
+    assert not history.fill("s", position, "r1", {"role": "bot", "text": "stale"})
+    assert history.get("s") == [{"role": "user", "text": "new chat"}]
+
+
+def test_fill_needs_the_matching_request(history):
+    position = history.reserve("s", "r1")
+    assert not history.fill("s", position, "other", {"role": "bot", "text": "wrong"})
+    assert history.fill("s", position, "r1", {"role": "bot", "text": "right"})
+
+
+def test_sessions_are_separate(history):
+    history.append("a", {"role": "user", "text": "a"})
+    history.append("b", {"role": "user", "text": "b"})
+    assert history.get("a") == [{"role": "user", "text": "a"}]
@@ -0,0 +1,85 @@
+import asyncio
+import time
+import pytest
+import requests
+import genie_room
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+def fail(status_code=503):
+    raise requests.HTTPError(f"{status_code}", response=FakeResponse(status_code))
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05, half_open_probes=1)
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            breaker.call(fail)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    trip(breaker)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+    assert breaker.get_stats()["rejected"] == 1
+
+
+def test_success_resets_failure_count(breaker):
+    with pytest.raises(requests.HTTPError):
+        breaker.call(fail)
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(requests.HTTPError):
+        breaker.call(fail)
+    assert breaker.state == CLOSED
+
+
+def test_client_errors_do_not_count(breaker):
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            breaker.call(fail, 404)
+    assert breaker.state == CLOSED
+
+
+def test_successful_probe_closes(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_opens_again(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    with pytest.raises(requests.HTTPError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker("test", failure_threshold=0)
+    for _ in range(5):
+        with pytest.raises(requests.HTTPError):
+            breaker.call(fail)
+    assert breaker.state == CLOSED
+
+
+def test_start_new_conversation_reports_open_circuit(monkeypatch):
+    async def start_conversation(question, on_status=None, session_id=None):
+        raise CircuitOpenError("Genie", 30)
+
+    monkeypatch.setattr(genie_room, "_start_conversation_async", start_conversation)
+    conversation_id, result, query_text = asyncio.run(genie_room.start_new_conversation_async("total sales"))
+    assert conversation_id is None and query_text is None
+    assert result == genie_room.unavailable_message(CircuitOpenError("Genie", 30))
@@ -0,0 +1,65 @@
+import asyncio
+import uuid
+import pytest
+import genie_room
+from answer_cache import AnswerCache
+from genie_room import FailedPart, genie_query_detailed_async, invalidate
+from result_store import DiskResultStore
+
+
+@pytest.fixture
+def genie(tmp_path, monkeypatch):
+    """Stub Genie answering with the next queued (status, result) and counting the questions it gets"""
+    answers = []
+    asked = []
+
+    async def start_conversation(question, on_status=None, session_id=None):
+        asked.append(question)
+        status, result = answers.pop(0)
+        return "conversation", status, result, None
+
+    space_id = uuid.uuid4().hex
+    monkeypatch.setattr(genie_room, "get_space_id", lambda: space_id)
+    monkeypatch.setattr(genie_room, "_start_conversation_async", start_conversation)
+    monkeypatch.setattr(genie_room, "answer_cache", AnswerCache(ttl=60))
+    monkeypatch.setattr(genie_room, "result_store", DiskResultStore(str(tmp_path)))
+    return answers, asked
+
+
+def ask(question):
+    return asyncio.run(genie_query_detailed_async(question))
+
+
+def test_completed_answer_is_cached(genie):
+    answers, asked = genie
+    answers.append(("COMPLETED", "42"))
+    assert ask("total sales")[2]["source"] == "genie"
+    assert ask("Total sales?")[2]["source"] == "cache"
+    assert len(asked) == 1
+
+
+@pytest.mark.parametrize("status", ["FAILED", "ERROR", None])
+def test_failed_message_is_not_cached(genie, status):
+    answers, asked = genie
+    answers.extend([(status, "Sorry, something went wrong"), ("COMPLETED", "42")])
+    assert ask("total sales")[2]["source"] == "error"
+    assert ask("total sales")[:2] == ("42", None)
+    assert len(asked) == 2
+
+
+def test_answer_with_failed_part_is_not_cached(genie):
+    answers, asked = genie
+    failed = [("Here are the results", None), (FailedPart("Sorry, the results could not be fetched"), "SELECT 1")]
+    answers.extend([("COMPLETED", failed), ("COMPLETED", "42")])
+    assert ask("total sales")[2]["source"] == "error"
+    assert ask("total sales")[2]["source"] == "genie"
+    assert len(asked) == 2
+
+
+def test_invalidate_sends_the_next_ask_to_genie(genie):
+    answers, asked = genie
+    answers.extend([("COMPLETED", "42"), ("COMPLETED", "43")])
+    ask("total sales")
+    assert invalidate("total sales") >= 1
+    assert ask("total sales")[:2] == ("43", None)
+    assert len(asked) == 2
@@ -0,0 +1,55 @@
+import threading
+import diskcache
+import pytest
+from job_manager import LocalJobManager
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = diskcache.Cache(str(tmp_path))
+    yield cache
+    cache.close()
+
+
+def blocking_job(started, release):
+    def job_fn(key, progress_key, args, context):
+        started.set()
+        release.wait(5)
+    return job_fn
+
+
+def recording_job(ran):
+    def job_fn(key, progress_key, args, context):
+        ran.append(key)
+    return job_fn
+
+
+@pytest.mark.parametrize("terminated_from", ["same worker", "other worker"])
+def test_job_terminated_before_it_runs_never_runs(cache, terminated_from):
+    manager = LocalJobManager(cache, max_workers=1)
+    other = LocalJobManager(cache, max_workers=1)
+    started, release, ran = threading.Event(), threading.Event(), []
+    busy = manager.call_job_fn("busy", blocking_job(started, release), (), None)
+    assert started.wait(5)
+    queued = manager.call_job_fn("queued", recording_job(ran), (), None)
+
+    (manager if terminated_from == "same worker" else other).terminate_job(queued)
+    release.set()
+    manager._executor.shutdown(wait=True)
+    assert ran == []
+    assert not manager.job_running(busy)
+    assert not other.job_running(queued)
+
+
+def test_running_job_is_visible_to_other_workers(cache):
+    manager = LocalJobManager(cache, max_workers=1)
+    other = LocalJobManager(cache, max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    job = manager.call_job_fn("busy", blocking_job(started, release), (), None)
+    assert started.wait(5)
+    assert manager.job_running(job)
+    assert other.job_running(job)
+    release.set()
+    manager._executor.shutdown(wait=True)
+    assert not other.job_running(job)
+    assert manager.get_backlog()["completed"] == 1
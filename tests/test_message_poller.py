@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from message_poller import MessagePoller
+from polling import FixedPollingStrategy
+
+
+class ScriptedClient:
+    """Answers get_message with the next scripted message of each message id, repeating the last one"""
+    def __init__(self, scripts):
+        self.scripts = {message_id: list(messages) for message_id, messages in scripts.items()}
+        self.polls = {message_id: 0 for message_id in scripts}
+
+    async def get_message(self, conversation_id, message_id):
+        self.polls[message_id] += 1
+        script = self.scripts[message_id]
+        return script.pop(0) if len(script) > 1 else script[0]
+
+
+def message(status, text=None):
+    attachments = [{"text": {"content": text}}] if text is not None else []
+    return {"status": status, "attachments": attachments}
+
+
+def poller_for(client):
+    return MessagePoller(client, strategy=FixedPollingStrategy(0.01), max_concurrent_polls=4, max_polls_per_second=0)
+
+
+def test_attachment_changes_are_notified_without_a_status_change():
+    async def main():
+        client = ScriptedClient({"m": [
+            message("EXECUTING_QUERY"),
+            message("EXECUTING_QUERY", "Here is"),
+            message("EXECUTING_QUERY", "Here is the answer"),
+            message("EXECUTING_QUERY", "Here is the answer"),
+            message("COMPLETED", "Here is the answer"),
+        ]})
+        updates = []
+        await poller_for(client).wait("c", "m", on_status=lambda status, msg: updates.append(
+            (status, [a["text"]["content"] for a in msg["attachments"]])
+        ))
+        assert updates == [
+            ("EXECUTING_QUERY", []),
+            ("EXECUTING_QUERY", ["Here is"]),
+            ("EXECUTING_QUERY", ["Here is the answer"]),
+            ("COMPLETED", ["Here is the answer"]),
+        ]
+    asyncio.run(main())
+
+
+def test_waiters_on_one_message_share_its_polls():
+    async def main():
+        client = ScriptedClient({"m": [message("SUBMITTED"), message("EXECUTING_QUERY"), message("COMPLETED", "done")]})
+        poller = poller_for(client)
+        first_updates, second_updates = [], []
+        results = await asyncio.gather(
+            poller.wait("c", "m", on_status=lambda status, msg: first_updates.append(status)),
+            poller.wait("c", "m", on_status=lambda status, msg: second_updates.append(status)),
+        )
+        assert results[0] is results[1]
+        assert results[0]["status"] == "COMPLETED"
+        assert client.polls["m"] == 3
+        assert first_updates == second_updates == ["SUBMITTED", "EXECUTING_QUERY", "COMPLETED"]
+        assert poller.get_stats()["registered"] == 1
+    asyncio.run(main())
+
+
+def test_messages_complete_independently():
+    async def main():
+        client = ScriptedClient({
+            "fast": [message("COMPLETED")],
+            "slow": [message("SUBMITTED")] * 3 + [message("FAILED")],
+        })
+        poller = poller_for(client)
+        fast, slow = await asyncio.gather(poller.wait("c", "fast"), poller.wait("c", "slow"))
+        assert fast["status"] == "COMPLETED" and slow["status"] == "FAILED"
+        assert client.polls == {"fast": 1, "slow": 4}
+        assert poller.get_stats()["completed"] == 2
+    asyncio.run(main())
+
+
+def test_timeout_fails_the_waiter():
+    async def main():
+        client = ScriptedClient({"m": [message("SUBMITTED")]})
+        with pytest.raises(TimeoutError):
+            await poller_for(client).wait("c", "m", timeout=0.05)
+    asyncio.run(main())
+
+
+def test_poll_error_reaches_the_waiter():
+    class FailingClient:
+        async def get_message(self, conversation_id, message_id):
+            raise ValueError("bad response")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await poller_for(FailingClient()).wait("c", "m")
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+from decimal import Decimal
+import pandas as pd
+from result_decoder import ResultDecoder, decode_result
+
+SCHEMA = {"columns": [
+    {"name": "amount", "type_name": "DECIMAL", "type_precision": 38, "type_scale": 2},
+    {"name": "day", "type_name": "DATE"},
+    {"name": "quantity", "type_name": "INT"},
+]}
+
+ROWS = [
+    ["123456789012345678901234567890123.45", "2024-01-05", "3"],
+    [None, None, None],
+    ["1.10", "2024-02-01", "7"],
+]
+
+
+def test_decimals_are_exact_and_compact():
+    df = decode_result(ROWS, SCHEMA, arrow=False)
+    assert isinstance(df["amount"].dtype, pd.ArrowDtype)
+    assert df["amount"].iloc[0] == Decimal("123456789012345678901234567890123.45")
+    assert pd.isna(df["amount"].iloc[1])
+    strings = pd.Series([row[0] for row in ROWS] * 10000, dtype=object).memory_usage(deep=True)
+    typed = decode_result([row[:1] for row in ROWS] * 10000, SCHEMA).memory_usage(deep=True).sum()
+    assert typed < strings / 2
+
+
+def test_decimal_objects_are_opt_in():
+    decoder = ResultDecoder(SCHEMA, arrow=False, decimal_objects=True)
+    decoder.append(ROWS)
+    df = decoder.to_frame()
+    assert df["amount"].dtype == object
+    assert df["amount"].iloc[2] == Decimal("1.10")
+
+
+def test_decimals_wider_than_their_scale_stay_exact():
+    df = decode_result([["1.125"]], {"columns": [{"name": "amount", "type_name": "DECIMAL", "type_scale": 2}]})
+    assert df["amount"].iloc[0] == Decimal("1.125")
+
+
+def test_types_follow_the_schema():
+    df = decode_result(ROWS, SCHEMA, arrow=False)
+    assert df["day"].dtype == "datetime64[ns]"
+    assert df["quantity"].dtype == "Int32"
@@ -0,0 +1,37 @@
+import io
+import pandas as pd
+import pytest
+import result_export
+from result_export import iter_csv, iter_parquet
+from result_store import DiskResultStore
+
+DF = pd.DataFrame({
+    "region": ["east", "west", None, "north, south", 'say "hi"'],
+    "sales": [1.5, 2.0, None, 4.25, 5.0],
+    "orders": [1, 2, 3, 4, 5],
+})
+
+
+@pytest.fixture(params=[True, False], ids=["on disk", "in memory"])
+def store(request, tmp_path, monkeypatch):
+    store = DiskResultStore(str(tmp_path), max_bytes=1024 * 1024 if request.param else 0, ttl=60)
+    monkeypatch.setattr(result_export, "result_store", store)
+    return store
+
+
+def test_streamed_csv_matches_to_csv(store):
+    result_id = store.save_table(DF)
+    chunks = list(iter_csv(result_id, batch_rows=2))
+    assert len(chunks) == 3
+    assert "".join(chunks) == DF.to_csv(index=False)
+
+
+def test_streamed_parquet_round_trips(store):
+    result_id = store.save_table(DF)
+    data = b"".join(iter_parquet(result_id))
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(data)), DF)
+
+
+def test_missing_result(store):
+    assert iter_csv("missing") is None
+    assert iter_parquet("missing") is None
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from result_fetcher import fetch_result_frame
+
+SCHEMA = {"columns": [{"name": "n", "type_name": "INT"}]}
+
+
+def rows(start, count):
+    return [[str(i)] for i in range(start, start + count)]
+
+
+class FakeClient:
+    """Serves statement chunks and external links from dicts, recording what was fetched"""
+    def __init__(self, chunks=None, links=None):
+        self.chunks = chunks or {}
+        self.links = links or {}
+        self.fetched_chunks = []
+        self.fetched_links = []
+
+    async def get_result_chunk(self, statement_id, chunk_index):
+        self.fetched_chunks.append(chunk_index)
+        await asyncio.sleep(0)
+        return self.chunks[chunk_index]
+
+    async def fetch_external_link(self, url):
+        self.fetched_links.append(url)
+        await asyncio.sleep(0)
+        link = self.links[url]
+        if isinstance(link, Exception):
+            raise link
+        return link
+
+
+def query_result(first_chunk, total_chunks=None, next_chunk_index=None, total_rows=None, chunk_rows=None):
+    manifest = {"schema": SCHEMA}
+    if total_chunks is not None:
+        manifest["total_chunk_count"] = total_chunks
+        manifest["chunks"] = [{"chunk_index": i, "row_count": chunk_rows or 0} for i in range(total_chunks)]
+    if total_rows is not None:
+        manifest["total_row_count"] = total_rows
+    return {"statement_id": "st", "schema": SCHEMA, "manifest": manifest,
+            "next_chunk_index": next_chunk_index, **first_chunk}
+
+
+def fetch(client, result, **kwargs):
+    return asyncio.run(fetch_result_frame(client, result, **kwargs))
+
+
+def test_inline_chunks_are_fetched_in_order():
+    client = FakeClient(chunks={1: {"data_array": rows(2, 2)}, 2: {"data_array": rows(4, 2)}})
+    df = fetch(client, query_result({"data_array": rows(0, 2)}, total_chunks=3, next_chunk_index=1, total_rows=6),
+               concurrency=2)
+    assert df["n"].tolist() == list(range(6))
+    assert sorted(client.fetched_chunks) == [1, 2]
+    assert not df.attrs.get("truncated")
+
+
+def test_external_links_are_downloaded():
+    client = FakeClient(
+        chunks={1: {"external_links": [{"external_link": "c"}]}},
+        links={"a": rows(0, 2), "b": rows(2, 2), "c": rows(4, 1)},
+    )
+    first = {"external_links": [{"external_link": "a"}, {"external_link": "b"}]}
+    df = fetch(client, query_result(first, total_chunks=2, next_chunk_index=1, total_rows=5))
+    assert df["n"].tolist() == list(range(5))
+    assert client.fetched_links == ["a", "b", "c"]
+
+
+def test_next_chunk_index_is_followed_when_the_chunk_count_is_unknown():
+    client = FakeClient(chunks={
+        1: {"data_array": rows(1, 1), "next_chunk_index": 2},
+        2: {"data_array": rows(2, 1)},
+    })
+    df = fetch(client, query_result({"data_array": rows(0, 1)}, next_chunk_index=1))
+    assert df["n"].tolist() == [0, 1, 2]
+    assert client.fetched_chunks == [1, 2]
+
+
+def test_fetching_stops_at_the_row_budget():
+    client = FakeClient(chunks={i: {"data_array": rows(i * 10, 10)} for i in range(1, 5)})
+    df = fetch(client, query_result({"data_array": rows(0, 10)}, total_chunks=5, next_chunk_index=1,
+                                    total_rows=50, chunk_rows=10), max_rows=25, concurrency=1)
+    assert len(df) == 25
+    assert df.attrs["truncated"] and df.attrs["total_row_count"] == 50
+    assert 4 not in client.fetched_chunks
+
+
+def test_fetching_stops_at_the_byte_budget():
+    client = FakeClient(chunks={1: {"data_array": rows(10, 10), "next_chunk_index": 2},
+                                2: {"data_array": rows(20, 10)}})
+    df = fetch(client, query_result({"data_array": rows(0, 10), "byte_count": 1000}, next_chunk_index=1),
+               max_bytes=500)
+    assert len(df) == 10
+    assert df.attrs["truncated"]
+    assert client.fetched_chunks == []
+
+
+def test_failed_link_fetch_is_raised():
+    client = FakeClient(
+        chunks={1: {"external_links": [{"external_link": "bad"}]}},
+        links={"a": rows(0, 1), "bad": ConnectionError("link expired")},
+    )
+    with pytest.raises(ConnectionError):
+        fetch(client, query_result({"external_links": [{"external_link": "a"}]}, total_chunks=2, next_chunk_index=1))
+
+
+def test_empty_result():
+    assert fetch(FakeClient(), query_result({"data_array": []})) is None
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+import result_pages
+from result_pages import split_filter_part, get_page
+from result_store import DiskResultStore
+
+
+@pytest.mark.parametrize("filter_part, expected", [
+    ("{name} contains \"orange juice\"", ("name", "contains", "orange juice")),
+    ("{name} contains \"a >= b\"", ("name", "contains", "a >= b")),
+    ("{name} = 'x < y'", ("name", "eq", "x < y")),
+    ("{price} >= 5", ("price", "ge", 5.0)),
+    ("{price} gt 5", ("price", "gt", 5.0)),
+    ("{price} < 5", ("price", "lt", 5.0)),
+    ("{day} datestartswith 2024-01", ("day", "datestartswith", "2024-01")),
+    ("no column here", (None, None, None)),
+])
+def test_split_filter_part(filter_part, expected):
+    assert split_filter_part(filter_part) == expected
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = DiskResultStore(str(tmp_path))
+    monkeypatch.setattr(result_pages, "result_store", store)
+    return store
+
+
+def test_filter_with_operator_in_quoted_value(store):
+    df = pd.DataFrame({"name": ["orange juice", "apple juice", "orange"], "price": [3, 2, 1]})
+    result_id = store.save_table(df)
+    records, _ = get_page(result_id, 0, 10, filter_query='{name} contains "orange juice"')
+    assert [record["name"] for record in records] == ["orange juice"]
+
+
+def test_sort_and_page(store):
+    df = pd.DataFrame({"name": list("abcde"), "price": [5, 3, 4, 1, 2]})
+    result_id = store.save_table(df)
+    records, page_count = get_page(result_id, 1, 2, sort_by=[{"column_id": "price", "direction": "asc"}])
+    assert page_count == 3
+    assert [record["name"] for record in records] == ["b", "c"]
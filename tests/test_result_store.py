@@ -0,0 +1,44 @@
+import os
+import pandas as pd
+import pytest
+from result_store import DiskResultStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DiskResultStore(str(tmp_path), max_bytes=1024 * 1024, ttl=60, table_cache_bytes=0)
+
+
+def failing_eviction():
+    raise OSError("disk error")
+
+
+def test_answer_round_trip(store):
+    df = pd.DataFrame({"region": ["east", "west"], "sales": [1, 2]})
+    store.put("sales by region", "space", "Sales by region?", df, "SELECT 1")
+    result, query_text = store.get("sales by region", "space")
+    pd.testing.assert_frame_equal(result, df)
+    assert query_text == "SELECT 1"
+    assert store.get("sales by region", "other space") is None
+
+
+def test_failed_eviction_keeps_the_committed_answer(store, monkeypatch):
+    monkeypatch.setattr(store, "_evict", failing_eviction)
+    df = pd.DataFrame({"sales": [1, 2]})
+    store.put("sales", "space", "Sales?", df, None)
+    result, _ = store.get("sales", "space")
+    pd.testing.assert_frame_equal(result, df)
+
+
+def test_failed_eviction_keeps_the_saved_table(store, monkeypatch):
+    monkeypatch.setattr(store, "_evict", failing_eviction)
+    df = pd.DataFrame({"sales": [1, 2]})
+    result_id = store.save_table(df)
+    assert store.table_file(result_id) is not None
+    pd.testing.assert_frame_equal(store.load_table(result_id), df)
+
+
+def test_replaced_answer_removes_the_old_file(store):
+    store.put("sales", "space", "Sales?", pd.DataFrame({"sales": [1]}), None)
+    store.put("sales", "space", "Sales?", pd.DataFrame({"sales": [2]}), None)
+    assert len([name for name in os.listdir(store.directory) if name.endswith(".parquet")]) == 1
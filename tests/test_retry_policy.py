@@ -0,0 +1,117 @@
+import time
+import pytest
+import requests
+from retry_policy import RetryBudget, RetryPolicy, is_retryable, retry_after, retry_deadline, retrying
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def http_error(status_code, headers=None):
+    return requests.HTTPError(f"{status_code}", response=FakeResponse(status_code, headers))
+
+
+def failing(*errors, result="ok"):
+    """A function raising errors one call at a time, then returning result"""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return func, calls
+
+
+@pytest.fixture
+def policy():
+    return RetryPolicy(max_tries=3, base_delay=0.001, max_delay=0.01, max_elapsed=5,
+                       budget=RetryBudget(ratio=0.1, min_per_second=0, capacity=10))
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (http_error(429), True),
+    (http_error(503), True),
+    (http_error(500), True),
+    (http_error(400), False),
+    (http_error(404), False),
+    (requests.ConnectionError(), True),
+    (requests.ReadTimeout(), True),
+    (ValueError(), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) == retryable
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (http_error(429), True),
+    (http_error(503), True),
+    (http_error(500), False),
+    (http_error(502, {"Retry-After": "1"}), True),
+    (requests.ReadTimeout(), False),
+    (requests.ConnectTimeout(), True),
+])
+def test_non_idempotent_calls_retry_only_rejected_requests(error, retryable):
+    assert is_retryable(error, idempotent=False) == retryable
+
+
+def test_retry_after():
+    assert retry_after(http_error(429, {"Retry-After": "2"})) == 2.0
+    assert retry_after(http_error(429)) is None
+    assert retry_after(http_error(429, {"Retry-After": "soon"})) is None
+
+
+def test_retries_until_success(policy):
+    func, calls = failing(http_error(503), http_error(503))
+    assert policy.call("endpoint", func) == "ok"
+    assert len(calls) == 3
+    assert policy.get_stats()["endpoints"]["endpoint"]["retries"] == 2
+
+
+def test_gives_up_after_max_tries(policy):
+    func, calls = failing(*[http_error(503)] * 5)
+    with pytest.raises(requests.HTTPError):
+        policy.call("endpoint", func)
+    assert len(calls) == 3
+    assert policy.get_stats()["endpoints"]["endpoint"]["gave_up"] == 1
+
+
+def test_client_errors_are_not_retried(policy):
+    func, calls = failing(http_error(404))
+    with pytest.raises(requests.HTTPError):
+        policy.call("endpoint", func)
+    assert len(calls) == 1
+
+
+def test_non_idempotent_call_is_not_retried_after_read_timeout(policy):
+    func, calls = failing(requests.ReadTimeout())
+    with pytest.raises(requests.ReadTimeout):
+        policy.call("endpoint", func, idempotent=False)
+    assert len(calls) == 1
+
+
+def test_empty_budget_stops_retries():
+    policy = RetryPolicy(max_tries=5, base_delay=0.001, budget=RetryBudget(ratio=0, min_per_second=0, capacity=0))
+    func, calls = failing(http_error(503))
+    with pytest.raises(requests.HTTPError):
+        policy.call("endpoint", func)
+    assert len(calls) == 1
+    assert policy.get_stats()["endpoints"]["endpoint"]["budget_denied"] == 1
+
+
+def test_deadline_stops_retries(policy):
+    func, calls = failing(http_error(429, {"Retry-After": "1"}))
+    with retry_deadline(time.monotonic() + 0.5):
+        with pytest.raises(requests.HTTPError):
+            policy.call("endpoint", func)
+    assert len(calls) == 1
+
+
+def test_retrying_decorator(policy):
+    func, calls = failing(http_error(503))
+    decorated = retrying("endpoint", policy)(func)
+    assert decorated() == "ok"
+    assert len(calls) == 2
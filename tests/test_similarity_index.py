@@ -0,0 +1,47 @@
+import pytest
+from similarity_index import SimilarityIndex, compatible
+
+
+@pytest.fixture
+def index():
+    return SimilarityIndex()
+
+
+@pytest.mark.parametrize("indexed, asked", [
+    ("customers who placed an order", "customers who have not placed an order"),
+    ("customers who placed an order", "customers who haven't placed an order"),
+    ("number of active users", "number of inactive users"),
+    ("max price per product", "min price per product"),
+    ("top 10 products by revenue", "bottom 10 products by revenue"),
+    ("top 5 products by revenue", "top 10 products by revenue"),
+])
+def test_opposite_questions_never_match(index, indexed, asked):
+    index.add(indexed, indexed)
+    assert index.search(asked) == []
+
+
+@pytest.mark.parametrize("indexed, asked", [
+    ("What were total sales last month?", "total sales last month"),
+    ("how many orders per customer", "number of orders per customer"),
+    ("list all stores in texas", "show all stores in texas"),
+])
+def test_paraphrases_match(index, indexed, asked):
+    index.add(indexed, indexed)
+    matches = index.search(asked)
+    assert [key for key, _, _ in matches] == [indexed]
+
+
+def test_compatible_ignores_unrelated_prefixes():
+    assert compatible(frozenset({"invoices", "region"}), frozenset({"invoices", "region"}))
+    assert not compatible(frozenset({"active", "users"}), frozenset({"inactive", "users"}))
+
+
+def test_remove_and_clear(index):
+    index.add("a", "revenue by region")
+    index.add("b", "orders by region")
+    index.remove("a")
+    assert [key for key, _, _ in index.search("revenue by region", threshold=0.99)] == []
+    index.clear()
+    assert index.search("orders by region") == []
+    index.add("c", "orders by region")
+    assert [key for key, _, _ in index.search("orders by region")] == ["c"]
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    async def main():
+        flight = SingleFlight()
+        runs = []
+        updates = []
+
+        async def call(emit):
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            emit("RUNNING")
+            return "answer"
+
+        results = await asyncio.gather(*(
+            flight.do("key", call, lambda status, i=i: updates.append((i, status))) for i in range(3)
+        ))
+        assert results == ["answer"] * 3
+        assert len(runs) == 1
+        assert sorted(updates) == [(0, "RUNNING"), (1, "RUNNING"), (2, "RUNNING")]
+        assert flight.get_stats()["coalesced"] == 2
+        assert flight.get_stats()["in_flight"] == 0
+    asyncio.run(main())
+
+
+def test_different_keys_run_separately():
+    async def main():
+        flight = SingleFlight()
+
+        async def call(emit, value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(
+            flight.do("a", lambda emit: call(emit, 1)),
+            flight.do("b", lambda emit: call(emit, 2))
+        )
+        assert results == [1, 2]
+        assert flight.get_stats()["calls"] == 2
+    asyncio.run(main())
+
+
+def test_errors_reach_every_waiter():
+    async def main():
+        flight = SingleFlight()
+
+        async def call(emit):
+            await asyncio.sleep(0.01)
+            raise ValueError("failed")
+
+        results = await asyncio.gather(flight.do("key", call), flight.do("key", call), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+    asyncio.run(main())
+
+
+def test_waiter_giving_up_does_not_cancel_the_call():
+    async def main():
+        flight = SingleFlight()
+
+        async def call(emit):
+            await asyncio.sleep(0.02)
+            return "answer"
+
+        first = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.do("key", call), 0.001)
+        assert await first == "answer"
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+import pytest
+import suggestion_warmer as warmer_module
+from answer_cache import AnswerCache
+from suggestion_warmer import SuggestionWarmer
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = AnswerCache(ttl=60)
+    monkeypatch.setattr(warmer_module, "answer_cache", cache)
+    monkeypatch.setattr(warmer_module, "get_space_id", lambda: "space")
+    return cache
+
+
+def test_edited_suggestions_are_added_to_the_defaults(cache):
+    warmer = SuggestionWarmer(interval=0, max_edited=2)
+    warmer.start(["Total sales", "Top products"])
+    warmer.add_suggestions(["Total sales", "Revenue by region"])
+    for question in ("Total sales", "Top products", "Revenue by region"):
+        cache.put(question, "space", "answer", None)
+        assert warmer.answer(question) is not None
+
+
+def test_only_the_most_recent_edits_are_kept(cache):
+    warmer = SuggestionWarmer(interval=0, max_edited=1)
+    warmer.start(["Total sales"])
+    warmer.add_suggestions(["first edit"])
+    warmer.add_suggestions(["second edit"])
+    cache.put("first edit", "space", "answer", None)
+    cache.put("second edit", "space", "answer", None)
+    assert warmer.answer("first edit") is None
+    assert warmer.answer("second edit") is not None
+
+
+def test_failures_are_retried_with_backoff():
+    warmer = SuggestionWarmer(interval=1800, retry_delay=60)
+    assert warmer._next_delay() == 1800
+    warmer._failed_runs = 1
+    assert warmer._next_delay() == 60
+    warmer._failed_runs = 3
+    assert warmer._next_delay() == 240
+    warmer._failed_runs = 10
+    assert warmer._next_delay() == 1800
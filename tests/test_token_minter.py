@@ -0,0 +1,74 @@
+import time
+import pytest
+import requests
+import token_minter
+from token_minter import TokenMinter
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        if self.payload is None:
+            raise requests.HTTPError("503")
+
+    def json(self):
+        return self.payload
+
+
+class FakeTokenEndpoint:
+    """Issues tokens token-1, token-2, ... with the given lifetime, or fails while failing is set"""
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.issued = 0
+        self.failing = False
+
+    def post(self, url, **kwargs):
+        if self.failing:
+            return FakeResponse(None)
+        self.issued += 1
+        return FakeResponse({"access_token": f"token-{self.issued}", "expires_in": self.lifetime})
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    endpoint = FakeTokenEndpoint(lifetime=0.4)
+    monkeypatch.setattr(token_minter, "get_session", lambda: endpoint)
+    monkeypatch.setattr(token_minter, "TOKEN_RETRY_INTERVAL", 0.05)
+    yield endpoint
+    # Leave the background refresher with a long-lived token
+    endpoint.failing = False
+    endpoint.lifetime = 3600
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_token_is_renewed_before_it_expires(endpoint):
+    minter = TokenMinter("id", "secret", "host", refresh_margin=0.2)
+    assert minter.get_token() == "token-1"
+    assert wait_for(lambda: minter.token != "token-1")
+    assert minter.get_stats()["blocking_refreshes"] == 0
+
+
+def test_current_token_is_served_while_renewal_fails(endpoint):
+    minter = TokenMinter("id", "secret", "host", refresh_margin=0.3)
+    endpoint.failing = True
+    assert wait_for(lambda: minter.get_stats()["failures"] > 0)
+    assert minter.get_token() == "token-1"
+
+
+def test_expired_token_is_refreshed_by_the_caller(endpoint):
+    minter = TokenMinter("id", "secret", "host", refresh_margin=0.3)
+    endpoint.failing = True
+    time.sleep(0.45)
+    with pytest.raises(requests.HTTPError):
+        minter.get_token()
+    endpoint.failing = False
+    endpoint.lifetime = 3600
+    assert minter.get_token().startswith("token-")
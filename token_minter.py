@@ -1,58 +1,146 @@
-import requests
 import threading
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 import logging
 import os
-from dotenv import load_dotenv
-load_dotenv(override=True)
+from typing import Dict, Any, NamedTuple, Optional
+from http_client import get_session, DEFAULT_TIMEOUT
+from config import TOKEN_REFRESH_MARGIN, TOKEN_RETRY_INTERVAL, TOKEN_MAX_RETRY_INTERVAL, TOKEN_DEFAULT_LIFETIME
 
 logger = logging.getLogger(__name__)
 
+
+class _Token(NamedTuple):
+    """An access token and when it expires; replaced as a whole, never modified"""
+    value: str
+    expires_at: float
+    refresh_at: float
+
+
 class TokenMinter:
     """
     A class to handle OAuth token generation and renewal for Databricks.
-    Automatically refreshes the token before it expires.
+
+    A background thread renews the token ahead of expiry, based on the expires_in
+    of each token response. get_token() reads the current token without taking a
+    lock, so requests never wait on a renewal. If a renewal fails, the still-valid
+    token keeps being served while the renewal is retried; only once it has
+    actually expired does a caller refresh it synchronously.
     """
-    def __init__(self, client_id: str, client_secret: str, host: str):
+    def __init__(self, client_id: str, client_secret: str, host: str,
+                 refresh_margin: float = TOKEN_REFRESH_MARGIN):
         self.client_id = client_id
         self.client_secret = client_secret
         self.host = host
-        self.token = None
-        self.expiry_time = None
+        self.refresh_margin = refresh_margin
+        self._token: Optional[_Token] = None
         self.lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._stats = {"refreshes": 0, "failures": 0, "blocking_refreshes": 0}
         self._refresh_token()
-        
+        self._ensure_refresher()
+
+    @property
+    def token(self) -> Optional[str]:
+        current = self._token
+        return current.value if current else None
+
+    @property
+    def expiry_time(self) -> Optional[datetime]:
+        current = self._token
+        return datetime.fromtimestamp(current.expires_at) if current else None
+
     def _refresh_token(self) -> None:
         """Internal method to refresh the OAuth token"""
         url = f"https://{self.host}/oidc/v1/token"
         auth = (self.client_id, self.client_secret)
         data = {'grant_type': 'client_credentials', 'scope': 'all-apis'}
-        
+
         try:
-            response = requests.post(url, auth=auth, data=data)
+            response = get_session().post(url, auth=auth, data=data, timeout=DEFAULT_TIMEOUT)
             response.raise_for_status()
             token_data = response.json()
-            
+
+            now = time.time()
+            lifetime = float(token_data.get('expires_in') or TOKEN_DEFAULT_LIFETIME)
+            # Renew refresh_margin seconds before expiry, or halfway through very short lifetimes
+            margin = min(self.refresh_margin, lifetime / 2)
+            # Swapping in a new tuple is atomic, so readers need no lock
+            self._token = _Token(token_data.get('access_token'), now + lifetime, now + lifetime - margin)
             with self.lock:
-                self.token = token_data.get('access_token')
-                # Set expiry time to 55 minutes (slightly less than the 60-minute expiry)
-                self.expiry_time = datetime.now() + timedelta(minutes=55)
-                
-            logger.info("Successfully refreshed Databricks OAuth token")
+                self._stats["refreshes"] += 1
+
+            logger.info(f"Successfully refreshed Databricks OAuth token (expires in {lifetime:.0f}s)")
         except Exception as e:
+            with self.lock:
+                self._stats["failures"] += 1
             logger.error(f"Failed to refresh Databricks OAuth token: {str(e)}")
             raise
-    
+
+    def _ensure_refresher(self) -> None:
+        """Start the background refresher, again in a forked worker where the thread did not survive"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self.lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        retry_interval = TOKEN_RETRY_INTERVAL
+        while True:
+            current = self._token
+            delay = current.refresh_at - time.time() if current else 0
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            try:
+                self._refresh_token()
+                retry_interval = TOKEN_RETRY_INTERVAL
+            except Exception:
+                # Keep serving the current token; try again with growing intervals
+                current = self._token
+                remaining = current.expires_at - time.time() if current else 0
+                logger.warning(f"Token renewal failed; retrying in {retry_interval:.0f}s ({max(remaining, 0):.0f}s of validity left)")
+                self._wake.wait(retry_interval)
+                self._wake.clear()
+                retry_interval = min(retry_interval * 2, TOKEN_MAX_RETRY_INTERVAL)
+
     def get_token(self) -> str:
         """
         Get a valid token, refreshing if necessary.
-        
+
         Returns:
             str: The current valid OAuth token
         """
+        current = self._token
+        if current is not None and time.time() < current.expires_at:
+            if time.time() >= current.refresh_at:
+                # Renewal is overdue (e.g. the refresher is sleeping in a forked worker)
+                self._ensure_refresher()
+                self._wake.set()
+            return current.value
+
+        # Expired: one caller refreshes while the others wait for its token
         with self.lock:
-            # Check if token is expired or about to expire (within 5 minutes)
-            if not self.token or not self.expiry_time or datetime.now() + timedelta(minutes=5) >= self.expiry_time:
+            current = self._token
+            if current is None or time.time() >= current.expires_at:
+                self._stats["blocking_refreshes"] += 1
                 self._refresh_token()
-            return self.token
+                self._ensure_refresher()
+            return self._token.value
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Refresh counters and the remaining lifetime of the current token"""
+        current = self._token
+        with self.lock:
+            return {
+                **self._stats,
+                "expires_in": round(current.expires_at - time.time(), 1) if current else None,
+                "refresh_in": round(current.refresh_at - time.time(), 1) if current else None
+            }